@@ -0,0 +1,154 @@
+"""Export Model_plate.pt and OCR.pt to ONNX for INFERENCE_BACKEND=onnx.
+
+Needs the PyTorch stack (ultralytics, torch, yolov5 hub access) and the ``onnx``
+package, only on the machine that exports; inference nodes then only need
+``onnxruntime``. ``--int8`` also writes ``*.int8.onnx`` models (ONNX_INT8=true):
+static QDQ quantization when calibration images are given, dynamic otherwise.
+
+Usage (from the repo root):
+    python -m app.export_onnx
+    python -m app.export_onnx --int8 --calibration-dir frames/ --ocr-calibration-dir app/upload/crops/
+"""
+import argparse
+import ast
+import glob
+import logging
+import os
+from typing import Dict, List, Optional
+import numpy as np
+import cv2
+from app.services.model_registry import PLATE_MODEL_PATH, OCR_MODEL_PATH, PLATE_ONNX_PATH, OCR_ONNX_PATH, onnx_model_path
+from app.services.inference_backend import letterbox
+
+logger = logging.getLogger(__name__)
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png", "*.webp", "*.bmp")
+
+
+def export_detector(imgsz: int, opset: int) -> str:
+    from ultralytics import YOLO
+
+    exported = YOLO(PLATE_MODEL_PATH).export(format="onnx", imgsz=imgsz, dynamic=True, opset=opset, simplify=False)
+    if os.path.abspath(exported) != os.path.abspath(PLATE_ONNX_PATH):
+        os.replace(exported, PLATE_ONNX_PATH)
+    return PLATE_ONNX_PATH
+
+
+def export_ocr(imgsz: int, opset: int) -> str:
+    import onnx
+    import torch
+
+    hub_model = torch.hub.load('ultralytics/yolov5', 'custom', path=OCR_MODEL_PATH, device="cpu")
+    # AutoShape -> DetectMultiBackend -> DetectionModel: chỉ export phần mạng, tiền/hậu xử lý làm bằng numpy
+    model = hub_model.model.model.float().eval()
+    for module in model.modules():
+        if type(module).__name__ == "Detect":
+            module.inplace = False
+            module.export = True
+
+    torch.onnx.export(
+        model,
+        torch.zeros(1, 3, imgsz, imgsz),
+        OCR_ONNX_PATH,
+        opset_version=opset,
+        input_names=["images"],
+        output_names=["output0"],
+        dynamic_axes={"images": {0: "batch"}, "output0": {0: "batch"}}
+    )
+
+    names = hub_model.names
+    if isinstance(names, list):
+        names = dict(enumerate(names))
+    onnx_model = onnx.load(OCR_ONNX_PATH)
+    set_metadata(onnx_model, {"names": str(names), "imgsz": str([imgsz, imgsz]), "layout": "yolov5"})
+    onnx.save(onnx_model, OCR_ONNX_PATH)
+    return OCR_ONNX_PATH
+
+
+def set_metadata(onnx_model, metadata: Dict[str, str]) -> None:
+    existing = {prop.key: prop for prop in onnx_model.metadata_props}
+    for key, value in metadata.items():
+        prop = existing.get(key) or onnx_model.metadata_props.add()
+        prop.key, prop.value = key, value
+
+
+def calibration_reader(model_path: str, image_paths: List[str], swap_rb: bool):
+    """Reader feeding letterboxed sample images to the static quantizer"""
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationDataReader
+
+    session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+    metadata = session.get_modelmeta().custom_metadata_map
+    input_name = session.get_inputs()[0].name
+    imgsz = tuple(ast.literal_eval(metadata["imgsz"])) if "imgsz" in metadata else tuple(session.get_inputs()[0].shape[2:4])
+
+    class ImageCalibrationReader(CalibrationDataReader):
+        def __init__(self):
+            self.image_paths = iter(image_paths)
+
+        def get_next(self) -> Optional[dict]:
+            for image_path in self.image_paths:
+                image = cv2.imread(image_path)
+                if image is None:
+                    continue
+                padded = letterbox(image, imgsz)[0]
+                if swap_rb:
+                    padded = padded[:, :, ::-1]
+                return {input_name: padded.transpose(2, 0, 1)[None].astype(np.float32) / 255.0}
+            return None
+
+    return ImageCalibrationReader()
+
+
+def quantize(model_path: str, calibration_dir: Optional[str], swap_rb: bool, max_images: int) -> str:
+    import onnx
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    output_path = onnx_model_path(model_path, quantized=True)
+    image_paths = []
+    if calibration_dir:
+        for pattern in IMAGE_PATTERNS:
+            image_paths.extend(glob.glob(os.path.join(calibration_dir, "**", pattern), recursive=True))
+        image_paths = sorted(image_paths)[:max_images]
+
+    if image_paths:
+        quantize_static(
+            model_path, output_path, calibration_reader(model_path, image_paths, swap_rb),
+            quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True
+        )
+        logger.info(f"Static INT8 quantization of {model_path} with {len(image_paths)} calibration images")
+    else:
+        quantize_dynamic(model_path, output_path, weight_type=QuantType.QUInt8)
+        logger.info(f"Dynamic INT8 quantization of {model_path} (no calibration images)")
+
+    # Giữ metadata (names, imgsz, layout) của model gốc cho OnnxYoloModel
+    source = onnx.load(model_path)
+    quantized = onnx.load(output_path)
+    set_metadata(quantized, {prop.key: prop.value for prop in source.metadata_props})
+    onnx.save(quantized, output_path)
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--imgsz", type=int, default=640, help="detector input size")
+    parser.add_argument("--ocr-imgsz", type=int, default=640, help="OCR input size (yolov5 AutoShape default)")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--int8", action="store_true", help="also write INT8-quantized models")
+    parser.add_argument("--calibration-dir", help="frames for static quantization of the detector")
+    parser.add_argument("--ocr-calibration-dir", help="plate crops for static quantization of the OCR model")
+    parser.add_argument("--calibration-images", type=int, default=200)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    detector_path = export_detector(args.imgsz, args.opset)
+    ocr_path = export_ocr(args.ocr_imgsz, args.opset)
+    logger.info(f"Exported {detector_path} and {ocr_path}")
+
+    if args.int8:
+        quantize(detector_path, args.calibration_dir, swap_rb=True, max_images=args.calibration_images)
+        quantize(ocr_path, args.ocr_calibration_dir, swap_rb=False, max_images=args.calibration_images)
+
+
+if __name__ == "__main__":
+    main()
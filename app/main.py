@@ -1,20 +1,41 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.routers import auth_router, video_router
+from app.database import init_db
+from app.routers import auth_router, video_router, violation_router, stream_router
+from app.schemas.schemas import HealthResponse
+from app.middleware.profiling_middleware import profiling_middleware
+from app.middleware.upload_limit_middleware import UploadLimitMiddleware
+from app.services.metrics import registry
+from app.services.job_service import job_service
+from app.services.password_hasher import password_hasher
+from app.services.stream_service import stream_service
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connect (with retry/backoff) and create database tables
+    await run_in_threadpool(init_db)
+    # Start inference workers; each loads the AI models once before taking jobs
+    job_service.start()
+    # JOB_QUEUE=process: video dở dang của lần chạy trước được đánh dấu failed / đưa lại vào hàng đợi
+    job_service.recover()
+    yield
+    job_service.shutdown()
+    password_hasher.shutdown()
+    stream_service.shutdown()
 
 app = FastAPI(
     title="HTTM API",
     description="API for HTTM (Highway Traffic Monitoring) System",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -24,16 +45,42 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Opt-in stage breakdown per request (header X-Profile: 1)
+app.middleware("http")(profiling_middleware)
+
+# Reject oversized multipart uploads before their body is read
+app.add_middleware(UploadLimitMiddleware)
+
 # Include routers
 app.include_router(auth_router.router, prefix="/api/v1/auth", tags=["authentication"])
 app.include_router(video_router.router, prefix="/api/v1/videos", tags=["videos"])
+app.include_router(violation_router.router, prefix="/api/v1/violations", tags=["violations"])
+app.include_router(stream_router.router, prefix="/api/v1/streams", tags=["streams"])
 
 @app.get("/")
 async def root():
     return {"message": "HTTM API is running"}
 
+@app.get("/health", response_model=HealthResponse)
+async def health():
+    models = job_service.model_status()
+    # Với JOB_QUEUE=database process API không load model, model nằm ở các process app.worker
+    if models["loaded"] or job_service.queue == "database":
+        health_status = "ok"
+    elif models.get("error"):
+        health_status = "error"
+    else:
+        health_status = "loading"
+    return HealthResponse(status=health_status, models=models)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage timings, frame/plate counters and queue/pool gauges in Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     host = os.getenv("API_HOST", "0.0.0.0")
@@ -1,9 +1,6 @@
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.database import get_db
 from app.services.auth_service import AuthService
-from app.schemas.schemas import UserResponse
 
 # JWT Bearer token scheme
 security = HTTPBearer()
@@ -14,19 +11,14 @@ auth_service = AuthService()
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> dict:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    # Verify JWT token (payload đã verify được cache đến khi token hết hạn)
+    payload = auth_service.verify_token_cached(credentials.credentials)
+    if payload is None:
+        # Tạo exception mới mỗi lần: exception dùng chung sẽ tích lũy traceback qua các request
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
-    try:
-        # Verify JWT token
-        payload = auth_service.verify_token(credentials.credentials)
-        if payload is None:
-            raise credentials_exception
-        
-        return payload
-        
-    except Exception:
-        raise credentials_exception
+    return payload
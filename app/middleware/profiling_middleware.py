@@ -0,0 +1,26 @@
+import os
+import time
+from fastapi import Request
+from app.services.metrics import start_profile
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+PROFILE_HEADER = "X-Profile"
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "true").lower() == "true"
+
+async def profiling_middleware(request: Request, call_next):
+    """Opt-in per-request stage breakdown: send 'X-Profile: 1', read the Server-Timing response header"""
+    if not PROFILING_ENABLED or request.headers.get(PROFILE_HEADER) not in ("1", "true"):
+        return await call_next(request)
+    
+    stages = start_profile()
+    started = time.perf_counter()
+    response = await call_next(request)
+    total = time.perf_counter() - started
+    
+    timings = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in stages.items()]
+    timings.append(f"total;dur={total * 1000:.2f}")
+    response.headers["Server-Timing"] = ", ".join(timings)
+    return response
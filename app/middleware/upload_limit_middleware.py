@@ -0,0 +1,73 @@
+import os
+from fastapi import status
+from fastapi.responses import JSONResponse
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Giới hạn cả request multipart (file + các field form), kiểm tra trước khi Starlette ghi body ra file tạm
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", str(101 * 1024 * 1024)))
+BULK_MAX_REQUEST_BYTES = int(os.getenv("BULK_MAX_REQUEST_BYTES", str(1024 * 1024 * 1024)))
+
+REQUEST_LIMITS = {
+    "/api/v1/videos/upload": UPLOAD_MAX_REQUEST_BYTES,
+    "/api/v1/videos/bulk": BULK_MAX_REQUEST_BYTES,
+}
+
+
+class UploadLimitMiddleware:
+    """Reject upload requests larger than their limit before the multipart body is spooled.
+
+    A Content-Length over the limit is answered with 413 without reading the body;
+    bodies without one (chunked) are counted while they are received.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = REQUEST_LIMITS.get(scope["path"].rstrip("/")) if scope["type"] == "http" else None
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        response = JSONResponse(
+            {"detail": f"Request body exceeds the maximum of {limit / (1024 * 1024):.1f}MB, use the resumable upload (POST /api/v1/videos/uploads) for large files"},
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            return await response(scope, receive, send)
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Ngừng đọc body: với app, client như đã ngắt kết nối
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def limited_send(message):
+            nonlocal response_started
+            # Response lỗi của app (body dở dang) được thay bằng 413
+            if exceeded:
+                return
+            response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded and not response_started:
+            await response(scope, receive, send)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, Text
+from sqlalchemy.dialects.mysql import LONGTEXT
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -14,12 +15,21 @@ class User(Base):
 
 class Video(Base):
     __tablename__ = "videos"
+    # Lịch sử video của user được phân trang theo (created_at, id); worker lấy job theo (status, id)
+    __table_args__ = (
+        Index("ix_videos_user_id_created_at", "user_id", "created_at"),
+        Index("ix_videos_status_id", "status", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     filename = Column(String(255), nullable=False)
     filepath = Column(String(255), nullable=False)
     status = Column(String(50), default="processing")
     log_path = Column(String(255))
+    content_hash = Column(String(64), index=True)
+    # Tham số xử lý (JSON ProcessingOptions) để worker ở process/máy khác xử lý đúng như lúc upload
+    options = Column(Text)
+    started_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="videos")
@@ -29,9 +39,30 @@ class Violation(Base):
     __tablename__ = "violations"
     id = Column(Integer, primary_key=True, index=True)
     video_id = Column(Integer, ForeignKey("videos.id"))
-    plate_number = Column(String(50))
+    plate_number = Column(String(50), index=True)
+    # Dạng chuẩn hóa để tìm theo tiền tố / tìm gần đúng bằng index B-tree
+    plate_normalized = Column(String(50), index=True)
+    plate_key = Column(String(50), index=True)
     timestamp_frame = Column(String(50))
     snapshot_path = Column(String(255))
     created_at = Column(DateTime, default=datetime.utcnow)
 
     video = relationship("Video", back_populates="violations")
+
+class ResultCache(Base):
+    __tablename__ = "result_cache"
+    id = Column(Integer, primary_key=True, index=True)
+    # sha256(nội dung file + checksum model + tham số xử lý)
+    cache_key = Column(String(64), unique=True, nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    results = Column(Text().with_variant(LONGTEXT(), "mysql"), nullable=False)
+    size = Column(Integer, nullable=False)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ModelFingerprint(Base):
+    __tablename__ = "model_fingerprints"
+    # Worker (JOB_QUEUE=database) công bố checksum model đang dùng; API không có model nên tra cache theo bản mới nhất
+    id = Column(Integer, primary_key=True, index=True)
+    fingerprint = Column(String(64), unique=True, nullable=False)
+    published_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -9,10 +9,10 @@ router = APIRouter()
 auth_service = AuthService()
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
     try:
-        return auth_service.create_user(db, user)
+        return await auth_service.create_user(db, user)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -20,9 +20,9 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         )
 
 @router.post("/login", response_model=LoginResponse)
-def login_user(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login_user(login_data: LoginRequest, db: Session = Depends(get_db)):
     """Login user"""
-    user = auth_service.authenticate_user(db, login_data.username, login_data.password)
+    user = await auth_service.authenticate_user(db, login_data.username, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, WebSocket, Query, status
+from app.services.stream_service import stream_service
+from app.middleware.auth_middleware import auth_service
+
+router = APIRouter()
+
+@router.websocket("/ws")
+async def stream_detection(websocket: WebSocket, token: str = Query(...)):
+    """Real-time plate detection: send JPEG frames (binary) or {"source": "rtsp://..."}, receive plate/stats events"""
+    # Trình duyệt không gửi được header Authorization qua WebSocket nên token đi qua query
+    if auth_service.verify_token_cached(token) is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await stream_service.handle_stream(websocket)
@@ -1,37 +1,144 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, status, UploadFile, File, Form, Header, Request, Response, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from typing import List, Literal, Optional
+from datetime import datetime
+from app.database import get_db, get_upload_db
 from app.services.video_service import VideoService
 from app.services.auth_service import AuthService
-from app.schemas.schemas import VideoResponse, UserResponse, VideoUploadResponse, PlateDetectionResult
+from app.schemas.schemas import VideoUploadResponse, VideoDetailResponse, ProcessingOptions, UploadSessionCreate, UploadSessionResponse, VideoHistoryResponse, BulkUploadResponse
+from app.services.upload_session_service import UploadSessionService
+from app.services.bulk_upload_service import BulkUploadService
+from app.services.result_stream_service import result_stream_service
 from app.middleware.auth_middleware import get_current_user
 
 router = APIRouter()
 video_service = VideoService()
+upload_session_service = UploadSessionService(video_service)
+bulk_upload_service = BulkUploadService(video_service)
 auth_service = AuthService()
 
-@router.post("/upload", response_model=VideoUploadResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/upload", response_model=VideoUploadResponse, status_code=status.HTTP_202_ACCEPTED)
 async def upload_video(
     file: UploadFile = File(...),
+    sample_interval: float = Form(2.0, gt=0),
+    sampling_mode: Literal["fixed", "adaptive"] = Form("fixed"),
+    roi: Optional[str] = Form(None, description="JSON polygon [[x, y], ...] relative to the frame size (0..1)"),
+    motion_gating: bool = Form(False),
+    stream_results: bool = Form(False),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db = Depends(get_upload_db)
 ):
     user_id = int(current_user.get("sub"))
-    video_record : VideoResponse = await video_service.upload_file_service(db, user_id, file)
-    
-    detected_plates : List[PlateDetectionResult] = video_service.handle_logic_video(video_record, file)
+    options = video_service.build_processing_options(
+        roi, sample_interval=sample_interval, sampling_mode=sampling_mode, motion_gating=motion_gating,
+        stream_results=stream_results
+    )
+    file_path, content_hash = await video_service.upload_file_service(file)
     
-    return VideoUploadResponse(
-        video=video_record,
-        detected_plates=detected_plates
+    # File đã xử lý với cùng model/tham số thì trả kết quả ngay, ngược lại đưa vào hàng đợi
+    return await video_service.register_upload_service(db, user_id, file.filename, file_path, content_hash, options)
+
+@router.post("/bulk", response_model=BulkUploadResponse, status_code=status.HTTP_202_ACCEPTED)
+async def upload_bulk(
+    files: List[UploadFile] = File(..., description="Images, videos and/or .zip / .tar(.gz) archives of them"),
+    sample_interval: float = Form(2.0, gt=0),
+    sampling_mode: Literal["fixed", "adaptive"] = Form("fixed"),
+    roi: Optional[str] = Form(None, description="JSON polygon [[x, y], ...] relative to the frame size (0..1)"),
+    motion_gating: bool = Form(False),
+    stream_results: bool = Form(False),
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_upload_db)
+):
+    """Upload many files in one request; each item gets its own status (queued / completed / rejected / failed)"""
+    user_id = int(current_user.get("sub"))
+    options = video_service.build_processing_options(
+        roi, sample_interval=sample_interval, sampling_mode=sampling_mode, motion_gating=motion_gating,
+        stream_results=stream_results
     )
+    return await bulk_upload_service.upload_service(db, user_id, files, options)
 
-@router.get("/", response_model=List[VideoResponse])
+@router.post("/uploads", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+def create_upload_session(
+    upload: UploadSessionCreate,
+    current_user: dict = Depends(get_current_user)
+):
+    """Start a resumable upload; send the bytes with PATCH /uploads/{upload_id}"""
+    user_id = int(current_user.get("sub"))
+    options = ProcessingOptions(**upload.model_dump(include=set(ProcessingOptions.model_fields)))
+    return upload_session_service.create_session(user_id, upload.filename, upload.upload_length, options.model_dump())
+
+@router.head("/uploads/{upload_id}")
+def get_upload_offset(
+    upload_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Return how many bytes the server already has, to resume after a network drop"""
+    user_id = int(current_user.get("sub"))
+    session = upload_session_service.get_session(user_id, upload_id)
+    return Response(headers={
+        "Upload-Offset": str(session.offset),
+        "Upload-Length": str(session.upload_length),
+        "Cache-Control": "no-store"
+    })
+
+@router.patch("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., ge=0),
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_upload_db)
+):
+    """Append raw bytes at Upload-Offset; the video is queued once the last byte arrives"""
+    user_id = int(current_user.get("sub"))
+    return await upload_session_service.append_chunk(db, user_id, upload_id, upload_offset, request.stream())
+
+@router.get("/", response_model=VideoHistoryResponse)
 def get_video_history(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    video_status: Optional[Literal["pending", "processing", "completed", "failed"]] = Query(None, alias="status"),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    user_id = int(current_user.get("sub"))
+    return video_service.get_video_history_service(db, user_id, limit, cursor, video_status, created_from, created_to)
+
+@router.get("/{video_id}", response_model=VideoDetailResponse)
+def get_video_detail(
+    video_id: int,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     user_id = int(current_user.get("sub"))
-    return video_service.get_video_history_service(db, user_id)
+    return video_service.get_video_detail_service(db, user_id, video_id)
 
+@router.get("/{video_id}/events")
+async def stream_video_events(
+    video_id: int,
+    format: Optional[Literal["sse", "ndjson"]] = Query(None, description="Default: sse when Accept is text/event-stream, else ndjson"),
+    accept: Optional[str] = Header(None),
+    last_event_id: Optional[int] = Header(None, ge=0),
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_upload_db)
+):
+    """Stream plates while the video is processed (upload with stream_results=true); a summary event ends the stream"""
+    user_id = int(current_user.get("sub"))
+    await video_service.run_db(db, video_service.check_video_owner, user_id, video_id)
+    
+    use_sse = format == "sse" or (format is None and "text/event-stream" in (accept or ""))
+    formatter = result_stream_service.format_sse if use_sse else result_stream_service.format_ndjson
+    
+    async def body():
+        async for event_id, event in result_stream_service.follow(video_id, -1 if last_event_id is None else last_event_id):
+            yield formatter(event_id, event)
+    
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        # Tắt buffer của proxy (nginx) để event tới client ngay
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
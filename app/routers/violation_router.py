@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Literal
+from app.database import get_db
+from app.services.violation_service import ViolationService
+from app.schemas.schemas import ViolationResponse
+from app.middleware.auth_middleware import get_current_user
+
+router = APIRouter()
+violation_service = ViolationService()
+
+@router.get("/", response_model=List[ViolationResponse])
+def search_violations(
+    plate: str = Query(..., min_length=1, max_length=50),
+    mode: Literal["prefix", "exact", "fuzzy"] = Query("prefix"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Search recognized plates of the current user's videos"""
+    user_id = int(current_user.get("sub"))
+    return violation_service.search_violations_service(db, user_id, plate, mode, limit)
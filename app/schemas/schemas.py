@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Literal, Tuple, Annotated, Dict
 
 class UserBase(BaseModel):
     username: str
@@ -35,13 +35,18 @@ class VideoResponse(VideoBase):
     class Config:
         from_attributes = True
 
+class VideoHistoryResponse(BaseModel):
+    items: List[VideoResponse]
+    next_cursor: Optional[str] = None
+
 class ViolationBase(BaseModel):
     plate_number: str
-    timestamp_frame: str
-    snapshot_path: str
+    timestamp_frame: Optional[str] = None
+    snapshot_path: Optional[str] = None
 
 class ViolationResponse(ViolationBase):
     id: int
+    video_id: int
     created_at: datetime
     class Config:
         from_attributes = True
@@ -53,7 +58,57 @@ class PlateDetectionResult(BaseModel):
     bbox: list
     timestamp: Optional[float] = None
     frame_number: Optional[int] = None
+    track_id: Optional[int] = None
+
+RelativeCoordinate = Annotated[float, Field(ge=0, le=1)]
+
+class ProcessingOptions(BaseModel):
+    sample_interval: float = Field(2.0, gt=0, description="Seconds between analyzed frames")
+    sampling_mode: Literal["fixed", "adaptive"] = "fixed"
+    roi: Optional[List[Tuple[RelativeCoordinate, RelativeCoordinate]]] = Field(
+        None, min_length=3, description="Region-of-interest polygon [[x, y], ...] relative to the frame size (0..1)"
+    )
+    motion_gating: bool = Field(False, description="Skip detection on sampled frames without motion in the ROI")
+    stream_results: bool = Field(False, description="Publish plates as they are confirmed on GET /videos/{id}/events (rolling dedup window instead of whole-video dedup)")
 
 class VideoUploadResponse(BaseModel):
     video: VideoResponse
-    detected_plates: List[PlateDetectionResult]
\ No newline at end of file
+    detected_plates: List[PlateDetectionResult]
+
+class BulkUploadItem(BaseModel):
+    filename: str
+    status: Literal["queued", "completed", "rejected", "failed"]
+    video: Optional[VideoResponse] = None
+    detected_plates: List[PlateDetectionResult] = []
+    detail: Optional[str] = None
+
+class BulkUploadResponse(BaseModel):
+    items: List[BulkUploadItem]
+    summary: Dict[str, int]
+
+class UploadSessionCreate(ProcessingOptions):
+    filename: str
+    upload_length: int = Field(..., gt=0)
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    offset: int
+    upload_length: int
+    video: Optional[VideoResponse] = None
+    detected_plates: List[PlateDetectionResult] = []
+
+class VideoDetailResponse(BaseModel):
+    video: VideoResponse
+    detected_plates: List[PlateDetectionResult] = []
+
+class ModelHealth(BaseModel):
+    loaded: bool
+    backend: Optional[str] = None
+    device: Optional[str] = None
+    load_seconds: Optional[float] = None
+    loaded_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+class HealthResponse(BaseModel):
+    status: str
+    models: ModelHealth
\ No newline at end of file
@@ -1,9 +1,13 @@
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Optional, Tuple
+from collections import OrderedDict
 from app.models.models import User
 from app.schemas.schemas import UserCreate, UserResponse
+from app.services.password_hasher import password_hasher
+from fastapi.concurrency import run_in_threadpool
 import hashlib
-import secrets
+import threading
+import time
 import jwt
 import os
 from datetime import datetime, timedelta
@@ -12,46 +16,120 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# Thuật toán bất đối xứng: service khác chỉ cần public key để verify token
+ASYMMETRIC_ALGORITHMS = {"RS256", "RS384", "RS512", "ES256", "ES384", "EdDSA"}
+
+class TokenCache:
+    """Bounded LRU of verified token payloads keyed by a SHA-256 digest of the token"""
+    
+    def __init__(self, max_size: int = 10000, max_ttl: int = 300):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, token: str) -> Optional[dict]:
+        key = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(payload)
+    
+    def put(self, token: str, payload: dict) -> None:
+        # Entry hết hạn cùng lúc với token (exp), tối đa max_ttl giây
+        expires_at = time.time() + self.max_ttl
+        if "exp" in payload:
+            expires_at = min(expires_at, float(payload["exp"]))
+        
+        key = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
 class AuthService:
     def __init__(self):
         self.secret_key = os.getenv("SECRET_KEY", "your-secret-key-here")
         self.algorithm = os.getenv("ALGORITHM", "HS256")
         self.access_token_expire_minutes = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+        self.signing_key, self.verification_key = self._load_keys()
+        self.token_cache = TokenCache(
+            max_size=int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+            max_ttl=int(os.getenv("TOKEN_CACHE_TTL", "300"))
+        )
     
-    def hash_password(self, password: str) -> str:
-        """Hash password using SHA-256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+    def _load_keys(self) -> Tuple[Optional[str], str]:
+        """Return (signing key, verification key); HS* uses SECRET_KEY for both"""
+        if self.algorithm not in ASYMMETRIC_ALGORITHMS:
+            return self.secret_key, self.secret_key
+        
+        private_key_path = os.getenv("JWT_PRIVATE_KEY_PATH")
+        public_key_path = os.getenv("JWT_PUBLIC_KEY_PATH")
+        if not public_key_path:
+            raise ValueError(f"JWT_PUBLIC_KEY_PATH is required for {self.algorithm}")
+        
+        with open(public_key_path, "r") as f:
+            public_key = f.read()
+        # Service chỉ verify token (không đăng nhập) không cần private key
+        private_key = None
+        if private_key_path:
+            with open(private_key_path, "r") as f:
+                private_key = f.read()
+        return private_key, public_key
     
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verify password against hash"""
-        return self.hash_password(plain_password) == hashed_password
+    async def hash_password(self, password: str) -> str:
+        """Hash password with salted scrypt off the event loop"""
+        return await password_hasher.hash_async(password)
     
-    def create_user(self, db: Session, user: UserCreate) -> UserResponse:
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify password against a scrypt or legacy SHA-256 hash"""
+        return await password_hasher.verify_async(plain_password, hashed_password)
+    
+    async def create_user(self, db: Session, user: UserCreate) -> UserResponse:
         """Create a new user"""
         # Check if username already exists
-        existing_user = self.get_user_by_username(db, user.username)
+        existing_user = await run_in_threadpool(self.get_user_by_username, db, user.username)
         if existing_user:
             raise ValueError("Username already exists")
         
-        hashed_password = self.hash_password(user.password)
+        hashed_password = await self.hash_password(user.password)
+        return await run_in_threadpool(self._insert_user, db, user.username, hashed_password)
+    
+    def _insert_user(self, db: Session, username: str, password_hash: str) -> UserResponse:
         db_user = User(
-            username=user.username,
-            password_hash=hashed_password
+            username=username,
+            password_hash=password_hash
         )
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
         return UserResponse.from_orm(db_user)
     
-    def authenticate_user(self, db: Session, username: str, password: str) -> Optional[UserResponse]:
+    async def authenticate_user(self, db: Session, username: str, password: str) -> Optional[UserResponse]:
         """Authenticate user with username and password"""
-        user = self.get_user_by_username(db, username)
+        user = await run_in_threadpool(self.get_user_by_username, db, username)
         if not user:
             return None
         
-        if not self.verify_password(password, user.password_hash):
+        if not await self.verify_password(password, user.password_hash):
             return None
         
+        # Hash SHA-256 cũ hoặc cost scrypt đã đổi: hash lại ngay khi biết mật khẩu đúng
+        if password_hasher.needs_rehash(user.password_hash):
+            user.password_hash = await self.hash_password(password)
+            await run_in_threadpool(db.commit)
+        
         return UserResponse.from_orm(user)
     
     def get_user_by_username(self, db: Session, username: str) -> Optional[User]:
@@ -70,13 +148,26 @@ class AuthService:
         to_encode = data.copy()
         expire = datetime.utcnow() + timedelta(minutes=self.access_token_expire_minutes)
         to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
+        if self.signing_key is None:
+            raise ValueError("JWT_PRIVATE_KEY_PATH is required to issue tokens")
+        encoded_jwt = jwt.encode(to_encode, self.signing_key, algorithm=self.algorithm)
         return encoded_jwt
     
     def verify_token(self, token: str) -> Optional[dict]:
         """Verify JWT token and return payload"""
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            payload = jwt.decode(token, self.verification_key, algorithms=[self.algorithm])
             return payload
         except jwt.PyJWTError:
             return None
+    
+    def verify_token_cached(self, token: str) -> Optional[dict]:
+        """Verify JWT token, skipping signature verification for tokens verified recently"""
+        payload = self.token_cache.get(token)
+        if payload is not None:
+            return payload
+        
+        payload = self.verify_token(token)
+        if payload is not None:
+            self.token_cache.put(token, payload)
+        return payload
@@ -0,0 +1,142 @@
+import gzip
+import logging
+import lzma
+import os
+import tarfile
+import zipfile
+import zlib
+from collections import Counter
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from app.schemas.schemas import BulkUploadItem, BulkUploadResponse
+from app.services.job_service import job_service
+from app.services.video_service import VideoService
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ZIP_EXTENSIONS = (".zip",)
+TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+# Lỗi khi đọc archive hỏng / sai định dạng (kể cả lỗi giải nén giữa chừng)
+ARCHIVE_ERRORS = (zipfile.BadZipFile, tarfile.TarError, EOFError, gzip.BadGzipFile, zlib.error, lzma.LZMAError)
+
+
+def archive_kind(filename: str) -> Optional[str]:
+    """Return "zip" or "tar" when the filename is a supported archive, else None"""
+    name = (filename or "").lower()
+    if name.endswith(ZIP_EXTENSIONS):
+        return "zip"
+    if name.endswith(TAR_EXTENSIONS):
+        return "tar"
+    return None
+
+
+def is_hidden_member(name: str) -> bool:
+    # Bỏ file hệ thống do công cụ nén thêm vào (__MACOSX/, .DS_Store, ._file)
+    return any(part.startswith(".") or part == "__MACOSX" for part in name.replace("\\", "/").split("/"))
+
+
+class BulkUploadService:
+    """Many files and/or ZIP/TAR archives in one request: one bulk insert, images share inference batches"""
+
+    def __init__(self, video_service: VideoService):
+        self.video_service = video_service
+        self.max_items = int(os.getenv("BULK_MAX_ITEMS", "500"))
+        self.images_per_job = max(1, int(os.getenv("BULK_IMAGES_PER_JOB", "64")))
+
+    async def upload_service(self, db, user_id: int, files: List[UploadFile], options: dict) -> BulkUploadResponse:
+        # Ghi file / giải nén là I/O blocking, chạy trong threadpool
+        items, stored = await run_in_threadpool(self.store_files, files)
+
+        if stored:
+            uploads = [(os.path.basename(items[index].filename), file_path, content_hash) for index, file_path, content_hash in stored]
+            registered = await self.video_service.run_db(db, self.video_service.register_uploads, user_id, uploads, options)
+
+            pending_images, pending_videos = [], []
+            for (index, file_path, _), (video, cached_plates) in zip(stored, registered):
+                item = items[index]
+                item.video = video
+                if cached_plates is not None:
+                    item.status = "completed"
+                    item.detected_plates = cached_plates
+                elif os.path.splitext(file_path)[1].lower() in self.video_service.allowed_image_extensions:
+                    pending_images.append(item)
+                else:
+                    pending_videos.append(item)
+
+            # Ảnh của mọi file được gom thành job nhiều ảnh để detect / OCR chạy theo batch chung
+            jobs = [
+                pending_images[i:i + self.images_per_job]
+                for i in range(0, len(pending_images), self.images_per_job)
+            ] + [[item] for item in pending_videos]
+            for job_items in jobs:
+                await self.queue_items(db, job_items, options)
+
+        return BulkUploadResponse(items=items, summary=dict(Counter(item.status for item in items)))
+
+    async def queue_items(self, db, job_items: List[BulkUploadItem], options: dict) -> None:
+        video_ids = [item.video.id for item in job_items]
+        try:
+            if len(video_ids) == 1:
+                job_service.submit(video_ids[0], options)
+            else:
+                job_service.submit_batch(video_ids, options)
+        except HTTPException as e:
+            # Hàng đợi đầy: các file khác trong request vẫn giữ kết quả của chúng
+            for item in job_items:
+                await self.video_service.run_db(db, self.video_service.mark_video_status, item.video.id, "failed")
+                item.status = "failed"
+                item.video.status = "failed"
+                item.detail = e.detail
+
+    def store_files(self, files: List[UploadFile]) -> Tuple[List[BulkUploadItem], List[Tuple[int, str, str]]]:
+        """Write every file / archive member to the upload dir; returns (items, [(item index, file_path, content_hash)])"""
+        items: List[BulkUploadItem] = []
+        stored: List[Tuple[int, str, str]] = []
+        for file in files:
+            try:
+                for name, source in self.iter_members(file):
+                    if len(items) >= self.max_items:
+                        items.append(BulkUploadItem(
+                            filename=name,
+                            status="rejected",
+                            detail=f"Limit of {self.max_items} files per request reached, the remaining files were not read"
+                        ))
+                        return items, stored
+                    try:
+                        file_path, content_hash = self.video_service.store_file(name, source)
+                    except HTTPException as e:
+                        items.append(BulkUploadItem(filename=name, status="rejected", detail=e.detail))
+                        continue
+                    stored.append((len(items), file_path, content_hash))
+                    items.append(BulkUploadItem(filename=name, status="queued"))
+            except ARCHIVE_ERRORS as e:
+                logger.warning(f"Could not read archive {file.filename}: {str(e)}")
+                items.append(BulkUploadItem(filename=file.filename, status="rejected", detail=f"Invalid or corrupted archive: {str(e)}"))
+        return items, stored
+
+    def iter_members(self, file: UploadFile) -> Iterator[Tuple[str, BinaryIO]]:
+        """Yield (name, readable stream) for a plain upload or for every regular file of an archive"""
+        kind = archive_kind(file.filename)
+        if kind is None:
+            yield file.filename, file.file
+        elif kind == "zip":
+            # ZIP đọc central directory ở cuối file rồi giải nén từng member theo stream
+            # (upload đã được Starlette ghi ra file tạm nên seek được, không nằm trong RAM)
+            with zipfile.ZipFile(file.file) as archive:
+                for member in archive.infolist():
+                    if member.is_dir() or is_hidden_member(member.filename):
+                        continue
+                    with archive.open(member) as source:
+                        yield member.filename, source
+        else:
+            # "r|*": đọc tuần tự từng member, tự nhận gzip / bz2 / xz
+            with tarfile.open(fileobj=file.file, mode="r|*") as archive:
+                for member in archive:
+                    if not member.isfile() or is_hidden_member(member.name):
+                        continue
+                    yield member.name, archive.extractfile(member)
@@ -0,0 +1,84 @@
+import logging
+import os
+import queue
+import threading
+import uuid
+from typing import Optional, Tuple
+import numpy as np
+import cv2
+from dotenv import load_dotenv
+from app.services.metrics import registry
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ENCODE_PARAMS = {
+    "jpg": cv2.IMWRITE_JPEG_QUALITY,
+    "webp": cv2.IMWRITE_WEBP_QUALITY,
+}
+
+
+class CropWriter:
+    """Background thread that encodes plate crops to disk through a bounded queue.
+
+    ``submit`` returns the final path immediately; files are spread over two levels of
+    sub-directories (``ab/cd/abcd....jpg``) so no single directory grows unbounded.
+    """
+
+    def __init__(self):
+        self.crops_dir = "app/upload/crops"
+        self.image_format = os.getenv("CROP_FORMAT", "jpg").lower()
+        self.quality = int(os.getenv("CROP_QUALITY", "90"))
+        self.queue_size = int(os.getenv("CROP_QUEUE_SIZE", "256"))
+        if self.image_format not in ENCODE_PARAMS:
+            raise ValueError(f"Unsupported CROP_FORMAT '{self.image_format}', expected one of {list(ENCODE_PARAMS)}")
+
+        self._queue: "queue.Queue[Tuple[str, np.ndarray]]" = queue.Queue(maxsize=self.queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        os.makedirs(self.crops_dir, exist_ok=True)
+
+    def submit(self, crop: np.ndarray) -> str:
+        """Queue a crop for writing and return its path; blocks while the queue is full"""
+        self._ensure_started()
+        name = uuid.uuid4().hex
+        crop_path = os.path.join(self.crops_dir, name[:2], name[2:4], f"{name}.{self.image_format}").replace("\\", "/")
+        self._queue.put((crop_path, crop))
+        return crop_path
+
+    @property
+    def pending(self) -> int:
+        """Crops queued but not yet written"""
+        return self._queue.qsize()
+
+    def flush(self) -> None:
+        """Wait until every submitted crop has been written"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="crop-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        params = [ENCODE_PARAMS[self.image_format], self.quality]
+        while True:
+            crop_path, crop = self._queue.get()
+            try:
+                os.makedirs(os.path.dirname(crop_path), exist_ok=True)
+                if not cv2.imwrite(crop_path, crop, params):
+                    logger.error(f"Could not write crop {crop_path}")
+            except Exception as e:
+                logger.error(f"Could not write crop {crop_path}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+
+crop_writer = CropWriter()
+
+registry.gauge("httm_crop_queue_depth", "Crops waiting for the writer thread", lambda: crop_writer.pending)
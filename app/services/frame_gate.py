@@ -0,0 +1,137 @@
+import os
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import cv2
+from app.services.metrics import frames_gated
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+MOTION_THRESHOLD = int(os.getenv("MOTION_THRESHOLD", "25"))
+MOTION_MIN_AREA = float(os.getenv("MOTION_MIN_AREA", "0.002"))
+MOTION_MAX_SKIP_SECONDS = float(os.getenv("MOTION_MAX_SKIP_SECONDS", "30"))
+MOTION_BACKGROUND_ALPHA = float(os.getenv("MOTION_BACKGROUND_ALPHA", "0.5"))
+MOTION_WIDTH = int(os.getenv("MOTION_WIDTH", "320"))
+
+
+class FrameGate:
+    """Cheap pre-filter ahead of plate detection: region-of-interest crop and motion gating.
+
+    ``roi`` is a polygon in coordinates relative to the frame size (0..1). Frames are
+    cropped to its bounding rectangle before detection, detections whose center lies
+    outside the polygon are dropped and the others are shifted back to frame coordinates.
+
+    With ``motion`` enabled, a downscaled grayscale copy of the ROI is compared with a
+    running-average background (``MOTION_BACKGROUND_ALPHA=1`` is plain frame differencing);
+    frames where less than ``MOTION_MIN_AREA`` of the ROI changed skip detection, except
+    one every ``MOTION_MAX_SKIP_SECONDS`` so slow or stopped vehicles are still read.
+    """
+
+    def __init__(self, roi: Optional[Sequence[Sequence[float]]] = None, motion: bool = False):
+        self.roi = [tuple(point) for point in roi] if roi else None
+        self.motion = motion
+        self.background: Optional[np.ndarray] = None
+        self.last_analyzed: Optional[float] = None
+        self._shape = None
+        self._rect = None
+        self._polygon = None
+        self._motion_mask = None
+
+        self.frames_seen = 0
+        self.frames_skipped = 0
+        self.detections_outside_roi = 0
+        self.roi_fraction = 1.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.roi is not None or self.motion
+
+    def _prepare(self, shape) -> None:
+        # Tính lại polygon theo pixel khi biết kích thước frame (hoặc khi kích thước thay đổi)
+        height, width = shape[:2]
+        self._shape = shape[:2]
+        if self.roi is None:
+            self._rect = (0, 0, width, height)
+            self._polygon = None
+        else:
+            points = np.array([[x * width, y * height] for x, y in self.roi], dtype=np.float32)
+            x, y, w, h = cv2.boundingRect(points)
+            x, y = max(0, x), max(0, y)
+            self._rect = (x, y, max(1, min(w, width - x)), max(1, min(h, height - y)))
+            self._polygon = points - np.array([x, y], dtype=np.float32)
+            self.roi_fraction = round(cv2.contourArea(points) / (width * height), 4)
+
+        # Mask của polygon ở độ phân giải nhỏ dùng cho motion gating
+        w, h = self._rect[2], self._rect[3]
+        scale = min(1.0, MOTION_WIDTH / w)
+        small_size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        self._motion_mask = np.full((small_size[1], small_size[0]), 255, dtype=np.uint8)
+        if self._polygon is not None:
+            self._motion_mask[:] = 0
+            cv2.fillPoly(self._motion_mask, [np.round(self._polygon * scale).astype(np.int32)], 255)
+        self.background = None
+
+    def check(self, frame: np.ndarray, timestamp: Optional[float] = None) -> Optional[np.ndarray]:
+        """Return the part of the frame to run detection on, or None when the frame can be skipped"""
+        if not self.enabled:
+            return frame
+
+        self.frames_seen += 1
+        if self._shape != frame.shape[:2]:
+            self._prepare(frame.shape)
+
+        x, y, w, h = self._rect
+        region = frame[y:y + h, x:x + w]
+        if self.motion and not self._has_motion(region, timestamp):
+            self.frames_skipped += 1
+            frames_gated.inc(result="skipped")
+            return None
+
+        self.last_analyzed = timestamp
+        frames_gated.inc(result="analyzed")
+        return region
+
+    def _has_motion(self, region: np.ndarray, timestamp: Optional[float]) -> bool:
+        mask = self._motion_mask
+        small = cv2.resize(region, (mask.shape[1], mask.shape[0]), interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        if self.background is None:
+            self.background = small.astype(np.float32)
+            return True
+
+        diff = cv2.absdiff(small, cv2.convertScaleAbs(self.background))
+        cv2.accumulateWeighted(small, self.background, MOTION_BACKGROUND_ALPHA)
+        changed = cv2.countNonZero(cv2.bitwise_and(cv2.threshold(diff, MOTION_THRESHOLD, 255, cv2.THRESH_BINARY)[1], mask))
+        if changed >= MOTION_MIN_AREA * max(1, cv2.countNonZero(mask)):
+            return True
+
+        # Không có chuyển động quá lâu thì vẫn chạy detect một lần (xe dừng đèn đỏ, đỗ xe...)
+        return timestamp is None or self.last_analyzed is None or timestamp - self.last_analyzed >= MOTION_MAX_SKIP_SECONDS
+
+    def restore(self, frame_plates: List[Dict]) -> List[Dict]:
+        """Drop detections outside the ROI polygon and shift bboxes back to frame coordinates"""
+        if self._rect is None or self.roi is None:
+            return frame_plates
+
+        x, y = self._rect[:2]
+        kept = []
+        for plate in frame_plates:
+            x1, y1, x2, y2 = plate["bbox"]
+            center = ((x1 + x2) / 2, (y1 + y2) / 2)
+            if cv2.pointPolygonTest(self._polygon, center, False) < 0:
+                self.detections_outside_roi += 1
+                continue
+            plate["bbox"] = [x1 + x, y1 + y, x2 + x, y2 + y]
+            kept.append(plate)
+        return kept
+
+    def stats(self) -> dict:
+        return {
+            "roi_fraction": self.roi_fraction,
+            "frames_gated": self.frames_seen,
+            "frames_skipped": self.frames_skipped,
+            "skip_rate": round(self.frames_skipped / self.frames_seen, 4) if self.frames_seen else 0.0,
+            "detections_outside_roi": self.detections_outside_roi,
+        }
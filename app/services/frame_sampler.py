@@ -0,0 +1,109 @@
+import logging
+from typing import Iterator, Optional, Tuple
+import numpy as np
+import cv2
+
+logger = logging.getLogger(__name__)
+
+SAMPLING_MODES = ("fixed", "adaptive")
+
+
+class FrameSampler:
+    """Yield sampled frames from a cv2.VideoCapture without decoding the skipped ones.
+
+    Skipped frames are consumed with ``grab()`` (no ``retrieve()``), and long gaps are
+    jumped over with ``CAP_PROP_POS_FRAMES`` seeking when the container supports it.
+    In ``adaptive`` mode the interval shrinks to ``min_interval`` while the caller keeps
+    reporting plates through ``report_hits``. ``start_frame`` / ``end_frame`` restrict
+    sampling to one segment ``[start_frame, end_frame)`` of the video; frame indexes and
+    timestamps stay relative to the start of the whole video.
+    """
+
+    def __init__(
+        self,
+        cap: cv2.VideoCapture,
+        interval: float = 2.0,
+        mode: str = "fixed",
+        min_interval: float = 0.5,
+        seek_threshold: int = 300,
+        start_frame: int = 0,
+        end_frame: Optional[int] = None
+    ):
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode '{mode}'")
+
+        self.cap = cap
+        self.mode = mode
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        self.base_step = max(1, int(round(self.fps * interval)))
+        self.dense_step = max(1, min(self.base_step, int(round(self.fps * min_interval))))
+        self.seek_threshold = seek_threshold
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.step = self.base_step
+        self.can_seek = True
+
+        # Thống kê để so sánh số frame decode với số frame thực sự phân tích
+        self.frames_grabbed = 0
+        self.frames_sampled = 0
+        self.frames_seeked = 0
+
+    def report_hits(self, plates_found: bool) -> None:
+        """Feed back whether the last window contained plates (adaptive mode only)"""
+        if self.mode == "adaptive":
+            self.step = self.dense_step if plates_found else self.base_step
+
+    def stats(self) -> dict:
+        return {
+            "fps": self.fps,
+            "frames_sampled": self.frames_sampled,
+            "frames_grabbed": self.frames_grabbed,
+            "frames_seeked": self.frames_seeked,
+        }
+
+    def __iter__(self) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """Yield (frame_index, timestamp_seconds, frame) for every sampled frame"""
+        position = 0
+        if self.start_frame > 0:
+            position = self._skip(0, self.start_frame)
+            if position < self.start_frame:
+                return
+
+        while True:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+
+            self.frames_sampled += 1
+            yield position, position / self.fps, frame
+            position += 1
+
+            target = position + self.step - 1
+            # Frame tiếp theo thuộc segment sau thì dừng
+            if self.end_frame is not None and target >= self.end_frame:
+                break
+            position = self._skip(position, target)
+            if position < target:
+                break
+
+    def _skip(self, position: int, target: int) -> int:
+        # Nhảy xa thì seek theo keyframe, nhảy gần thì grab() bỏ qua bước retrieve()
+        if self.can_seek and target - position >= self.seek_threshold:
+            if self.total_frames and target >= self.total_frames:
+                return position
+            if self.cap.set(cv2.CAP_PROP_POS_FRAMES, target) and int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) == target:
+                self.frames_seeked += target - position
+                return target
+
+            # Container không seek chính xác được, quay lại vị trí cũ và chỉ dùng grab()
+            logger.info("Container does not support accurate seeking, falling back to grab()")
+            self.can_seek = False
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+
+        while position < target:
+            if not self.cap.grab():
+                break
+            self.frames_grabbed += 1
+            position += 1
+        return position
@@ -0,0 +1,254 @@
+import ast
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import cv2
+from app.services.model_registry import PLATE_MODEL_PATH, OCR_MODEL_PATH, PLATE_ONNX_PATH, OCR_ONNX_PATH, onnx_model_path
+from app.services.plate_text import UNKNOWN_PLATE, clean_plate_text, split_lines
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_BACKENDS = ("torch", "onnx")
+OCR_FALLBACKS = ("easyocr", "none")
+PLATE_CHARACTERS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Mỗi backend trả về cùng một dạng: với mỗi ảnh một mảng (N, 6) [x1, y1, x2, y2, conf, cls]
+# theo tọa độ ảnh gốc, nên PlateService không phụ thuộc vào thư viện inference
+
+
+class UltralyticsDetector:
+    """Plate detector through ultralytics YOLO (PyTorch)"""
+
+    def __init__(self, model_path: str, device: str):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.device = device
+        self.names = self.model.names
+
+    def __call__(self, images: List[np.ndarray]) -> List[np.ndarray]:
+        results = self.model(images, device=self.device, verbose=False)
+        return [result.boxes.data.cpu().numpy() for result in results]
+
+
+class YoloV5HubOcr:
+    """Character detector through torch.hub ultralytics/yolov5 (needs network access or a hub cache)"""
+
+    def __init__(self, model_path: str, device: str):
+        import torch
+        self.model = torch.hub.load('ultralytics/yolov5', 'custom', path=model_path, device=device)
+        self.names = self.model.names
+
+    def __call__(self, images: List[np.ndarray]) -> List[np.ndarray]:
+        results = self.model(images)
+        return [det.cpu().numpy() for det in results.xyxy]
+
+
+def letterbox(image: np.ndarray, size: Tuple[int, int]) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """Resize keeping the aspect ratio and pad to ``size`` (h, w); returns (image, ratio, (pad_x, pad_y))"""
+    height, width = image.shape[:2]
+    ratio = min(size[0] / height, size[1] / width)
+    new_height, new_width = int(round(height * ratio)), int(round(width * ratio))
+    if (new_height, new_width) != (height, width):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+
+    pad_y, pad_x = (size[0] - new_height) // 2, (size[1] - new_width) // 2
+    canvas = np.full((size[0], size[1], 3), 114, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = image
+    return canvas, ratio, (pad_x, pad_y)
+
+
+class OnnxYoloModel:
+    """YOLO detector exported to ONNX, run with ONNX Runtime (no torch / hub dependency).
+
+    Handles both output layouts: ultralytics YOLOv8+ ``(4 + classes, anchors)`` and
+    YOLOv5 ``(anchors, 5 + classes)`` with objectness. Letterboxing, confidence filtering
+    and per-class NMS mirror the PyTorch pipelines.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        conf_threshold: float = 0.25,
+        iou_threshold: float = 0.45,
+        swap_rb: bool = True,
+        max_det: int = 300,
+        threads: int = 0,
+        providers: Optional[Sequence[str]] = None
+    ):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.inter_op_num_threads = 1
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=list(providers or ["CPUExecutionProvider"]))
+
+        model_input = self.session.get_inputs()[0]
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.input_name = model_input.name
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        if "imgsz" in metadata:
+            self.imgsz = tuple(ast.literal_eval(metadata["imgsz"]))
+        else:
+            self.imgsz = tuple(model_input.shape[2:4])
+        self.names: Dict[int, str] = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+        self.layout = metadata.get("layout", "yolov8")
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.swap_rb = swap_rb
+        self.max_det = max_det
+        self.input_dtype = np.float16 if "float16" in model_input.type else np.float32
+
+    def __call__(self, images: List[np.ndarray]) -> List[np.ndarray]:
+        if not images:
+            return []
+
+        batch, transforms = [], []
+        for image in images:
+            padded, ratio, pad = letterbox(image, self.imgsz)
+            if self.swap_rb:
+                padded = padded[:, :, ::-1]
+            batch.append(padded.transpose(2, 0, 1))
+            transforms.append((ratio, pad, image.shape[:2]))
+        batch = (np.stack(batch).astype(np.float32) / 255.0).astype(self.input_dtype)
+
+        # Model export với batch cố định thì chạy từng ảnh một
+        if self.dynamic_batch:
+            outputs = self.session.run(None, {self.input_name: batch})[0]
+        else:
+            outputs = np.concatenate([
+                self.session.run(None, {self.input_name: batch[i:i + 1]})[0]
+                for i in range(len(images))
+            ])
+
+        return [self._postprocess(prediction.astype(np.float32), *transform) for prediction, transform in zip(outputs, transforms)]
+
+    def _postprocess(self, prediction: np.ndarray, ratio: float, pad: Tuple[int, int], shape: Tuple[int, int]) -> np.ndarray:
+        if self.layout == "yolov5":
+            prediction = prediction[prediction[:, 4] > self.conf_threshold]
+            class_scores = prediction[:, 5:] * prediction[:, 4:5]
+        else:
+            prediction = prediction.T
+            class_scores = prediction[:, 4:]
+
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_scores)), class_ids]
+        keep = scores > self.conf_threshold
+        xywh, scores, class_ids = prediction[keep, :4], scores[keep], class_ids[keep]
+        if not len(scores):
+            return np.zeros((0, 6), dtype=np.float32)
+
+        top_left = xywh[:, :2] - xywh[:, 2:] / 2
+        indices = cv2.dnn.NMSBoxesBatched(
+            np.concatenate([top_left, xywh[:, 2:]], axis=1).tolist(),
+            scores.tolist(),
+            class_ids.tolist(),
+            self.conf_threshold,
+            self.iou_threshold
+        )
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        indices = indices[np.argsort(-scores[indices], kind="stable")][:self.max_det]
+
+        # Bỏ padding letterbox và đưa về tọa độ ảnh gốc
+        boxes = np.concatenate([top_left[indices], top_left[indices] + xywh[indices, 2:]], axis=1)
+        boxes -= np.array([pad[0], pad[1], pad[0], pad[1]], dtype=np.float32)
+        boxes /= ratio
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+        return np.column_stack([boxes, scores[indices], class_ids[indices]]).astype(np.float32)
+
+
+class EasyOcrFallback:
+    """Slow general-purpose OCR for crops the fast character detector could not read.
+
+    The easyocr reader (and torch) is only loaded on the first call; when it cannot be
+    loaded, e.g. on an ONNX-only node, the fallback disables itself and reads nothing.
+    """
+
+    def __init__(self, device: str = "cpu", min_height: int = 64):
+        self.device = device
+        self.min_height = min_height
+        self.available = True
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _get_reader(self):
+        if self._reader is None and self.available:
+            with self._lock:
+                if self._reader is None and self.available:
+                    try:
+                        import easyocr
+                        self._reader = easyocr.Reader(['en'], gpu=self.device != "cpu", verbose=False)
+                    except Exception as e:
+                        logger.warning(f"EasyOCR fallback disabled: {str(e)}")
+                        self.available = False
+        return self._reader
+
+    def __call__(self, images: List[np.ndarray]) -> List[str]:
+        """Read each crop; returns an empty list when the reader is not available"""
+        reader = self._get_reader()
+        if reader is None:
+            return []
+        return [self._read(reader, image) for image in images]
+
+    def _read(self, reader, image: np.ndarray) -> str:
+        if image.size == 0:
+            return UNKNOWN_PLATE
+        # Crop biển số thường rất nhỏ, phóng to để EasyOCR đọc được
+        if image.shape[0] < self.min_height:
+            scale = self.min_height / image.shape[0]
+            image = cv2.resize(image, (max(1, int(image.shape[1] * scale)), self.min_height), interpolation=cv2.INTER_CUBIC)
+
+        # "-" chỉ dùng để ngăn cách hai dòng nên bỏ "-" trong từng đoạn text
+        results = [(box, clean_plate_text(text).replace("-", "")) for box, text, _ in reader.readtext(image, allowlist=PLATE_CHARACTERS)]
+        results = [(np.asarray(box, dtype=np.float64), text) for box, text in results if text]
+        if not results:
+            return UNKNOWN_PLATE
+
+        # Biển 2 dòng: EasyOCR trả mỗi dòng một đoạn, ghép lại như assemble_plate_text ("<trên>-<dưới>")
+        centers_x = np.array([box[:, 0].mean() for box, _ in results])
+        centers_y = np.array([box[:, 1].mean() for box, _ in results])
+        heights = np.array([box[:, 1].max() - box[:, 1].min() for box, _ in results])
+        line_ids = split_lines(centers_y, heights)
+        order = np.lexsort((centers_x, line_ids))
+        lines = ["".join(results[i][1] for i in order if line_ids[i] == line) for line in (0, 1)]
+        return "-".join(line for line in lines if line)
+
+
+def load_fallback_ocr(device: str = "cpu") -> Optional[EasyOcrFallback]:
+    """Return the OCR_FALLBACK reader (not loaded until first used), or None when disabled"""
+    name = os.getenv("OCR_FALLBACK", "easyocr").lower()
+    if name not in OCR_FALLBACKS:
+        raise ValueError(f"Unknown OCR_FALLBACK '{name}', expected one of {list(OCR_FALLBACKS)}")
+    if name == "none":
+        return None
+    return EasyOcrFallback(device)
+
+
+def load_models(backend: str, device: str = "cpu"):
+    """Return (plate detector, OCR character detector) for INFERENCE_BACKEND"""
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown INFERENCE_BACKEND '{backend}', expected one of {list(INFERENCE_BACKENDS)}")
+
+    if backend == "torch":
+        return UltralyticsDetector(PLATE_MODEL_PATH, device), YoloV5HubOcr(OCR_MODEL_PATH, device)
+
+    quantized = os.getenv("ONNX_INT8", "false").lower() == "true"
+    threads = int(os.getenv("ONNX_THREADS", "0"))
+    providers = [p.strip() for p in os.getenv("ONNX_PROVIDERS", "CPUExecutionProvider").split(",") if p.strip()]
+    for path in (onnx_model_path(PLATE_ONNX_PATH, quantized), onnx_model_path(OCR_ONNX_PATH, quantized)):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found, export the models first: python -m app.export_onnx{' --int8' if quantized else ''}")
+
+    # Ngưỡng mặc định giống pipeline PyTorch: ultralytics (conf 0.25, iou 0.7), yolov5 AutoShape (conf 0.25, iou 0.45)
+    detector = OnnxYoloModel(
+        onnx_model_path(PLATE_ONNX_PATH, quantized), iou_threshold=0.7, threads=threads, providers=providers
+    )
+    # AutoShape của yolov5 nhận mảng numpy như RGB, còn crop ở đây là BGR: giữ nguyên kênh màu như khi chạy torch
+    ocr = OnnxYoloModel(
+        onnx_model_path(OCR_ONNX_PATH, quantized), iou_threshold=0.45, swap_rb=False, threads=threads, providers=providers
+    )
+    return detector, ocr
@@ -0,0 +1,360 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Optional
+from fastapi import HTTPException, status
+from app.services.metrics import registry, start_profile, timed
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# process: pool worker trong process API; database: API chỉ ghi video "pending", python -m app.worker xử lý
+JOB_QUEUES = ("process", "database")
+
+
+def _init_worker() -> None:
+    # Mỗi process worker load model một lần khi khởi động
+    from app.services.model_registry import model_registry
+    if os.getenv("MODEL_WARMUP", "true").lower() == "true":
+        model_registry.warm_up()
+
+
+def _worker_model_status() -> dict:
+    from app.services.model_registry import model_registry
+    return model_registry.status()
+
+
+def process_video_job(video_id: int, options: Optional[dict] = None, claimed: bool = False) -> dict:
+    """Run detection for one uploaded Video inside a worker process.
+
+    The pending video is claimed first, unless the caller (app.worker) already
+    did. Returns the final status and the metrics recorded by the job, which the
+    API process merges into its own registry for /metrics.
+    """
+    stages = start_profile()
+    final_status = _run_video_job(video_id, options, claimed)
+    logger.info(f"Video {video_id} {final_status}, stages: " + ", ".join(f"{stage}={seconds:.3f}s" for stage, seconds in stages.items()))
+    return {"status": final_status, "metrics": registry.drain()}
+
+
+def process_batch_job(video_ids: List[int], options: Optional[dict] = None, claimed: bool = False) -> dict:
+    """Run detection for several uploads in one worker process.
+
+    Images are decoded together so detection and OCR batches span files; videos
+    are processed one after another as in process_video_job.
+    """
+    stages = start_profile()
+    statuses = _run_batch_job(video_ids, options, claimed)
+    logger.info(f"Batch of {len(video_ids)} videos {statuses}, stages: " + ", ".join(f"{stage}={seconds:.3f}s" for stage, seconds in stages.items()))
+    return {"statuses": statuses, "metrics": registry.drain()}
+
+
+def _start_video(db, video_id: int, options: Optional[dict], claimed: bool = False):
+    """Claim the pending Video and load it; returns (video, processing options) or (None, None)"""
+    import json
+    from app.models.models import Video
+
+    if not claimed and not claim_video(db, video_id):
+        # Video đã bị xóa, hoặc lần submit khác (khôi phục lúc khởi động, process API khác) đã nhận nó
+        logger.warning(f"Video {video_id} is no longer pending, skipping job")
+        return None, None
+
+    video = db.get(Video, video_id)
+    if video is None:
+        logger.warning(f"Video {video_id} no longer exists, skipping job")
+        return None, None
+
+    # Worker của hàng đợi database chỉ nhận video_id, tham số xử lý được lưu cùng video lúc upload
+    if options is None and video.options:
+        options = json.loads(video.options)
+    return video, options or {}
+
+
+def claim_video(db, video_id: int) -> bool:
+    """Mark a pending video processing; False when it is no longer pending"""
+    from datetime import datetime
+    from app.models.models import Video
+
+    # UPDATE có điều kiện status = "pending": khi nhiều worker cùng chọn một video thì chỉ một worker thắng
+    claimed = db.query(Video).filter(Video.id == video_id, Video.status == "pending").update(
+        {"status": "processing", "started_at": datetime.utcnow()}, synchronize_session=False
+    )
+    db.commit()
+    return claimed == 1
+
+
+def fail_stale_videos(db, stale_seconds: float) -> int:
+    """Mark videos stuck in "processing" (worker crashed or was killed) as failed"""
+    from datetime import datetime, timedelta
+    from app.models.models import Video
+
+    deadline = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    failed = db.query(Video).filter(Video.status == "processing", Video.started_at < deadline).update(
+        {"status": "failed"}, synchronize_session=False
+    )
+    db.commit()
+    return failed
+
+
+def _finish_video(db, video, detected_plates, options: dict) -> str:
+    """Store the results of a processed Video (None = processing failed) and commit its final status"""
+    from app.services.video_service import VideoService
+    from app.services.crop_writer import crop_writer
+    from app.services.violation_service import ViolationService
+    from app.services.result_cache_service import ResultCacheService
+
+    if detected_plates is not None:
+        try:
+            with timed("results_write"):
+                video.log_path = VideoService().save_results(video.id, detected_plates)
+            # Lưu biển số vào bảng violations cùng transaction với status
+            with timed("violations_insert"):
+                ViolationService().save_violations(db, video.id, detected_plates)
+            # Đợi thread ghi crop xong để client không nhận crop_path chưa tồn tại
+            with timed("crop_write"):
+                crop_writer.flush()
+            video.status = "completed"
+        except Exception as e:
+            logger.exception(f"Saving results of video {video.id} failed: {str(e)}")
+            db.rollback()
+            video.status = "failed"
+    else:
+        db.rollback()
+        video.status = "failed"
+
+    with timed("db_commit"):
+        db.commit()
+
+    if video.status == "completed":
+        # Lưu kết quả vào cache để lần upload trùng nội dung sau trả về ngay
+        try:
+            ResultCacheService().store(db, video.content_hash, options, detected_plates)
+        except Exception as e:
+            logger.warning(f"Could not cache results of video {video.id}: {str(e)}")
+    return video.status
+
+
+def _run_video_job(video_id: int, options: Optional[dict] = None, claimed: bool = False) -> str:
+    from app.database import SessionLocal
+    from app.services.video_service import VideoService
+    from app.services.result_stream_service import result_stream_service
+
+    db = SessionLocal()
+    try:
+        video, options = _start_video(db, video_id, options, claimed)
+        if video is None:
+            return "skipped"
+
+        # stream_results chỉ chọn cách trả kết quả, không phải tham số xử lý frame
+        processing_options = {key: value for key, value in options.items() if key != "stream_results"}
+        event_log = result_stream_service.open_log(video_id) if options.get("stream_results") else None
+
+        detected_plates = None
+        try:
+            with timed("process_video"):
+                if event_log is not None:
+                    # Ghi từng biển số ngay khi xác nhận được, client theo dõi qua GET /videos/{id}/events
+                    detected_plates = event_log.run(video.filepath, processing_options)
+                else:
+                    detected_plates = VideoService().handle_logic_video(video.filepath, **processing_options)
+        except Exception as e:
+            logger.exception(f"Processing video {video_id} failed: {str(e)}")
+        final_status = _finish_video(db, video, detected_plates, options)
+        if event_log is not None:
+            event_log.close(final_status)
+        return final_status
+    finally:
+        db.close()
+
+
+def _run_batch_job(video_ids: List[int], options: Optional[dict] = None, claimed: bool = False) -> Dict[int, str]:
+    from app.database import SessionLocal
+    from app.services.video_service import VideoService
+
+    video_service = VideoService()
+    statuses = {}
+    images, videos = [], []
+    db = SessionLocal()
+    try:
+        for video_id in video_ids:
+            video, video_options = _start_video(db, video_id, options, claimed)
+            if video is None:
+                statuses[video_id] = "skipped"
+            elif os.path.splitext(video.filepath)[1].lower() in video_service.allowed_image_extensions:
+                images.append((video, video_options))
+            else:
+                videos.append((video.id, video_options))
+        db.commit()
+
+        if images:
+            try:
+                with timed("process_images"):
+                    images_plates = video_service.handle_logic_images([(video.filepath, image_options) for video, image_options in images])
+            except Exception as e:
+                logger.exception(f"Processing {len(images)} images failed: {str(e)}")
+                images_plates = [None] * len(images)
+            for (video, image_options), detected_plates in zip(images, images_plates):
+                statuses[video.id] = _finish_video(db, video, detected_plates, image_options)
+    finally:
+        db.close()
+
+    # Video trong batch vẫn được xử lý lần lượt, mỗi video tự gom frame thành batch
+    for video_id, video_options in videos:
+        # Video đã được nhận ở vòng trên
+        statuses[video_id] = _run_video_job(video_id, video_options, claimed=True)
+    return statuses
+
+
+def _mark_failed(video_id: int) -> None:
+    from app.database import SessionLocal
+    from app.models.models import Video
+
+    db = SessionLocal()
+    try:
+        video = db.get(Video, video_id)
+        if video is not None and video.status in ("pending", "processing"):
+            video.status = "failed"
+            db.commit()
+    finally:
+        db.close()
+
+
+class JobService:
+    """Bounded process pool that runs video processing jobs off the API event loop"""
+
+    def __init__(self):
+        self.queue = os.getenv("JOB_QUEUE", "process").lower()
+        if self.queue not in JOB_QUEUES:
+            raise ValueError(f"Unknown JOB_QUEUE '{self.queue}', expected one of {list(JOB_QUEUES)}")
+        self.max_workers = int(os.getenv("VIDEO_WORKERS", "1"))
+        self.max_queue_size = int(os.getenv("VIDEO_QUEUE_SIZE", "16"))
+        self.recover_on_start = os.getenv("JOB_RECOVER_ON_START", "true").lower() == "true"
+        # Video "processing" lâu hơn ngưỡng này coi như đã mất worker (cùng biến với app.worker)
+        self.stale_seconds = float(os.getenv("WORKER_STALE_SECONDS", "3600"))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._status_future: Optional[Future] = None
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue_size)
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active_jobs(self) -> int:
+        """Number of jobs queued or running"""
+        return self._active
+
+    def start(self) -> None:
+        # Hàng đợi database: process API không giữ model, job do các process app.worker xử lý
+        if self.queue == "database":
+            return
+        with self._lock:
+            if self._executor is None:
+                # spawn tránh fork process đang giữ CUDA context / thread của torch
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+                # Probe một worker để biết model đã load xong chưa (dùng cho /health)
+                self._status_future = self._executor.submit(_worker_model_status)
+
+    def recover(self) -> None:
+        """Fail stale "processing" videos and re-queue "pending" ones left by a previous API run (process mode)"""
+        if self.queue == "database" or not self.recover_on_start:
+            # Hàng đợi database: app.worker tự lấy video pending và đánh dấu failed video bị treo
+            return
+        threading.Thread(target=self._recover, name="job-recovery", daemon=True).start()
+
+    def _recover(self) -> None:
+        from app.database import SessionLocal
+        from app.models.models import Video
+
+        db = SessionLocal()
+        try:
+            # Chỉ video quá WORKER_STALE_SECONDS: video mới hơn có thể đang chạy ở process API khác (rolling restart)
+            failed = fail_stale_videos(db, self.stale_seconds)
+            pending = [video_id for (video_id,) in db.query(Video.id).filter(Video.status == "pending").order_by(Video.id)]
+        except Exception as e:
+            logger.error(f"Could not recover unfinished videos: {str(e)}")
+            return
+        finally:
+            db.close()
+
+        if failed:
+            logger.warning(f"Marked {failed} stale processing videos as failed")
+        if pending:
+            logger.info(f"Re-queueing {len(pending)} pending videos")
+        for video_id in pending:
+            # Chờ slot trống thay vì trả 503 như upload mới; tham số xử lý được đọc lại từ video.
+            # Video đang chờ trong pool của process khác vẫn chỉ chạy một lần nhờ claim_video
+            self._slots.acquire()
+            self._dispatch([video_id], process_video_job, video_id, None)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def model_status(self) -> dict:
+        """Model status as reported by an inference worker"""
+        if self.queue == "database":
+            return {"loaded": False, "error": None}
+        future = self._status_future
+        if future is None or not future.done():
+            return {"loaded": False}
+        if future.exception() is not None:
+            return {"loaded": False, "error": str(future.exception())}
+        return future.result()
+
+    def submit(self, video_id: int, options: Optional[dict] = None) -> None:
+        """Queue a video for processing, or raise 503 when the queue is full"""
+        self._submit([video_id], process_video_job, video_id, options)
+
+    def submit_batch(self, video_ids: List[int], options: Optional[dict] = None) -> None:
+        """Queue several uploads as one job (one queue slot), so their images share inference batches"""
+        self._submit(video_ids, process_batch_job, video_ids, options)
+
+    def _submit(self, video_ids: List[int], fn, *args) -> None:
+        if self.queue == "database":
+            # Video đã được lưu với status "pending" và tham số xử lý, worker sẽ tự lấy
+            return
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Processing queue is full, please retry later"
+            )
+        self._dispatch(video_ids, fn, *args)
+
+    def _dispatch(self, video_ids: List[int], fn, *args) -> None:
+        """Submit a job for which a queue slot is already held"""
+        self.start()
+        with self._lock:
+            self._active += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(lambda f: self._on_done(video_ids, f))
+
+    def _on_done(self, video_ids: List[int], future: Future) -> None:
+        with self._lock:
+            self._active -= 1
+        self._slots.release()
+
+        if not future.cancelled() and future.exception() is None:
+            registry.merge(future.result()["metrics"])
+
+        if future.cancelled() or future.exception() is not None:
+            # Worker chết giữa chừng (OOM, crash...) nên không tự cập nhật được status
+            if not future.cancelled():
+                logger.error(f"Job for videos {video_ids} crashed: {future.exception()}")
+            for video_id in video_ids:
+                _mark_failed(video_id)
+
+
+job_service = JobService()
+
+registry.gauge("httm_video_jobs_active", "Video jobs queued or running", lambda: job_service.active_jobs)
+registry.gauge("httm_video_queue_capacity", "Maximum number of queued or running video jobs", lambda: job_service.max_workers + job_service.max_queue_size)
@@ -0,0 +1,215 @@
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Bucket (giây) cho các stage: từ vài ms (ghi chunk, commit) đến vài phút (xử lý cả video)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Breakdown theo stage của request hiện tại, chỉ bật khi client gửi header profiling
+_profile: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("profile", default=None)
+
+
+def _label_key(labels: dict) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+    def drain(self) -> dict:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: dict) -> None:
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets) + (math.inf,)
+        # label key -> (số lượng theo từng bucket, tổng, số mẫu)
+        self._values: Dict[LabelKey, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, (('le', _format_value(bound)),))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+    def drain(self) -> dict:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: dict) -> None:
+        with self._lock:
+            for key, (counts, total, count) in values.items():
+                entry = self._values.get(key)
+                if entry is None:
+                    entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+                entry[2] += count
+
+
+class Gauge:
+    """Value read at scrape time; with ``label`` the callback returns {label value: number}"""
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], object], label: Optional[str] = None):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.label = label
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self.callback()
+        except Exception:
+            return lines
+        samples = [(((self.label, str(k)),), v) for k, v in value.items()] if self.label else [((), value)]
+        for key, sample in samples:
+            if sample is not None:
+                lines.append(f"{self.name}{_format_labels(key)} {_format_value(sample)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._register(name, lambda: Counter(name, documentation))
+
+    def histogram(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(name, lambda: Histogram(name, documentation, buckets))
+
+    def gauge(self, name: str, documentation: str, callback: Callable[[], object], label: Optional[str] = None) -> Gauge:
+        with self._lock:
+            self._metrics[name] = Gauge(name, documentation, callback, label)
+            return self._metrics[name]
+
+    def _register(self, name: str, factory):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def drain(self) -> dict:
+        """Take and reset counters/histograms, so a worker process can ship them to the API process"""
+        with self._lock:
+            metrics = list(self._metrics.items())
+        return {name: metric.drain() for name, metric in metrics if not isinstance(metric, Gauge)}
+
+    def merge(self, snapshot: dict) -> None:
+        with self._lock:
+            metrics = dict(self._metrics)
+        for name, values in (snapshot or {}).items():
+            metric = metrics.get(name)
+            if metric is not None and not isinstance(metric, Gauge):
+                metric.merge(values)
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram("httm_stage_seconds", "Time spent in each processing stage")
+frames_decoded = registry.counter("httm_frames_decoded_total", "Video frames read from the container (analyzed + skipped with grab)")
+frames_analyzed = registry.counter("httm_frames_analyzed_total", "Video frames sent to plate detection")
+frames_gated = registry.counter("httm_frames_gated_total", "Sampled frames by motion gate result (analyzed / skipped)")
+plates_detected = registry.counter("httm_plates_detected_total", "Plate boxes returned by the detector")
+plates_recognized = registry.counter("httm_plates_recognized_total", "OCR reads by result (read / unknown)")
+ocr_stage_reads = registry.counter("httm_ocr_stage_reads_total", "Crops read by each OCR cascade stage (fast / fallback) by result (valid / invalid / unknown)")
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Record the duration of a stage in the histogram and, when profiling, in the request breakdown"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_seconds.observe(elapsed, stage=stage)
+        profile = _profile.get()
+        if profile is not None:
+            profile[stage] = profile.get(stage, 0.0) + elapsed
+
+
+def start_profile() -> Dict[str, float]:
+    # Dict dùng chung, các thread của run_in_threadpool copy context nên vẫn ghi vào cùng một dict
+    profile: Dict[str, float] = {}
+    _profile.set(profile)
+    return profile
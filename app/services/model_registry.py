@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PLATE_MODEL_PATH = "app/AI_model/Model_plate.pt"
+OCR_MODEL_PATH = "app/AI_model/OCR.pt"
+PLATE_ONNX_PATH = "app/AI_model/Model_plate.onnx"
+OCR_ONNX_PATH = "app/AI_model/OCR.onnx"
+
+_model_fingerprint: Optional[str] = None
+
+
+def onnx_model_path(path: str, quantized: bool = False) -> str:
+    """Path of the exported ONNX model, or of its INT8-quantized variant"""
+    return path[:-len(".onnx")] + ".int8.onnx" if quantized else path
+
+
+def backend_model_paths() -> list:
+    """Model files used by the configured INFERENCE_BACKEND"""
+    if os.getenv("INFERENCE_BACKEND", "torch").lower() == "onnx":
+        quantized = os.getenv("ONNX_INT8", "false").lower() == "true"
+        return [onnx_model_path(PLATE_ONNX_PATH, quantized), onnx_model_path(OCR_ONNX_PATH, quantized)]
+    return [PLATE_MODEL_PATH, OCR_MODEL_PATH]
+
+
+def model_fingerprint() -> str:
+    """SHA-256 over the model files and OCR fallback, so cached results are invalidated when a model or backend changes"""
+    global _model_fingerprint
+    if _model_fingerprint is None:
+        digest = hashlib.sha256()
+        # OCR fallback thay đổi kết quả đọc biển số nên cũng là một phần của fingerprint
+        digest.update(os.getenv("OCR_FALLBACK", "easyocr").lower().encode())
+        for model_path in backend_model_paths():
+            digest.update(model_path.encode())
+            if not os.path.exists(model_path):
+                digest.update(b"missing")
+                continue
+            with open(model_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+        _model_fingerprint = digest.hexdigest()
+    return _model_fingerprint
+
+
+def resolve_device(requested: str) -> str:
+    """Resolve INFERENCE_DEVICE (auto/cpu/cuda/cuda:N) to a concrete torch device string"""
+    requested = (requested or "auto").strip().lower()
+    if requested == "cpu":
+        return "cpu"
+
+    import torch
+    if not torch.cuda.is_available():
+        if requested != "auto":
+            logger.warning(f"Device '{requested}' requested but CUDA is not available, falling back to CPU")
+        return "cpu"
+
+    return "cuda" if requested == "auto" else requested
+
+
+class ModelRegistry:
+    """Process-wide holder for the loaded PlateService models"""
+
+    def __init__(self):
+        self.requested_device = os.getenv("INFERENCE_DEVICE", "auto")
+        self.backend = os.getenv("INFERENCE_BACKEND", "torch").lower()
+        self.device: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.loaded_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self._plate_service = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._plate_service is not None
+
+    def get_plate_service(self):
+        """Return the shared PlateService, loading the models on first use"""
+        if self._plate_service is None:
+            with self._lock:
+                if self._plate_service is None:
+                    self._load()
+        return self._plate_service
+
+    def warm_up(self) -> None:
+        """Load the models eagerly; errors are recorded instead of raised so the API can still start"""
+        try:
+            self.get_plate_service()
+        except Exception as e:
+            logger.error(f"Model warm-up failed: {str(e)}")
+
+    def status(self) -> dict:
+        return {
+            "loaded": self.is_loaded,
+            "backend": self.backend,
+            "device": self.device,
+            "load_seconds": self.load_seconds,
+            "loaded_at": self.loaded_at,
+            "error": self.error,
+        }
+
+    def create_plate_service(self):
+        """Load a separate PlateService with the same backend / device (for threads that cannot share models)"""
+        from app.services.plate_service import PlateService
+        # Backend onnx chạy trên CPU qua ONNX Runtime, không cần import torch để dò CUDA
+        device = "cpu" if self.backend == "onnx" else resolve_device(self.requested_device)
+        return PlateService(device=device, backend=self.backend)
+
+    def _load(self) -> None:
+        started = time.perf_counter()
+        try:
+            plate_service = self.create_plate_service()
+        except Exception as e:
+            self.error = str(e)
+            raise
+
+        self.device = plate_service.device
+        self.load_seconds = round(time.perf_counter() - started, 3)
+        self.loaded_at = datetime.utcnow()
+        self.error = None
+        self._plate_service = plate_service
+        logger.info(f"Plate models loaded with {self.backend} backend on {self.device} in {self.load_seconds}s")
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,104 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from fastapi import HTTPException, status
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+SCRYPT_PREFIX = "scrypt"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+class PasswordHasher:
+    """Salted scrypt password hashes computed on a dedicated bounded thread pool"""
+
+    def __init__(self):
+        self.n = int(os.getenv("SCRYPT_N", "16384"))
+        self.r = int(os.getenv("SCRYPT_R", "8"))
+        self.p = int(os.getenv("SCRYPT_P", "1"))
+        self.salt_size = 16
+        self.key_size = 32
+        self.max_workers = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.max_queue_size = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "64"))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue_size)
+        self._lock = threading.Lock()
+
+    def _scrypt(self, password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        # Bộ nhớ scrypt cần ~128*n*r*p byte, maxmem mặc định của OpenSSL (32MB) không đủ khi tăng cost
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=n, r=r, p=p,
+            maxmem=256 * n * r * p + 1024 * 1024, dklen=self.key_size
+        )
+
+    def hash(self, password: str) -> str:
+        """Return 'scrypt$n$r$p$salt$hash' for the password (blocking)"""
+        salt = secrets.token_bytes(self.salt_size)
+        derived = self._scrypt(password, salt, self.n, self.r, self.p)
+        return f"{SCRYPT_PREFIX}${self.n}${self.r}${self.p}${_b64encode(salt)}${_b64encode(derived)}"
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        """Check a password against a scrypt hash or a legacy unsalted SHA-256 hex digest (blocking)"""
+        if not password_hash.startswith(SCRYPT_PREFIX + "$"):
+            legacy = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(legacy, password_hash)
+
+        try:
+            _, n, r, p, salt, expected = password_hash.split("$")
+            derived = self._scrypt(password, _b64decode(salt), int(n), int(r), int(p))
+        except ValueError:
+            return False
+        return hmac.compare_digest(derived, _b64decode(expected))
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True for legacy SHA-256 hashes and scrypt hashes made with other cost parameters"""
+        return not password_hash.startswith(f"{SCRYPT_PREFIX}${self.n}${self.r}${self.p}$")
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run(self.hash, password)
+
+    async def verify_async(self, password: str, password_hash: str) -> bool:
+        return await self._run(self.verify, password, password_hash)
+
+    async def _run(self, fn, *args):
+        # hashlib.scrypt nhả GIL nên thread pool riêng đủ để không chặn event loop,
+        # và không chiếm threadpool chung của Starlette khi login dồn dập
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent login requests, please retry later"
+            )
+        try:
+            return await asyncio.wrap_future(self._get_executor().submit(fn, *args))
+        finally:
+            self._slots.release()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -1,100 +1,164 @@
-from ultralytics import YOLO
-import cv2
 import os
-import uuid
 from typing import List, Dict, Optional
 import numpy as np
-import torch
-import easyocr
+from app.services.plate_text import UNKNOWN_PLATE, assemble_plate_text, vote_plate_text, is_valid_plate
+from app.services.metrics import timed, plates_detected, plates_recognized, ocr_stage_reads
+from app.services.plate_tracker import PlateTrack
+from app.services.crop_writer import crop_writer
+from app.services.inference_backend import load_models, load_fallback_ocr
 
 class PlateService:
-    def __init__(self):
-        self.plate_model = YOLO("app/AI_model/Model_plate.pt")
-        self.ocr_model = torch.hub.load('ultralytics/yolov5', 'custom', path='app/AI_model/OCR.pt')
-        self.easyocr_reader = easyocr.Reader(['en'], gpu=True)
-        self.crops_dir = "app/upload/crops"
-        os.makedirs(self.crops_dir, exist_ok=True)
+    def __init__(self, device: str = "cpu", backend: str = "torch"):
+        self.device = device
+        self.backend = backend
+        # plate_model / ocr_model: ảnh -> mảng (N, 6) [x1, y1, x2, y2, conf, cls] cho mỗi ảnh
+        self.plate_model, self.ocr_model = load_models(backend, device)
+        # OCR chậm chỉ chạy cho crop mà OCR nhanh đọc không ra biển hợp lệ, model load ở lần dùng đầu tiên
+        self.fallback_ocr = load_fallback_ocr(device)
+        self.ocr_batch_size = int(os.getenv("OCR_BATCH_SIZE", "64"))
     
     def recognize_text_from_crop(self, crop_image: np.ndarray) -> str:
         # Nhận diện text từ ảnh crop biển số 
-        results = self.ocr_model(crop_image)
-        bb_list = results.pandas().xyxy[0].values.tolist()
-        
-        # Validate số lượng ký tự detect được
-        if len(bb_list) == 0 or len(bb_list) < 7 or len(bb_list) > 10:
-            return "unknown"
-        
-        # Tính tọa độ center của mỗi ký tự
-        center_list = []
-        y_sum = 0
-        
-        for bb in bb_list:
-            x_c = (bb[0] + bb[2]) / 2
-            y_c = (bb[1] + bb[3]) / 2
-            y_sum += y_c
-            center_list.append([x_c, y_c, bb[-1]])
-        
-        # Tính y trung bình để chia 2 dòng
-        y_mean = int(y_sum / len(bb_list))
+        return self.recognize_text_from_crops([crop_image])[0]
+    
+    def recognize_text_from_crops(self, crop_images: List[np.ndarray]) -> List[str]:
+        # Nhận diện text cho nhiều crop trong một lần gọi model OCR
+        if not crop_images:
+            return []
         
-        # Chia ký tự thành 2 dòng dựa trên y_mean
-        line_1 = []
-        line_2 = []
+        with timed("ocr"):
+            # Dùng trực tiếp mảng [x1, y1, x2, y2, conf, cls], không dựng DataFrame cho từng crop
+            plate_texts = [assemble_plate_text(boxes, self.ocr_model.names) for boxes in self.ocr_model(crop_images)]
+        failed = self.count_stage_reads("fast", plate_texts)
         
-        for c in center_list:
-            if int(c[1]) > y_mean:
-                line_2.append(c)
-            else:
-                line_1.append(c)
+        # Cascade: chỉ crop không đúng định dạng biển số Việt Nam mới qua OCR fallback
+        if failed and self.fallback_ocr is not None and self.fallback_ocr.available:
+            with timed("ocr_fallback"):
+                fallback_texts = self.fallback_ocr([crop_images[i] for i in failed])
+            self.count_stage_reads("fallback", fallback_texts)
+            for i, text in zip(failed, fallback_texts):
+                # Fallback cũng không ra biển hợp lệ thì giữ kết quả của OCR nhanh như trước
+                if is_valid_plate(text):
+                    plate_texts[i] = text
         
-        # Sắp xếp ký tự theo tọa độ x và ghép thành chuỗi
-        license_plate = ""
-        for l1 in sorted(line_1, key=lambda x: x[0]):
-            license_plate += str(l1[2])
-        license_plate += "-"
-        for l2 in sorted(line_2, key=lambda x: x[0]):
-            license_plate += str(l2[2])
-        
-        return license_plate
+        unknown = sum(1 for text in plate_texts if text == UNKNOWN_PLATE)
+        plates_recognized.inc(len(plate_texts) - unknown, result="read")
+        plates_recognized.inc(unknown, result="unknown")
+        return plate_texts
+     
+    @staticmethod
+    def count_stage_reads(stage: str, plate_texts: List[str]) -> List[int]:
+        # Đếm kết quả của một tầng OCR, trả về vị trí các crop chưa đọc ra biển hợp lệ
+        failed = []
+        for i, text in enumerate(plate_texts):
+            if is_valid_plate(text):
+                ocr_stage_reads.inc(stage=stage, result="valid")
+                continue
+            ocr_stage_reads.inc(stage=stage, result="unknown" if text == UNKNOWN_PLATE else "invalid")
+            failed.append(i)
+        return failed
      
     def detect_and_recognize(self, image: np.ndarray, timestamp: Optional[float] = None, frame_number: Optional[int] = None) -> List[Dict]:
         # Detect biển số từ ảnh và nhận diện text
-        results = self.plate_model(image, verbose=False)
-        detected_plates = []
+        return self.detect_and_recognize_batch([image], [timestamp], [frame_number])
+    
+    def detect_and_recognize_batch(
+        self,
+        images: List[np.ndarray],
+        timestamps: Optional[List[Optional[float]]] = None,
+        frame_numbers: Optional[List[Optional[int]]] = None
+    ) -> List[Dict]:
+        # Detect biển số cho cả batch ảnh, sau đó OCR toàn bộ crop trong một lần gọi
+        detected_plates = [
+            plate_data
+            for frame_plates in self.detect_plates_batch(images, timestamps, frame_numbers)
+            for plate_data in frame_plates
+        ]
+        
+        # Nhận diện text cho tất cả crop của batch
+        plate_texts = self.recognize_text_from_crops([plate_data["crop"] for plate_data in detected_plates])
+        for plate_data, plate_text in zip(detected_plates, plate_texts):
+            plate_data["plate_number"] = plate_text
         
-        for result in results:
-            boxes = result.boxes
+        return self.save_crops(detected_plates)
+    
+    def detect_plates_batch(
+        self,
+        images: List[np.ndarray],
+        timestamps: Optional[List[Optional[float]]] = None,
+        frame_numbers: Optional[List[Optional[int]]] = None
+    ) -> List[List[Dict]]:
+        # Chỉ detect vùng biển số (chưa OCR), trả về danh sách detection cho từng ảnh
+        if not images:
+            return []
+        
+        timestamps = timestamps or [None] * len(images)
+        frame_numbers = frame_numbers or [None] * len(images)
+        with timed("detect"):
+            results = self.plate_model(images)
+        
+        frames_plates = []
+        for image, boxes, timestamp, frame_number in zip(images, results, timestamps, frame_numbers):
+            frame_plates = []
             for box in boxes:
                 # Lấy tọa độ bbox và confidence
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                confidence = float(box.conf[0])
+                x1, y1, x2, y2 = map(int, box[:4])
+                confidence = float(box[4])
                 
-                # Crop vùng biển số
-                crop = image[y1:y2, x1:x2]
+                # Crop vùng biển số, giữ trong bộ nhớ đến khi lọc trùng xong mới ghi ra đĩa
+                # (copy để không giữ cả frame khi tracker giữ crop)
+                crop = image[y1:y2, x1:x2].copy()
                 
-                # Lưu crop vào thư mục
-                crop_filename = f"{uuid.uuid4()}.jpg"
-                crop_path = os.path.join(self.crops_dir, crop_filename)
-                cv2.imwrite(crop_path, crop)
-                
-                # Nhận diện text từ crop
-                plate_text = self.recognize_text_from_crop(crop)
-                
-                # Tạo dict chứa thông tin biển số
-                plate_data = {
-                    "plate_number": plate_text,
+                frame_plates.append({
+                    "crop": crop,
                     "confidence": confidence,
-                    "crop_path": crop_path.replace("\\", "/"),
                     "bbox": [x1, y1, x2, y2],
                     "timestamp": timestamp,
                     "frame_number": frame_number
-                }
-                
-                detected_plates.append(plate_data)
+                })
+            frames_plates.append(frame_plates)
         
-        return detected_plates
+        plates_detected.inc(sum(len(frame_plates) for frame_plates in frames_plates))
+        return frames_plates
+    
+    def recognize_tracks(self, tracks: List[PlateTrack]) -> List[Dict]:
+        # OCR vài crop tốt nhất của mỗi track rồi vote từng ký tự để ra một biển số
+        detections = [detection for track in tracks for detection in track.best_detections]
+        plate_texts = []
+        for i in range(0, len(detections), self.ocr_batch_size):
+            plate_texts.extend(self.recognize_text_from_crops([d["crop"] for d in detections[i:i + self.ocr_batch_size]]))
+        
+        recognized_plates = []
+        text_index = 0
+        for track in tracks:
+            reads = []
+            for detection in track.best_detections:
+                reads.append((plate_texts[text_index], detection["confidence"]))
+                text_index += 1
+            
+            best = track.best
+            recognized_plates.append({
+                "plate_number": vote_plate_text(reads),
+                "crop": best["crop"],
+                "confidence": best["confidence"],
+                "bbox": best["bbox"],
+                "timestamp": best["timestamp"],
+                "frame_number": best["frame_number"],
+                "track_id": track.track_id
+            })
+        
+        return recognized_plates
+    
+    @staticmethod
+    def save_crops(plates: List[Dict]) -> List[Dict]:
+        # Đưa crop của các biển số còn lại sau khi lọc trùng cho thread ghi file
+        with timed("crop_write"):
+            for plate in plates:
+                plate["crop_path"] = crop_writer.submit(plate.pop("crop"))
+        return plates
     
-    def get_unique_plates(self, detected_plates: List[Dict]) -> List[Dict]:
+    @staticmethod
+    def get_unique_plates(detected_plates: List[Dict]) -> List[Dict]:
         # Lọc biển số trùng lặp, giữ biển có confidence cao nhất
         unique_plates_dict = {}
         
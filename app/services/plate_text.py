@@ -0,0 +1,134 @@
+import re
+from collections import defaultdict
+from typing import TYPE_CHECKING, Sequence, Union, Dict, List, Tuple
+
+# numpy chỉ cần cho phần ghép ký tự OCR; tìm kiếm biển số ở process API không import numpy
+if TYPE_CHECKING:
+    import numpy as np
+
+UNKNOWN_PLATE = "unknown"
+
+# Các ký tự OCR hay nhầm lẫn được gộp về cùng một ký tự khi tìm kiếm gần đúng
+CONFUSABLE_CHARS = str.maketrans({
+    "O": "0", "Q": "0", "D": "0",
+    "I": "1", "L": "1", "J": "1",
+    "Z": "2",
+    "S": "5",
+    "G": "6",
+    "B": "8",
+})
+
+# Định dạng biển số Việt Nam sau khi bỏ dấu chấm / khoảng trắng, "-" ngăn cách hai dòng:
+# - ô tô 1 dòng: 51F12345, 30LD12345; xe máy 1 dòng: 59X112345
+# - biển 2 dòng (xe máy, xe tải): 59X1-12345, 29AA-1234, 51F-12345
+# - xe nước ngoài / ngoại giao: 80NG12345, 41NN-12345
+VN_PLATE_PATTERNS = (
+    re.compile(r"^\d{2}-?[A-Z][A-Z0-9]?-?\d{4,5}$"),
+    re.compile(r"^\d{2}(NG|NN|QT|CV)-?\d{3,5}$"),
+)
+
+
+def split_lines(centers_y: "np.ndarray", heights: "np.ndarray", gap_ratio: float = 0.5) -> "np.ndarray":
+    """Assign each character to line 0 (top) or 1 (bottom).
+
+    Characters are sorted by their vertical center and split at the largest gap
+    between neighbours; the plate is treated as one line when that gap is smaller
+    than ``gap_ratio`` times the median character height.
+    """
+    import numpy as np
+
+    line_ids = np.zeros(len(centers_y), dtype=np.int64)
+    if len(centers_y) < 2:
+        return line_ids
+
+    order = np.argsort(centers_y, kind="stable")
+    gaps = np.diff(centers_y[order])
+    split_at = int(np.argmax(gaps))
+    if gaps[split_at] < gap_ratio * float(np.median(heights)):
+        return line_ids
+
+    line_ids[order[split_at + 1:]] = 1
+    return line_ids
+
+
+def assemble_plate_text(
+    boxes: "np.ndarray",
+    names: Union[Sequence[str], Dict[int, str]],
+    min_chars: int = 7,
+    max_chars: int = 10
+) -> str:
+    """Build the plate string from raw OCR detections.
+
+    ``boxes`` is an (N, 6) array of ``[x1, y1, x2, y2, conf, cls]`` rows as returned by
+    ``results.xyxy[i]``. Two-line plates are joined as ``"<top>-<bottom>"``, one-line
+    plates are returned as-is.
+    """
+    import numpy as np
+
+    # Validate số lượng ký tự detect được
+    if len(boxes) < min_chars or len(boxes) > max_chars:
+        return UNKNOWN_PLATE
+
+    boxes = np.asarray(boxes, dtype=np.float64)
+    centers_x = (boxes[:, 0] + boxes[:, 2]) / 2
+    centers_y = (boxes[:, 1] + boxes[:, 3]) / 2
+    heights = boxes[:, 3] - boxes[:, 1]
+
+    # Chia dòng theo khoảng trống lớn nhất, sau đó sắp xếp theo (dòng, x)
+    line_ids = split_lines(centers_y, heights)
+    order = np.lexsort((centers_x, line_ids))
+    labels = [str(names[int(cls)]) for cls in boxes[order, 5]]
+
+    if not line_ids.any():
+        return "".join(labels)
+
+    top_count = int(np.count_nonzero(line_ids == 0))
+    return "".join(labels[:top_count]) + "-" + "".join(labels[top_count:])
+
+
+def vote_plate_text(candidates: List[Tuple[str, float]]) -> str:
+    """Confidence-weighted per-character vote over OCR reads of the same physical plate.
+
+    Only reads with the most common (weighted) length take part in the character vote,
+    so a single dropped or extra character does not shift every position.
+    """
+    reads = [(text, weight) for text, weight in candidates if text and text != UNKNOWN_PLATE]
+    if not reads:
+        return UNKNOWN_PLATE
+
+    length_weights: Dict[int, float] = defaultdict(float)
+    for text, weight in reads:
+        length_weights[len(text)] += weight
+    length = max(length_weights, key=length_weights.get)
+
+    position_votes: List[Dict[str, float]] = [defaultdict(float) for _ in range(length)]
+    for text, weight in reads:
+        if len(text) != length:
+            continue
+        for position, char in enumerate(text):
+            position_votes[position][char] += weight
+
+    return "".join(max(votes, key=votes.get) for votes in position_votes)
+
+
+def clean_plate_text(text: str) -> str:
+    """Uppercase, drop dots / spaces / stray symbols and keep "-" as the line separator (" 51f-123.45 " -> "51F-12345")"""
+    return "".join(char for char in text.upper() if (char.isascii() and char.isalnum()) or char == "-").strip("-")
+
+
+def is_valid_plate(text: str) -> bool:
+    """True when the text matches one of the Vietnamese plate formats"""
+    if not text or text == UNKNOWN_PLATE:
+        return False
+    text = clean_plate_text(text)
+    return any(pattern.match(text) for pattern in VN_PLATE_PATTERNS)
+
+
+def normalize_plate(plate: str) -> str:
+    """Canonical form for exact/prefix search: uppercase letters and digits only ("51F-123.45" -> "51F12345")"""
+    return "".join(char for char in plate.upper() if char.isascii() and char.isalnum())
+
+
+def fold_plate(plate: str) -> str:
+    """Normalized form with OCR-confusable characters folded together, used for fuzzy search"""
+    return normalize_plate(plate).translate(CONFUSABLE_CHARS)
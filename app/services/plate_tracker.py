@@ -0,0 +1,132 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+
+
+def bbox_iou(a: List[int], b: List[int]) -> float:
+    x1 = max(a[0], b[0])
+    y1 = max(a[1], b[1])
+    x2 = min(a[2], b[2])
+    y2 = min(a[3], b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def centroid_distance(a: List[int], b: List[int]) -> float:
+    """Distance between box centers, relative to the diagonal of box ``a``"""
+    ax, ay = (a[0] + a[2]) / 2, (a[1] + a[3]) / 2
+    bx, by = (b[0] + b[2]) / 2, (b[1] + b[3]) / 2
+    diagonal = max(1.0, float(np.hypot(a[2] - a[0], a[3] - a[1])))
+    return float(np.hypot(ax - bx, ay - by)) / diagonal
+
+
+class PlateTrack:
+    def __init__(self, track_id: int, detection: Dict, sample_index: int):
+        self.track_id = track_id
+        self.bbox = detection["bbox"]
+        self.first_seen = sample_index
+        self.last_seen = sample_index
+        self.hits = 0
+        # Chỉ giữ vài crop tốt nhất để OCR, không giữ toàn bộ detection của track
+        self.best_detections: List[Dict] = []
+
+    def add(self, detection: Dict, sample_index: int, max_crops: int) -> None:
+        self.bbox = detection["bbox"]
+        self.last_seen = sample_index
+        self.hits += 1
+        self.best_detections.append(detection)
+        self.best_detections.sort(key=lambda d: d["confidence"], reverse=True)
+        del self.best_detections[max_crops:]
+
+    @property
+    def best(self) -> Dict:
+        return self.best_detections[0]
+
+
+class PlateTracker:
+    """Greedy IoU tracker with a centroid-distance fallback for sparsely sampled frames.
+
+    Detections are dicts with at least ``bbox`` and ``confidence``; each is attached to
+    the active track it overlaps most, or starts a new track.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_distance: float = 1.0, max_missed: int = 1, max_crops: int = 3):
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.max_crops = max_crops
+        self.tracks: List[PlateTrack] = []
+        self._next_id = 1
+        self._sample_index = -1
+
+    def update(self, detections: List[Dict]) -> List[PlateTrack]:
+        """Match the detections of one sampled frame to tracks; returns the track of each detection"""
+        self._sample_index += 1
+        active = [t for t in self.tracks if self._sample_index - t.last_seen <= self.max_missed]
+
+        # Ghép cặp (track, detection) theo IoU giảm dần, fallback khoảng cách tâm
+        candidates = []
+        for ti, track in enumerate(active):
+            for di, detection in enumerate(detections):
+                iou = bbox_iou(track.bbox, detection["bbox"])
+                if iou >= self.iou_threshold:
+                    candidates.append((1.0 + iou, ti, di))
+                    continue
+                distance = centroid_distance(track.bbox, detection["bbox"])
+                if distance <= self.max_distance:
+                    candidates.append((1.0 - distance / self.max_distance, ti, di))
+        candidates.sort(reverse=True)
+
+        assigned: List[Optional[PlateTrack]] = [None] * len(detections)
+        used_tracks = set()
+        for _, ti, di in candidates:
+            if ti in used_tracks or assigned[di] is not None:
+                continue
+            used_tracks.add(ti)
+            assigned[di] = active[ti]
+
+        for di, detection in enumerate(detections):
+            track = assigned[di]
+            if track is None:
+                track = PlateTrack(self._next_id, detection, self._sample_index)
+                self._next_id += 1
+                self.tracks.append(track)
+                assigned[di] = track
+            track.add(detection, self._sample_index, self.max_crops)
+
+        return assigned
+
+    def expire(self) -> List[PlateTrack]:
+        """Drop tracks that can no longer be matched and return them (long-running streams)"""
+        expired = [t for t in self.tracks if self._sample_index - t.last_seen > self.max_missed]
+        if expired:
+            self.tracks = [t for t in self.tracks if self._sample_index - t.last_seen <= self.max_missed]
+        return expired
+
+
+class DedupWindow:
+    """Plate numbers reported within the last ``seconds`` of video time.
+
+    Used when results are streamed: a plate read again while still in the window
+    is a duplicate, older entries are forgotten so memory does not grow with the
+    video length (the same plate passing again later is reported again).
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.suppressed = 0
+        self._last_seen: "OrderedDict[str, float]" = OrderedDict()
+
+    def admit(self, plate_number: str, now: float) -> bool:
+        """Record ``plate_number`` at video time ``now``; False if it was already reported in the window"""
+        # Các entry được sắp theo lần thấy cuối, entry cũ nhất nằm đầu
+        while self._last_seen and now - next(iter(self._last_seen.values())) > self.seconds:
+            self._last_seen.popitem(last=False)
+
+        duplicate = plate_number in self._last_seen
+        self._last_seen[plate_number] = now
+        self._last_seen.move_to_end(plate_number)
+        if duplicate:
+            self.suppressed += 1
+        return not duplicate
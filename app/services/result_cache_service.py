@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.models import ModelFingerprint, ResultCache
+from app.schemas.schemas import PlateDetectionResult
+from app.services.model_registry import model_fingerprint
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCacheService:
+    """Detection results keyed by file content, model checksums and processing options, with LRU eviction"""
+
+    def __init__(self):
+        self.enabled = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+        self.max_entries = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+        self.max_bytes = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+        # JOB_QUEUE=database: process API không có file model, dùng fingerprint do worker công bố
+        self.use_published_fingerprint = os.getenv("JOB_QUEUE", "process").lower() == "database"
+        self.fingerprint_ttl = 60.0
+        self._published_fingerprint: Optional[str] = None
+        self._published_checked_at = 0.0
+
+    def build_key(self, content_hash: str, options: dict, fingerprint: Optional[str] = None) -> str:
+        # Đổi model hoặc tham số lấy mẫu thì key khác, cache cũ tự động không còn được dùng
+        raw = f"{content_hash}:{fingerprint or model_fingerprint()}:{json.dumps(options, sort_keys=True)}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def current_fingerprint(self, db: Session) -> Optional[str]:
+        """Fingerprint of the models that would process a new upload; None when no worker has published one yet"""
+        if not self.use_published_fingerprint:
+            return model_fingerprint()
+        if time.monotonic() - self._published_checked_at >= self.fingerprint_ttl:
+            row = db.query(ModelFingerprint.fingerprint).order_by(ModelFingerprint.published_at.desc()).first()
+            self._published_fingerprint = row.fingerprint if row else None
+            self._published_checked_at = time.monotonic()
+        return self._published_fingerprint
+
+    def publish_fingerprint(self, db: Session) -> None:
+        """Record the fingerprint of this worker's models (refreshed periodically, the latest one wins)"""
+        fingerprint = model_fingerprint()
+        entry = db.query(ModelFingerprint).filter(ModelFingerprint.fingerprint == fingerprint).first()
+        if entry is None:
+            entry = ModelFingerprint(fingerprint=fingerprint)
+            db.add(entry)
+        entry.published_at = datetime.utcnow()
+        db.commit()
+
+    def lookup(self, db: Session, content_hash: str, options: dict) -> Optional[List[PlateDetectionResult]]:
+        """Cached plates or None; a hit updates last_used_at, committed by the caller's transaction"""
+        if not self.enabled or not content_hash:
+            return None
+
+        fingerprint = self.current_fingerprint(db)
+        if fingerprint is None:
+            return None
+        entry = db.query(ResultCache).filter(ResultCache.cache_key == self.build_key(content_hash, options, fingerprint)).first()
+        if entry is None:
+            return None
+
+        entry.last_used_at = datetime.utcnow()
+        return [PlateDetectionResult(**plate) for plate in json.loads(entry.results)]
+
+    def store(self, db: Session, content_hash: str, options: dict, plates: List[PlateDetectionResult]) -> None:
+        if not self.enabled or not content_hash:
+            return
+
+        cache_key = self.build_key(content_hash, options)
+        results = json.dumps([plate.model_dump() for plate in plates], ensure_ascii=False)
+        entry = db.query(ResultCache).filter(ResultCache.cache_key == cache_key).first()
+        if entry is None:
+            entry = ResultCache(cache_key=cache_key, content_hash=content_hash)
+            db.add(entry)
+        entry.results = results
+        entry.size = len(results)
+        entry.last_used_at = datetime.utcnow()
+        db.commit()
+
+        self.evict(db)
+
+    def evict(self, db: Session) -> int:
+        """Delete least recently used entries until both the entry and byte limits hold"""
+        count, total_size = db.query(func.count(ResultCache.id), func.coalesce(func.sum(ResultCache.size), 0)).one()
+        if count <= self.max_entries and total_size <= self.max_bytes:
+            return 0
+
+        evict_ids = []
+        for entry_id, size in db.query(ResultCache.id, ResultCache.size).order_by(ResultCache.last_used_at).yield_per(500):
+            if count <= self.max_entries and total_size <= self.max_bytes:
+                break
+            evict_ids.append(entry_id)
+            count -= 1
+            total_size -= size
+
+        db.query(ResultCache).filter(ResultCache.id.in_(evict_ids)).delete(synchronize_session=False)
+        db.commit()
+        logger.info(f"Evicted {len(evict_ids)} result cache entries")
+        return len(evict_ids)
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from app.database import SessionLocal
+from app.models.models import Video
+from app.schemas.schemas import PlateDetectionResult
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = ("completed", "failed")
+
+
+class EventLog:
+    """Append-only NDJSON file with the events of one streamed job: a line per plate, then a summary"""
+
+    def __init__(self, path: str, dedup_seconds: float):
+        from app.services.plate_tracker import DedupWindow
+
+        self.path = path
+        self.window = DedupWindow(dedup_seconds)
+        self.plates = 0
+        self.started_at = time.perf_counter()
+        self._file = open(path, "w", encoding="utf-8")
+
+    def run(self, file_path: str, options: dict) -> List[PlateDetectionResult]:
+        """Process the video, appending plates as soon as they are confirmed; returns all reported plates"""
+        from app.services.crop_writer import crop_writer
+        from app.services.video_service import VideoService
+
+        for plates in VideoService().iter_video_plate_batches(file_path, self.window, **options):
+            # Crop phải có trên đĩa trước khi client nhận được crop_path (đợi một lần cho cả batch)
+            crop_writer.flush()
+            self.write(*({"type": "plate", **plate.model_dump()} for plate in plates))
+        # Không giữ list biển số suốt quá trình xử lý: đọc lại từ event log khi xong
+        return self.read_plates()
+
+    def write(self, *events: dict) -> None:
+        for event in events:
+            self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+            if event["type"] == "plate":
+                self.plates += 1
+        self._file.flush()
+
+    def read_plates(self) -> List[PlateDetectionResult]:
+        with open(self.path, "r", encoding="utf-8") as f:
+            events = (json.loads(line) for line in f if line.strip())
+            return [
+                PlateDetectionResult(**{key: value for key, value in event.items() if key != "type"})
+                for event in events if event["type"] == "plate"
+            ]
+
+    def close(self, status: str) -> None:
+        """Write the summary event (after the final status is committed) that ends the stream"""
+        self.write({
+            "type": "summary",
+            "status": status,
+            "plates": self.plates,
+            "duplicates_suppressed": self.window.suppressed,
+            "processing_seconds": round(time.perf_counter() - self.started_at, 3)
+        })
+        self._file.close()
+
+
+class ResultStreamService:
+    """Follow the event log of a job so clients get plates while the video is still being processed"""
+
+    def __init__(self):
+        self.result_dir = "app/upload/results"
+        self.poll_interval = float(os.getenv("RESULT_STREAM_POLL_INTERVAL", "0.5"))
+        self.dedup_seconds = float(os.getenv("RESULT_STREAM_DEDUP_SECONDS", "60"))
+        self.status_interval = max(self.poll_interval, 2.0)
+        self.summary_grace_seconds = 10.0
+        # Comment SSE / dòng trống NDJSON khi lâu không có event, để proxy không cắt kết nối
+        self.keepalive_interval = float(os.getenv("RESULT_STREAM_KEEPALIVE_SECONDS", "15"))
+        os.makedirs(self.result_dir, exist_ok=True)
+
+    def events_path(self, video_id: int) -> str:
+        return os.path.join(self.result_dir, f"{video_id}.events.ndjson").replace("\\", "/")
+
+    def open_log(self, video_id: int) -> EventLog:
+        return EventLog(self.events_path(video_id), self.dedup_seconds)
+
+    def video_state(self, video_id: int) -> Tuple[Optional[str], Optional[str]]:
+        db = SessionLocal()
+        try:
+            row = db.query(Video.status, Video.log_path).filter(Video.id == video_id).first()
+            return (row.status, row.log_path) if row else (None, None)
+        finally:
+            db.close()
+
+    def _open_events(self, path: str):
+        return open(path, "r", encoding="utf-8") if os.path.exists(path) else None
+
+    async def follow(self, video_id: int, after: int = -1) -> AsyncIterator[Tuple[Optional[int], Optional[dict]]]:
+        """Yield (event id, event) from the job's event log until the summary event; ``after`` skips
+        the events a reconnecting client already has (SSE Last-Event-ID). (None, None) is a keepalive."""
+        path = self.events_path(video_id)
+        event_id = -1
+        source = None
+        buffer = ""
+        status_checked_at = 0.0
+        final_since = None
+        sent_at = time.monotonic()
+        try:
+            while True:
+                # Mở / đọc file trong threadpool, không chặn event loop
+                if source is None:
+                    source = await run_in_threadpool(self._open_events, path)
+
+                lines = []
+                if source is not None:
+                    # Chỉ xử lý dòng đã ghi đủ (kết thúc bằng "\n"), phần còn lại chờ lần đọc sau
+                    buffer += await run_in_threadpool(source.read)
+                    *lines, buffer = buffer.split("\n")
+
+                for line in lines:
+                    event_id += 1
+                    event = json.loads(line)
+                    if event_id > after:
+                        sent_at = time.monotonic()
+                        yield event_id, event
+                    if event["type"] == "summary":
+                        return
+
+                if time.monotonic() - sent_at >= self.keepalive_interval:
+                    sent_at = time.monotonic()
+                    yield None, None
+
+                # Không có event mới: thỉnh thoảng hỏi database trạng thái video
+                if not lines and time.monotonic() - status_checked_at >= self.status_interval:
+                    status_checked_at = time.monotonic()
+                    status, log_path = await run_in_threadpool(self.video_state, video_id)
+                    if status in FINAL_STATUSES and source is None and not await run_in_threadpool(os.path.exists, path):
+                        # Video không xử lý ở chế độ stream (hoặc lấy từ cache): phát lại kết quả đã lưu
+                        for event in self.replay_events(status, log_path):
+                            event_id += 1
+                            if event_id > after:
+                                yield event_id, event
+                        return
+                    if status in FINAL_STATUSES or status is None:
+                        final_since = final_since or time.monotonic()
+                        # Job xong mà không có summary (worker bị kill): đóng stream thay vì chờ mãi
+                        if status is None or time.monotonic() - final_since >= self.summary_grace_seconds:
+                            yield event_id + 1, {"type": "summary", "status": status or "failed", "plates": None}
+                            return
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            if source is not None:
+                await run_in_threadpool(source.close)
+
+    def replay_events(self, status: str, log_path: Optional[str]) -> List[dict]:
+        from app.services.video_service import VideoService
+
+        plates = VideoService().load_results(log_path) if status == "completed" and log_path else []
+        return [{"type": "plate", **plate.model_dump()} for plate in plates] + [
+            {"type": "summary", "status": status, "plates": len(plates)}
+        ]
+
+    @staticmethod
+    def format_sse(event_id: Optional[int], event: Optional[dict]) -> str:
+        if event is None:
+            return ": keepalive\n\n"
+        return f"id: {event_id}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    @staticmethod
+    def format_ndjson(event_id: Optional[int], event: Optional[dict]) -> str:
+        if event is None:
+            return "\n"
+        return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+result_stream_service = ResultStreamService()
@@ -0,0 +1,113 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+from app.services.metrics import registry
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def _init_segment_worker(threads: int) -> None:
+    # Chia đều CPU cho các worker, tránh mỗi process dùng tất cả các core (oversubscription)
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ.setdefault("ONNX_THREADS", str(threads))
+    if os.getenv("INFERENCE_BACKEND", "torch").lower() == "torch":
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+    from app.services.job_service import _init_worker
+    _init_worker()
+
+
+def process_segment(
+    file_path: str,
+    start_frame: int,
+    end_frame: Optional[int],
+    sample_interval: float,
+    sampling_mode: str,
+    roi: Optional[List[List[float]]] = None,
+    motion_gating: bool = False
+) -> Tuple[List[dict], dict]:
+    """Decode and run inference on one segment in a worker process; returns (plates with crops, metrics)"""
+    from app.services.video_service import VideoService
+
+    plates = VideoService().detect_segment(file_path, sample_interval, sampling_mode, start_frame, end_frame, roi, motion_gating)
+    return plates, registry.drain()
+
+
+class SegmentService:
+    """Process pool that runs the time segments of one long video in parallel, each worker with its own decoder and models"""
+
+    def __init__(self):
+        workers = int(os.getenv("SEGMENT_WORKERS", "1"))
+        self.max_workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.min_segment_seconds = float(os.getenv("SEGMENT_MIN_SECONDS", "120"))
+        self.threads_per_worker = max(1, (os.cpu_count() or 1) // self.max_workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Giữ pool giữa các job để model chỉ load một lần cho mỗi worker
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_segment_worker,
+                    initargs=(self.threads_per_worker,)
+                )
+            return self._executor
+
+    def run(
+        self,
+        file_path: str,
+        segments: List[Tuple[int, Optional[int]]],
+        sample_interval: float,
+        sampling_mode: str,
+        roi: Optional[List[List[float]]] = None,
+        motion_gating: bool = False
+    ) -> List[dict]:
+        """Process all segments in parallel and concatenate their plates in segment order"""
+        executor = self._get_executor()
+        futures = [
+            executor.submit(process_segment, file_path, start_frame, end_frame, sample_interval, sampling_mode, roi, motion_gating)
+            for start_frame, end_frame in segments
+        ]
+
+        detected_plates = []
+        track_offset = 0
+        for future in futures:
+            try:
+                plates, metrics = future.result()
+            except BrokenProcessPool:
+                # Worker chết (OOM...) làm hỏng cả pool, tạo pool mới cho job sau
+                self.shutdown()
+                raise
+            registry.merge(metrics)
+            # Mỗi segment đánh số track từ 1, dời id để track_id vẫn duy nhất trong cả video
+            for plate in plates:
+                plate["track_id"] += track_offset
+            track_offset = max([track_offset] + [plate["track_id"] for plate in plates])
+            detected_plates.extend(plates)
+
+        logger.info(f"Processed {file_path} in {len(segments)} segments, {len(detected_plates)} tracks")
+        return detected_plates
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+segment_service = SegmentService()
@@ -0,0 +1,455 @@
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import urlparse
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from app.schemas.schemas import PlateDetectionResult, ProcessingOptions
+from app.services.model_registry import model_registry
+from app.services.metrics import registry
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+NETWORK_SCHEMES = ("rtsp", "rtsps", "rtmp", "http", "https")
+
+# (frame JPEG bytes hoặc ndarray, frame_number, timestamp, thời điểm nhận frame)
+StreamFrame = Tuple[object, int, float, float]
+
+
+def parse_allowed_sources(value: str) -> Tuple[set, list]:
+    """Split STREAM_ALLOWED_SOURCES into (host names, IP networks)"""
+    hosts, networks = set(), []
+    for entry in (part.strip().lower() for part in value.split(",")):
+        if not entry:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(entry, strict=False))
+        except ValueError:
+            hosts.add(entry)
+    return hosts, networks
+
+
+def percentile(values, fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))], 2)
+
+
+class FrameSlot:
+    """Thread-safe single-frame mailbox: a new frame replaces the one still waiting.
+
+    Inference always takes the most recent frame, so a slow model drops frames
+    instead of building an unbounded backlog.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._frame: Optional[StreamFrame] = None
+        self._event = asyncio.Event()
+        self.closed = False
+        self.received = 0
+        self.dropped = 0
+
+    @property
+    def busy(self) -> bool:
+        """True while a frame is still waiting for inference"""
+        with self._lock:
+            return self._frame is not None
+
+    def put(self, frame: StreamFrame) -> None:
+        with self._lock:
+            self.received += 1
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+        self._loop.call_soon_threadsafe(self._event.set)
+
+    def drop(self) -> None:
+        """Count a frame that was skipped without being decoded"""
+        with self._lock:
+            self.received += 1
+            self.dropped += 1
+
+    def close(self) -> None:
+        self.closed = True
+        self._loop.call_soon_threadsafe(self._event.set)
+
+    async def get(self) -> Optional[StreamFrame]:
+        """Wait for the next frame; None once the slot is closed and empty"""
+        while True:
+            self._event.clear()
+            with self._lock:
+                frame, self._frame = self._frame, None
+            if frame is not None:
+                return frame
+            if self.closed:
+                return None
+            await self._event.wait()
+
+
+class StreamSession:
+    """Tracker state of one stream; reports each plate once, when its track is confirmed"""
+
+    def __init__(self, get_plate_service: Callable, tracker, confirm_hits: int):
+        from app.services.frame_gate import FrameGate
+
+        # Model lấy theo thread inference đang chạy frame, không giữ cố định cho cả session
+        self.get_plate_service = get_plate_service
+        self.tracker = tracker
+        self.confirm_hits = confirm_hits
+        self.gate = FrameGate()
+        self.reported_tracks = set()
+        self.started_at = time.perf_counter()
+        self.frames_processed = 0
+        self.frames_invalid = 0
+        self.plates_reported = 0
+        self.latencies_ms = deque(maxlen=1000)
+        self.inference_ms = deque(maxlen=1000)
+
+    def process_frame(self, stream_frame: StreamFrame) -> List[dict]:
+        """Detect, track and OCR newly confirmed plates of one frame (runs on the inference thread)"""
+        import numpy as np
+        import cv2
+        from app.services.crop_writer import crop_writer
+
+        payload, frame_number, timestamp, received_at = stream_frame
+        started = time.perf_counter()
+        plate_service = self.get_plate_service()
+
+        # Frame JPEG từ client chỉ được decode khi thực sự chạy inference (frame bị drop không tốn CPU)
+        frame = payload
+        if isinstance(payload, (bytes, bytearray)):
+            frame = cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                self.frames_invalid += 1
+                return []
+
+        # Camera có thể đổi ROI giữa chừng, dùng một gate cho cả frame
+        gate = self.gate
+        frame = gate.check(frame, timestamp)
+        confirmed = []
+        if frame is not None:
+            frames_plates = plate_service.detect_plates_batch([frame], [timestamp], [frame_number])
+            self.tracker.update(gate.restore(frames_plates[0]))
+
+            confirmed = [
+                track for track in self.tracker.tracks
+                if track.hits >= self.confirm_hits and track.track_id not in self.reported_tracks
+            ]
+            # Track đã mất dấu thì bỏ khỏi tracker để bộ nhớ không tăng theo thời gian stream
+            for track in self.tracker.expire():
+                self.reported_tracks.discard(track.track_id)
+
+        plates = []
+        if confirmed:
+            self.reported_tracks.update(track.track_id for track in confirmed)
+            recognized = plate_service.recognize_tracks(confirmed)
+            plates = plate_service.save_crops(plate_service.get_unique_plates(recognized))
+            # Crop phải có trên đĩa trước khi client nhận được crop_path
+            crop_writer.flush()
+
+        finished = time.perf_counter()
+        self.frames_processed += 1
+        self.plates_reported += len(plates)
+        self.inference_ms.append((finished - started) * 1000)
+        latency_ms = round((finished - received_at) * 1000, 2)
+        self.latencies_ms.append(latency_ms)
+
+        return [
+            {
+                "type": "plate",
+                "latency_ms": latency_ms,
+                **PlateDetectionResult(
+                    plate_number=plate["plate_number"],
+                    confidence=plate["confidence"],
+                    crop_path=plate["crop_path"],
+                    bbox=plate["bbox"],
+                    timestamp=plate.get("timestamp"),
+                    frame_number=plate.get("frame_number"),
+                    track_id=plate.get("track_id")
+                ).model_dump()
+            }
+            for plate in plates
+        ]
+
+    def stats(self, slot: FrameSlot) -> dict:
+        elapsed = time.perf_counter() - self.started_at
+        return {
+            "type": "stats",
+            "elapsed_seconds": round(elapsed, 2),
+            "frames_received": slot.received,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": slot.dropped,
+            "frames_invalid": self.frames_invalid,
+            "drop_rate": round(slot.dropped / slot.received, 4) if slot.received else 0.0,
+            "processed_fps": round(self.frames_processed / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_ms": {
+                "last": self.latencies_ms[-1] if self.latencies_ms else None,
+                "p50": percentile(self.latencies_ms, 0.5),
+                "p95": percentile(self.latencies_ms, 0.95),
+            },
+            "inference_ms_avg": round(sum(self.inference_ms) / len(self.inference_ms), 2) if self.inference_ms else None,
+            "active_tracks": len(self.tracker.tracks),
+            "plates_reported": self.plates_reported,
+            "gate": self.gate.stats(),
+        }
+
+
+class StreamService:
+    """Real-time plate detection over WebSocket: JPEG frames from the client or an RTSP/HTTP/file source"""
+
+    def __init__(self):
+        self.max_sessions = int(os.getenv("STREAM_MAX_SESSIONS", "4"))
+        self.inference_workers = int(os.getenv("STREAM_INFERENCE_WORKERS", "1"))
+        self.confirm_hits = int(os.getenv("STREAM_CONFIRM_HITS", "2"))
+        self.stats_interval = float(os.getenv("STREAM_STATS_INTERVAL", "5"))
+        self.allow_file_sources = os.getenv("STREAM_ALLOW_FILE_SOURCES", "false").lower() == "true"
+        # Mặc định rỗng: không cho server tự mở URL do client gửi (tránh SSRF)
+        self.allowed_hosts, self.allowed_networks = parse_allowed_sources(os.getenv("STREAM_ALLOWED_SOURCES", ""))
+        self.track_iou_threshold = float(os.getenv("TRACK_IOU_THRESHOLD", "0.3"))
+        self.track_max_missed = int(os.getenv("STREAM_TRACK_MAX_MISSED", "5"))
+        self.track_max_crops = int(os.getenv("TRACK_MAX_CROPS", "3"))
+        # JOB_QUEUE=database: process API không load model, inference nằm ở worker
+        self.enabled = os.getenv("JOB_QUEUE", "process").lower() != "database" or \
+            os.getenv("STREAM_ENABLED_WITHOUT_WORKERS", "false").lower() == "true"
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread_models = threading.local()
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active_sessions(self) -> int:
+        return self._active
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Model không thread-safe: mỗi thread inference dùng một bản model riêng (xem _thread_plate_service)
+                self._executor = ThreadPoolExecutor(max_workers=self.inference_workers, thread_name_prefix="stream-inference")
+            return self._executor
+
+    def _thread_plate_service(self):
+        """PlateService of the calling inference thread, loaded on its first frame"""
+        plate_service = getattr(self._thread_models, "plate_service", None)
+        if plate_service is None:
+            # Một thread: dùng luôn model của registry; nhiều thread: mỗi thread load một bản (tốn RAM/VRAM tương ứng)
+            if self.inference_workers == 1:
+                plate_service = model_registry.get_plate_service()
+            else:
+                plate_service = model_registry.create_plate_service()
+            self._thread_models.plate_service = plate_service
+        return plate_service
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def is_allowed_host(self, host: Optional[str]) -> bool:
+        """True when the host is listed in STREAM_ALLOWED_SOURCES, or every address it resolves to is in a listed network"""
+        if not host:
+            return False
+        host = host.lower()
+        if host in self.allowed_hosts:
+            return True
+        if not self.allowed_networks:
+            return False
+        try:
+            addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+        except socket.gaierror:
+            return False
+        return bool(addresses) and all(
+            any(ipaddress.ip_address(address.split("%")[0]) in network for network in self.allowed_networks)
+            for address in addresses
+        )
+
+    def open_source(self, source: str) -> Tuple["cv2.VideoCapture", bool]:
+        """Open an allowed network stream or (when enabled) a local recording; returns (capture, pace to native fps)"""
+        import cv2
+
+        parsed = urlparse(source)
+        if parsed.scheme.lower() in NETWORK_SCHEMES:
+            if not self.is_allowed_host(parsed.hostname):
+                raise ValueError("Stream source host is not allowed")
+            realtime = False
+        elif self.allow_file_sources and os.path.isfile(source):
+            # File ghi sẵn đóng vai camera: đọc đúng tốc độ fps gốc
+            realtime = True
+        else:
+            raise ValueError("Unsupported stream source")
+
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            cap.release()
+            raise ValueError("Could not open stream source")
+        return cap, realtime
+
+    def capture_frames(self, cap: "cv2.VideoCapture", slot: FrameSlot, stop: threading.Event, realtime: bool) -> None:
+        """Read a capture source into the slot until EOF or stop (runs on its own thread)"""
+        import cv2
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        started = time.perf_counter()
+        frame_number = 0
+        try:
+            while not stop.is_set():
+                # Inference còn bận thì chỉ grab() để stream không bị trễ dần, bỏ qua bước decode
+                if slot.busy:
+                    if not cap.grab():
+                        break
+                    slot.drop()
+                else:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    slot.put((frame, frame_number, frame_number / fps, time.perf_counter()))
+                frame_number += 1
+
+                if realtime:
+                    delay = started + frame_number / fps - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+        finally:
+            cap.release()
+            slot.close()
+
+    async def handle_stream(self, websocket: WebSocket) -> None:
+        """Run one streaming session on an authenticated WebSocket.
+
+        Binary messages are JPEG frames; a text message {"source": url} reads frames
+        from a camera stream instead, and {"type": "stop"} ends the session. Text
+        messages may also carry "roi" / "motion_gating" to configure the frame gate.
+        """
+        # Model, cv2 và tracker chỉ được import khi có stream thật sự (process API khởi động nhẹ)
+        from app.services.plate_tracker import PlateTracker
+
+        await websocket.accept()
+        if not self.enabled:
+            await websocket.send_json({"type": "error", "detail": "Streaming is disabled on API nodes without models (JOB_QUEUE=database)"})
+            await websocket.close(code=1013)
+            return
+        # Bộ đếm chỉ được đọc / ghi trên event loop: kiểm tra và tăng liền nhau, không có await ở giữa
+        if self._active >= self.max_sessions:
+            await websocket.close(code=1013, reason="Too many active streams")
+            return
+        self._active += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(self._get_executor(), self._thread_plate_service)
+            except Exception as e:
+                logger.error(f"Stream could not load models: {str(e)}")
+                await websocket.send_json({"type": "error", "detail": "Models are not available"})
+                await websocket.close(code=1011)
+                return
+
+            tracker = PlateTracker(
+                iou_threshold=self.track_iou_threshold,
+                max_missed=self.track_max_missed,
+                max_crops=self.track_max_crops
+            )
+            session = StreamSession(self._thread_plate_service, tracker, self.confirm_hits)
+            slot = FrameSlot(loop)
+            stop = threading.Event()
+            await websocket.send_json({"type": "ready"})
+
+            receiver = asyncio.create_task(self._receive(websocket, session, slot, stop))
+            try:
+                await self._infer(websocket, session, slot)
+            finally:
+                stop.set()
+                receiver.cancel()
+
+            logger.info(f"Stream finished: {session.stats(slot)}")
+            try:
+                await websocket.send_json({**session.stats(slot), "type": "end"})
+                await websocket.close()
+            except (WebSocketDisconnect, RuntimeError):
+                pass
+        finally:
+            self._active -= 1
+
+    async def _receive(self, websocket: WebSocket, session: StreamSession, slot: FrameSlot, stop: threading.Event) -> None:
+        frame_number = 0
+        capture_thread = None
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+
+                if message.get("bytes") is not None:
+                    received_at = time.perf_counter()
+                    slot.put((message["bytes"], frame_number, received_at - session.started_at, received_at))
+                    frame_number += 1
+                    continue
+
+                try:
+                    command = json.loads(message.get("text") or "{}")
+                except ValueError:
+                    command = {}
+                if command.get("type") == "stop":
+                    break
+                if "roi" in command or "motion_gating" in command:
+                    try:
+                        options = ProcessingOptions(roi=command.get("roi"), motion_gating=bool(command.get("motion_gating")))
+                    except ValueError as e:
+                        await websocket.send_json({"type": "error", "detail": f"Invalid gate options: {str(e)}"})
+                        break
+                    from app.services.frame_gate import FrameGate
+                    session.gate = FrameGate(options.roi, options.motion_gating)
+                if command.get("source") and capture_thread is None:
+                    try:
+                        cap, realtime = await run_in_threadpool(self.open_source, command["source"])
+                    except ValueError as e:
+                        await websocket.send_json({"type": "error", "detail": str(e)})
+                        break
+                    capture_thread = threading.Thread(
+                        target=self.capture_frames, args=(cap, slot, stop, realtime), name="stream-capture", daemon=True
+                    )
+                    capture_thread.start()
+        finally:
+            # Nguồn camera tự đóng slot khi dừng hoặc hết stream
+            stop.set()
+            if capture_thread is None:
+                slot.close()
+
+    async def _infer(self, websocket: WebSocket, session: StreamSession, slot: FrameSlot) -> None:
+        loop = asyncio.get_running_loop()
+        last_stats = time.perf_counter()
+        while True:
+            stream_frame = await slot.get()
+            if stream_frame is None:
+                break
+
+            events = await loop.run_in_executor(self._get_executor(), session.process_frame, stream_frame)
+            if time.perf_counter() - last_stats >= self.stats_interval:
+                events.append(session.stats(slot))
+                last_stats = time.perf_counter()
+
+            try:
+                for event in events:
+                    await websocket.send_json(event)
+            except (WebSocketDisconnect, RuntimeError):
+                break
+
+
+stream_service = StreamService()
+
+registry.gauge("httm_stream_sessions_active", "Open streaming sessions", lambda: stream_service.active_sessions)
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+import weakref
+from typing import AsyncIterator, Optional
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from app.schemas.schemas import UploadSessionResponse
+from app.services.video_service import VideoService
+from app.services.metrics import timed
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Số byte đầu file cần có để nhận dạng magic bytes (MP4 cần tới byte thứ 12)
+SIGNATURE_BYTES = 12
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+
+class UploadSessionService:
+    """Resumable (tus-style) uploads: create a session, then PATCH bytes at the current offset"""
+
+    def __init__(self, video_service: VideoService):
+        self.video_service = video_service
+        self.partial_dir = "app/upload/partial"
+        self.session_ttl = float(os.getenv("UPLOAD_SESSION_TTL_SECONDS", "86400"))
+        self._last_sweep = 0.0
+        # Một lock cho mỗi session đang nhận PATCH, tự bị xóa khi không còn request nào giữ
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        os.makedirs(self.partial_dir, exist_ok=True)
+
+    def create_session(self, user_id: int, filename: str, upload_length: int, options: dict) -> UploadSessionResponse:
+        self.video_service.validate_extension(filename)
+        self.video_service.check_file_size(upload_length)
+        # Dọn session bị bỏ dở, tối đa vài lần mỗi TTL
+        if time.monotonic() - self._last_sweep >= min(self.session_ttl / 4, 3600):
+            self._last_sweep = time.monotonic()
+            self.sweep_expired()
+
+        upload_id = uuid.uuid4().hex
+        metadata = {
+            "user_id": user_id,
+            "filename": os.path.basename(filename),
+            "upload_length": upload_length,
+            "options": options,
+        }
+        self._save_metadata(upload_id, metadata)
+        open(self._data_path(upload_id), "wb").close()
+
+        return UploadSessionResponse(upload_id=upload_id, offset=0, upload_length=upload_length)
+
+    def get_session(self, user_id: int, upload_id: str) -> UploadSessionResponse:
+        metadata = self._load_metadata(user_id, upload_id)
+        if "result" in metadata:
+            return UploadSessionResponse(**metadata["result"])
+        return UploadSessionResponse(
+            upload_id=upload_id,
+            offset=os.path.getsize(self._data_path(upload_id)),
+            upload_length=metadata["upload_length"]
+        )
+
+    async def append_chunk(self, db, user_id: int, upload_id: str, offset: int, body: AsyncIterator[bytes]) -> UploadSessionResponse:
+        """Append the request body at ``offset``; once offset reaches upload_length the video is registered.
+
+        Repeating a PATCH after the upload completed (e.g. the response was lost)
+        returns the stored result instead of registering the video again.
+        """
+        lock = self._locks.setdefault(upload_id, asyncio.Lock())
+        # Hai PATCH cùng session chạy tuần tự: request sau đọc lại offset và nhận 409 nếu đã lệch,
+        # hoặc nhận lại kết quả nếu request trước đã hoàn tất upload
+        async with lock:
+            metadata = await run_in_threadpool(self._load_metadata, user_id, upload_id)
+            if "result" in metadata:
+                return UploadSessionResponse(**metadata["result"])
+            session = await self._append_chunk(metadata, upload_id, offset, body)
+            if session.offset == session.upload_length:
+                session = await self._finalize(db, user_id, upload_id, metadata, session)
+            return session
+
+    async def _append_chunk(self, metadata: dict, upload_id: str, offset: int, body: AsyncIterator[bytes]) -> UploadSessionResponse:
+        data_path = self._data_path(upload_id)
+        current_offset = await run_in_threadpool(os.path.getsize, data_path)
+        upload_length = metadata["upload_length"]
+
+        # Client phải gửi tiếp đúng vị trí server đã nhận được (sau khi mất mạng thì HEAD để hỏi lại)
+        if offset != current_offset:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload-Offset mismatch, server has {current_offset} bytes"
+            )
+
+        file_extension = os.path.splitext(metadata["filename"])[1].lower()
+        # Đầu file chưa đủ byte để kiểm tra magic bytes: gom thêm từ các chunk tới
+        head = await run_in_threadpool(self._read_head, data_path) if current_offset < SIGNATURE_BYTES else None
+        new_offset = current_offset
+        buffer = bytearray()
+        f = await run_in_threadpool(open, data_path, "ab")
+        try:
+            with timed("upload_write"):
+                async for chunk in body:
+                    if not chunk:
+                        continue
+                    new_offset += len(chunk)
+                    if new_offset > upload_length:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail="Chunk exceeds the declared upload length"
+                        )
+                    if head is not None:
+                        head += chunk[:SIGNATURE_BYTES - len(head)]
+                        if len(head) >= SIGNATURE_BYTES or new_offset == upload_length:
+                            self.video_service.check_file_signature(head, file_extension)
+                            head = None
+                    buffer += chunk
+                    # Ghi file trong threadpool theo khối lớn, không chặn event loop
+                    if len(buffer) >= WRITE_BUFFER_BYTES:
+                        await run_in_threadpool(f.write, bytes(buffer))
+                        buffer.clear()
+                if buffer:
+                    await run_in_threadpool(f.write, bytes(buffer))
+        except HTTPException:
+            # Bỏ toàn bộ dữ liệu của request này, offset quay về như trước khi PATCH
+            await run_in_threadpool(f.truncate, current_offset)
+            raise
+        finally:
+            await run_in_threadpool(f.close)
+
+        return UploadSessionResponse(upload_id=upload_id, offset=new_offset, upload_length=upload_length)
+
+    async def _finalize(self, db, user_id: int, upload_id: str, metadata: dict, session: UploadSessionResponse) -> UploadSessionResponse:
+        """Move the complete upload into the upload directory, register the video and store the result"""
+        file_path = self.video_service.build_upload_path(metadata["filename"])
+        await run_in_threadpool(shutil.move, self._data_path(upload_id), file_path)
+        content_hash = await run_in_threadpool(self.video_service.hash_file, file_path)
+        upload = await self.video_service.register_upload_service(
+            db, user_id, metadata["filename"], file_path, content_hash, metadata["options"]
+        )
+        session.video = upload.video
+        session.detected_plates = upload.detected_plates
+
+        # Giữ metadata kèm kết quả tới khi session hết hạn, để PATCH / HEAD lặp lại trả cùng kết quả
+        metadata["result"] = session.model_dump(mode="json")
+        await run_in_threadpool(self._save_metadata, upload_id, metadata)
+        return session
+
+    def sweep_expired(self) -> int:
+        """Delete sessions that received no bytes for UPLOAD_SESSION_TTL_SECONDS; returns how many were removed"""
+        deadline = time.time() - self.session_ttl
+        removed = 0
+        for name in os.listdir(self.partial_dir):
+            upload_id, extension = os.path.splitext(name)
+            if extension != ".json" or not upload_id.isalnum() or upload_id in self._locks:
+                continue
+            paths = [self._metadata_path(upload_id), self._data_path(upload_id)]
+            try:
+                # mtime của file .part đổi sau mỗi PATCH, nên session đang upload không bị xóa;
+                # session đã hoàn tất chỉ còn metadata (kèm kết quả) và hết hạn theo lần ghi cuối
+                if max(os.path.getmtime(path) for path in paths if os.path.exists(path)) >= deadline:
+                    continue
+                for path in paths:
+                    if os.path.exists(path):
+                        os.remove(path)
+                removed += 1
+            except OSError as e:
+                logger.warning(f"Could not remove expired upload session {upload_id}: {str(e)}")
+        if removed:
+            logger.info(f"Removed {removed} expired upload sessions")
+        return removed
+
+    def _save_metadata(self, upload_id: str, metadata: dict) -> None:
+        # Ghi file tạm rồi đổi tên: request đọc song song không thấy JSON ghi dở
+        temp_path = self._metadata_path(upload_id) + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+        os.replace(temp_path, self._metadata_path(upload_id))
+
+    def _read_head(self, data_path: str) -> bytes:
+        with open(data_path, "rb") as f:
+            return f.read(SIGNATURE_BYTES)
+
+    def _load_metadata(self, user_id: int, upload_id: str) -> dict:
+        metadata_path = self._metadata_path(upload_id)
+        metadata: Optional[dict] = None
+        if os.path.exists(metadata_path):
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+
+        if metadata is None or metadata["user_id"] != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Upload session not found"
+            )
+        return metadata
+
+    def _metadata_path(self, upload_id: str) -> str:
+        # upload_id do server sinh (uuid hex), chặn path traversal từ URL
+        if not upload_id.isalnum():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Upload session not found"
+            )
+        return os.path.join(self.partial_dir, f"{upload_id}.json")
+
+    def _data_path(self, upload_id: str) -> str:
+        return os.path.join(self.partial_dir, f"{upload_id}.part")
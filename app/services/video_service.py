@@ -1,117 +1,668 @@
+from sqlalchemy import or_, and_
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING
 from app.models.models import Video
-from app.schemas.schemas import VideoResponse, PlateDetectionResult
+from app.database import ASYNC_DB_ENABLED
+from app.schemas.schemas import VideoResponse, PlateDetectionResult, VideoDetailResponse, VideoHistoryResponse, VideoUploadResponse, ProcessingOptions
 from fastapi import UploadFile, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+import base64
+import hashlib
+import json
 import os
 import uuid
 from datetime import datetime
-from app.services.plate_service import PlateService
-import cv2
+from app.services.model_registry import model_registry
+from app.services.job_service import job_service
+from app.services.segment_service import segment_service
+from app.services.result_cache_service import ResultCacheService
+from app.services.violation_service import ViolationService
+from app.services.metrics import timed, frames_decoded, frames_analyzed
+import logging
+
+if TYPE_CHECKING:
+    from app.services.plate_tracker import DedupWindow, PlateTrack
+
+# cv2, numpy và các module inference chỉ được import trong nhánh xử lý video (worker),
+# process API chỉ upload / tra lịch sử nên không phải load chúng khi khởi động
+
+logger = logging.getLogger(__name__)
+
+result_cache_service = ResultCacheService()
+violation_service = ViolationService()
+
+# Magic bytes của các định dạng được hỗ trợ
+IMAGE_SIGNATURES = (b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n", b"GIF87a", b"GIF89a", b"BM")
+VIDEO_SIGNATURES = (b"\x1a\x45\xdf\xa3", b"FLV", b"\x30\x26\xb2\x75\x8e\x66\xcf\x11")
+MP4_BOX_TYPES = (b"ftyp", b"moov", b"mdat", b"wide", b"free", b"skip")
+
+def sniff_file_kind(header: bytes) -> Optional[str]:
+    """Return "image" or "video" based on the leading bytes of a file, or None if unknown"""
+    if header.startswith(IMAGE_SIGNATURES):
+        return "image"
+    if header.startswith(VIDEO_SIGNATURES) or header[4:8] in MP4_BOX_TYPES:
+        return "video"
+    if header[:4] == b"RIFF":
+        if header[8:12] == b"WEBP":
+            return "image"
+        if header[8:12] == b"AVI ":
+            return "video"
+    return None
 
 class VideoService:
     def __init__(self):
         self.video_upload_dir = "app/upload/videos"
         self.image_upload_dir = "app/upload/images"
+        self.result_dir = "app/upload/results"
         self.max_file_size = 100 * 1024 * 1024
+        self.upload_chunk_size = 1024 * 1024
         self.allowed_video_extensions = {".mp4", ".avi", ".mov", ".mkv", ".flv", ".wmv"}
         self.allowed_image_extensions = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"}
+        self.batch_size = max(1, int(os.getenv("INFERENCE_BATCH_SIZE", "8")))
+        self.adaptive_min_interval = float(os.getenv("ADAPTIVE_MIN_INTERVAL", "0.5"))
+        self.seek_threshold = int(os.getenv("SEEK_THRESHOLD_FRAMES", "300"))
+        self.track_iou_threshold = float(os.getenv("TRACK_IOU_THRESHOLD", "0.3"))
+        self.track_max_missed = int(os.getenv("TRACK_MAX_MISSED", "1"))
+        self.track_max_crops = int(os.getenv("TRACK_MAX_CROPS", "3"))
         
         os.makedirs(self.video_upload_dir, exist_ok=True)
         os.makedirs(self.image_upload_dir, exist_ok=True)
+        os.makedirs(self.result_dir, exist_ok=True)
     
-    def get_video_history_service(self, db: Session, user_id: int) -> List[VideoResponse]:
-        videos = db.query(Video).filter(Video.user_id == user_id).all()
-        return [VideoResponse.from_orm(video) for video in videos]
+    def build_processing_options(self, roi: Optional[str] = None, **fields) -> dict:
+        """Validate the processing form fields; ``roi`` is a JSON polygon [[x, y], ...] relative to the frame size"""
+        try:
+            if roi:
+                fields["roi"] = json.loads(roi)
+            return ProcessingOptions(**fields).model_dump()
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid processing options: {str(e)}"
+            )
     
-    async def upload_file_service(self, db: Session, user_id: int, file: UploadFile) -> VideoResponse:
-        # Kiểm tra kiểu file
-        file_extension = os.path.splitext(file.filename)[1].lower()
+    def get_video_history_service(
+        self,
+        db: Session,
+        user_id: int,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        video_status: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None
+    ) -> VideoHistoryResponse:
+        # Chỉ lấy các cột cần cho response, dùng index (user_id, created_at)
+        query = db.query(
+            Video.id, Video.filename, Video.filepath, Video.status, Video.created_at
+        ).filter(Video.user_id == user_id)
+        
+        if video_status:
+            query = query.filter(Video.status == video_status)
+        if created_from:
+            query = query.filter(Video.created_at >= created_from)
+        if created_to:
+            query = query.filter(Video.created_at < created_to)
+        
+        # Keyset pagination: lấy các bản ghi "cũ hơn" bản ghi cuối của trang trước
+        if cursor:
+            cursor_created_at, cursor_id = self.decode_cursor(cursor)
+            query = query.filter(or_(
+                Video.created_at < cursor_created_at,
+                and_(Video.created_at == cursor_created_at, Video.id < cursor_id)
+            ))
+        
+        rows = query.order_by(Video.created_at.desc(), Video.id.desc()).limit(limit + 1).all()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self.encode_cursor(rows[-1].created_at, rows[-1].id)
+        
+        return VideoHistoryResponse(
+            items=[VideoResponse.from_orm(row) for row in rows],
+            next_cursor=next_cursor
+        )
+    
+    def encode_cursor(self, created_at: datetime, video_id: int) -> str:
+        raw = json.dumps({"created_at": created_at.isoformat(), "id": video_id})
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+    
+    def decode_cursor(self, cursor: str) -> Tuple[datetime, int]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            data = json.loads(raw)
+            return datetime.fromisoformat(data["created_at"]), int(data["id"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    
+    def get_video_detail_service(self, db: Session, user_id: int, video_id: int) -> VideoDetailResponse:
+        video = db.query(Video).filter(Video.id == video_id, Video.user_id == user_id).first()
+        if not video:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Video not found"
+            )
+        
+        # Chỉ có kết quả khi job đã xử lý xong
+        detected_plates = []
+        if video.status == "completed" and video.log_path:
+            detected_plates = self.load_results(video.log_path)
+        
+        return VideoDetailResponse(
+            video=VideoResponse.from_orm(video),
+            detected_plates=detected_plates
+        )
+    
+    def check_video_owner(self, db: Session, user_id: int, video_id: int) -> None:
+        if db.query(Video.id).filter(Video.id == video_id, Video.user_id == user_id).first() is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Video not found"
+            )
+    
+    def mark_video_status(self, db: Session, video_id: int, video_status: str) -> None:
+        db.query(Video).filter(Video.id == video_id).update({"status": video_status})
+        db.commit()
+    
+    async def run_db(self, db, fn, *args):
+        # Route async không được gọi ORM blocking trên event loop:
+        # AsyncSession thì chạy hàm sync qua run_sync, Session thường thì chạy trong threadpool
+        if ASYNC_DB_ENABLED:
+            return await db.run_sync(fn, *args)
+        return await run_in_threadpool(fn, db, *args)
+    
+    async def upload_file_service(self, file: UploadFile) -> Tuple[str, str]:
+        """Stream the upload to disk and return (file_path, sha256 of the content)"""
+        return await run_in_threadpool(self.store_file, file.filename, file.file)
+    
+    def store_file(self, filename: str, source: BinaryIO) -> Tuple[str, str]:
+        """Copy a readable file object (upload, archive member) into the upload dir chunk by chunk"""
+        file_extension = self.validate_extension(filename)
+        file_path = self.build_upload_path(filename)
+        
+        # Ghi file theo từng chunk, dừng ngay khi vượt quá dung lượng cho phép
+        # Hash SHA-256 được tính trong lúc ghi để tra cache kết quả
+        file_size = 0
+        digest = hashlib.sha256()
+        try:
+            with timed("upload_write"), open(file_path, "wb") as f:
+                while True:
+                    chunk = source.read(self.upload_chunk_size)
+                    if not chunk:
+                        break
+                    
+                    # Kiểm tra nội dung thật của file qua các byte đầu tiên
+                    if file_size == 0:
+                        self.check_file_signature(chunk, file_extension)
+                    
+                    file_size += len(chunk)
+                    self.check_file_size(file_size)
+                    digest.update(chunk)
+                    f.write(chunk)
+            
+            if file_size == 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Uploaded file is empty"
+                )
+        except BaseException:
+            # Xóa file ghi dở khi upload bị từ chối hoặc bị ngắt
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+        
+        return file_path, digest.hexdigest()
+    
+    def hash_file(self, file_path: str) -> str:
+        digest = hashlib.sha256()
+        with timed("upload_hash"), open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.upload_chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    async def register_upload_service(
+        self,
+        db,
+        user_id: int,
+        filename: str,
+        file_path: str,
+        content_hash: str,
+        options: dict
+    ) -> VideoUploadResponse:
+        """Create the Video for a stored upload; answer from the result cache or queue a processing job"""
+        video_record, cached_plates = await self.run_db(db, self.register_upload, user_id, filename, file_path, content_hash, options)
+        if cached_plates is not None:
+            return VideoUploadResponse(video=video_record, detected_plates=cached_plates)
+        
+        # Đưa vào hàng đợi xử lý, client poll GET /videos/{id} để lấy kết quả
+        try:
+            job_service.submit(video_record.id, options)
+        except HTTPException:
+            await self.run_db(db, self.mark_video_status, video_record.id, "failed")
+            raise
+        
+        return VideoUploadResponse(video=video_record, detected_plates=[])
+    
+    def register_upload(
+        self,
+        db: Session,
+        user_id: int,
+        filename: str,
+        file_path: str,
+        content_hash: str,
+        options: dict
+    ) -> Tuple[VideoResponse, Optional[List[PlateDetectionResult]]]:
+        # File trùng nội dung với file đã có thì xóa bản mới, dùng lại file cũ trên đĩa
+        with timed("dedupe"):
+            file_path = self.dedupe_file(db, file_path, content_hash)
+        with timed("cache_lookup"):
+            cached_plates = result_cache_service.lookup(db, content_hash, options)
+        
+        # Tạo record trong database
+        video_record = Video(
+            user_id=user_id,
+            filename=filename,
+            filepath=file_path.replace("\\", "/"),
+            status="pending" if cached_plates is None else "completed",
+            content_hash=content_hash,
+            options=json.dumps(options),
+            created_at=datetime.utcnow()
+        )
+        db.add(video_record)
+        db.flush()
+        
+        # Cache hit: lưu kết quả và violations cho video mới, không cần xử lý lại
+        if cached_plates is not None:
+            video_record.log_path = self.save_results(video_record.id, cached_plates)
+            violation_service.save_violations(db, video_record.id, cached_plates)
+        
+        with timed("db_commit"):
+            db.commit()
+        db.refresh(video_record)
+        return VideoResponse.from_orm(video_record), cached_plates
+    
+    def dedupe_file(self, db: Session, file_path: str, content_hash: str) -> str:
+        existing_path = db.query(Video.filepath).filter(
+            Video.content_hash == content_hash
+        ).order_by(Video.id).limit(1).scalar()
+        
+        if existing_path and os.path.exists(existing_path) and os.path.abspath(existing_path) != os.path.abspath(file_path):
+            os.remove(file_path)
+            return existing_path
+        return file_path
+    
+    def register_uploads(
+        self,
+        db: Session,
+        user_id: int,
+        uploads: List[Tuple[str, str, str]],
+        options: dict
+    ) -> List[Tuple[VideoResponse, Optional[List[PlateDetectionResult]]]]:
+        """Bulk register_upload for (filename, file_path, content_hash) items: one dedupe query, one insert and one commit"""
+        # Một query lấy file đã có cho tất cả hash; file trùng nhau trong cùng batch cũng chỉ giữ một bản
+        with timed("dedupe"):
+            existing_paths: Dict[str, str] = {}
+            hashes = {content_hash for _, _, content_hash in uploads}
+            for content_hash, existing_path in db.query(Video.content_hash, Video.filepath).filter(
+                Video.content_hash.in_(hashes)
+            ).order_by(Video.id.desc()):
+                existing_paths[content_hash] = existing_path
+            
+            deduped = []
+            for filename, file_path, content_hash in uploads:
+                existing_path = existing_paths.get(content_hash)
+                if existing_path and os.path.exists(existing_path) and os.path.abspath(existing_path) != os.path.abspath(file_path):
+                    os.remove(file_path)
+                    file_path = existing_path
+                existing_paths[content_hash] = file_path
+                deduped.append((filename, file_path, content_hash))
         
+        with timed("cache_lookup"):
+            cached = [result_cache_service.lookup(db, content_hash, options) for _, _, content_hash in deduped]
+        
+        created_at = datetime.utcnow()
+        records = [
+            Video(
+                user_id=user_id,
+                filename=filename,
+                filepath=file_path.replace("\\", "/"),
+                status="pending" if cached_plates is None else "completed",
+                content_hash=content_hash,
+                options=json.dumps(options),
+                created_at=created_at
+            )
+            for (filename, file_path, content_hash), cached_plates in zip(deduped, cached)
+        ]
+        # add_all + flush: SQLAlchemy gửi một INSERT nhiều dòng (insertmanyvalues) và lấy lại id
+        db.add_all(records)
+        db.flush()
+        
+        for video_record, cached_plates in zip(records, cached):
+            if cached_plates is not None:
+                video_record.log_path = self.save_results(video_record.id, cached_plates)
+                violation_service.save_violations(db, video_record.id, cached_plates)
+        
+        # Tạo response trước khi commit (commit làm hết hạn các object, đọc lại sẽ tốn một query mỗi video)
+        responses = [VideoResponse.from_orm(video_record) for video_record in records]
+        with timed("db_commit"):
+            db.commit()
+        return list(zip(responses, cached))
+    
+    def validate_extension(self, filename: str) -> str:
         # Kiểm tra định dạng file
+        file_extension = os.path.splitext(filename or "")[1].lower()
         if file_extension not in self.allowed_video_extensions and file_extension not in self.allowed_image_extensions:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"File type not allowed. Allowed types: videos ({', '.join(self.allowed_video_extensions)}) and images ({', '.join(self.allowed_image_extensions)})"
             )
-        
-        # Kiểm tra kích thước file
-        file_content = await file.read()
-        file_size = len(file_content)
-        
+        return file_extension
+    
+    def check_file_size(self, file_size: int) -> None:
         if file_size > self.max_file_size:
             raise HTTPException(
                 status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                 detail=f"File size exceeds maximum allowed size of {self.max_file_size / (1024 * 1024)}MB"
             )
-        
+    
+    def check_file_signature(self, header: bytes, file_extension: str) -> None:
+        # So khớp magic bytes với loại file suy ra từ đuôi file
+        expected_kind = "video" if file_extension in self.allowed_video_extensions else "image"
+        if sniff_file_kind(header) != expected_kind:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File content does not match a supported {expected_kind} format"
+            )
+    
+    def build_upload_path(self, filename: str) -> str:
         # Xác định thư mục upload
-        if file_extension in self.allowed_video_extensions:
+        if os.path.splitext(filename)[1].lower() in self.allowed_video_extensions:
             upload_dir = self.video_upload_dir
         else:
             upload_dir = self.image_upload_dir
         
         # Tạo tên file duy nhất
-        unique_filename = f"{uuid.uuid4()}_{file.filename}"
-        file_path = os.path.join(upload_dir, unique_filename)
+        unique_filename = f"{uuid.uuid4()}_{os.path.basename(filename)}"
+        return os.path.join(upload_dir, unique_filename)
+    
+    def handle_logic_video(
+        self,
+        file_path: str,
+        sample_interval: float = 2.0,
+        sampling_mode: str = "fixed",
+        roi: Optional[List[List[float]]] = None,
+        motion_gating: bool = False
+    ) -> List[PlateDetectionResult]:
+        file_extension = os.path.splitext(file_path)[1].lower()
         
-        # Lưu file
-        with open(file_path, "wb") as f:
-            f.write(file_content)
+        # Video dài được chia thành các đoạn thời gian, mỗi đoạn xử lý song song trong một process riêng
+        segments = []
+        if file_extension in self.allowed_video_extensions and segment_service.max_workers > 1:
+            segments = self.plan_segments(file_path, sample_interval)
         
-        # Chuẩn hóa đường dẫn
-        normalized_path = file_path.replace("\\", "/")
+        if len(segments) > 1:
+            detected_plates = segment_service.run(file_path, segments, sample_interval, sampling_mode, roi, motion_gating)
+        else:
+            detected_plates = self.detect_segment(file_path, sample_interval, sampling_mode, roi=roi, motion_gating=motion_gating)
         
-        # Tạo record trong database
-        video_record = Video(
-            user_id=user_id,
-            filename=file.filename,
-            filepath=normalized_path,
-            status="processing",
-            created_at=datetime.utcnow()
-        )
+        return self.build_results(detected_plates)
+    
+    def plan_segments(self, file_path: str, sample_interval: float) -> List[Tuple[int, Optional[int]]]:
+        """Split a long video into [start_frame, end_frame) segments, one per segment worker"""
+        import cv2
         
-        db.add(video_record)
-        db.commit()
-        db.refresh(video_record)
+        cap = cv2.VideoCapture(file_path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        cap.release()
+        
+        duration = total_frames / fps
+        if duration < 2 * segment_service.min_segment_seconds:
+            return [(0, None)]
         
-        return VideoResponse.from_orm(video_record)
+        count = min(segment_service.max_workers, int(duration // segment_service.min_segment_seconds))
+        # Ranh giới là bội số của bước lấy mẫu: chế độ fixed lấy đúng các frame như khi chạy tuần tự
+        step = max(1, int(round(fps * sample_interval)))
+        size = -(-total_frames // (count * step)) * step
+        starts = list(range(0, total_frames, size))
+        # Đoạn cuối đọc đến hết file vì CAP_PROP_FRAME_COUNT có thể không chính xác
+        return [(start, starts[i + 1] if i + 1 < len(starts) else None) for i, start in enumerate(starts)]
     
-    def handle_logic_video(self, video_record: VideoResponse, file: UploadFile) -> List[PlateDetectionResult]:
-        plate_service = PlateService()
+    def detect_segment(
+        self,
+        file_path: str,
+        sample_interval: float = 2.0,
+        sampling_mode: str = "fixed",
+        start_frame: int = 0,
+        end_frame: Optional[int] = None,
+        roi: Optional[List[List[float]]] = None,
+        motion_gating: bool = False
+    ) -> List[dict]:
+        """Track and OCR the plates of one video segment (or an image); crops stay in memory"""
+        plate_service = model_registry.get_plate_service()
+        tracks = [
+            track
+            for finished, _ in self.iter_tracks(file_path, sample_interval, sampling_mode, start_frame, end_frame, roi, motion_gating)
+            for track in finished
+        ]
+        # OCR chỉ chạy trên các crop tốt nhất của mỗi track
+        return plate_service.recognize_tracks(tracks)
+    
+    def iter_video_plates(
+        self,
+        file_path: str,
+        window: "DedupWindow",
+        sample_interval: float = 2.0,
+        sampling_mode: str = "fixed",
+        roi: Optional[List[List[float]]] = None,
+        motion_gating: bool = False
+    ) -> Iterator[PlateDetectionResult]:
+        """Yield plates while the video is processed: decode -> detect -> track -> OCR -> rolling dedup.
+
+        A track is read as soon as it is lost, and its plate is yielded unless the
+        window already reported that number. Only active tracks and the window stay
+        in memory. The whole video runs in this process (no segment workers).
+        """
+        for plates in self.iter_video_plate_batches(file_path, window, sample_interval, sampling_mode, roi, motion_gating):
+            yield from plates
+    
+    def iter_video_plate_batches(
+        self,
+        file_path: str,
+        window: "DedupWindow",
+        sample_interval: float = 2.0,
+        sampling_mode: str = "fixed",
+        roi: Optional[List[List[float]]] = None,
+        motion_gating: bool = False
+    ) -> Iterator[List[PlateDetectionResult]]:
+        """Like iter_video_plates, but yields the new plates of each batch of finished tracks together"""
+        plate_service = model_registry.get_plate_service()
+        for finished, now in self.iter_tracks(file_path, sample_interval, sampling_mode, roi=roi, motion_gating=motion_gating, expire=True):
+            if not finished:
+                continue
+            recognized = plate_service.recognize_tracks(finished)
+            # Biển trùng trong cửa sổ bị bỏ cùng crop của nó, không ghi ra đĩa
+            new_plates = [plate for plate in recognized if window.admit(plate["plate_number"], now)]
+            if new_plates:
+                yield self.build_results(new_plates)
+    
+    def iter_tracks(
+        self,
+        file_path: str,
+        sample_interval: float = 2.0,
+        sampling_mode: str = "fixed",
+        start_frame: int = 0,
+        end_frame: Optional[int] = None,
+        roi: Optional[List[List[float]]] = None,
+        motion_gating: bool = False,
+        expire: bool = False
+    ) -> Iterator[Tuple[List["PlateTrack"], float]]:
+        """Decode, gate, detect and track one video segment (or an image); yields (finished tracks, video time).
+
+        With ``expire`` the tracks lost after each batch are yielded and dropped, so
+        memory is bounded by the active tracks; otherwise every track is yielded once
+        at the end.
+        """
+        import cv2
+        from app.services.frame_sampler import FrameSampler
+        from app.services.frame_gate import FrameGate
+        from app.services.plate_tracker import PlateTracker
         
-        file_extension = os.path.splitext(file.filename)[1].lower()
-        file_path = video_record.filepath
+        plate_service = model_registry.get_plate_service()
         
-        detected_plates = []
+        file_extension = os.path.splitext(file_path)[1].lower()
+        
+        # Gán detection qua các frame vào track, mỗi track là một biển số vật lý
+        tracker = PlateTracker(
+            iou_threshold=self.track_iou_threshold,
+            max_missed=self.track_max_missed,
+            max_crops=self.track_max_crops
+        )
+        # Chỉ detect trong vùng ROI, bỏ qua frame không có chuyển động (không tốn inference)
+        gate = FrameGate(roi, motion_gating)
+        now = 0.0
         
         if file_extension in self.allowed_video_extensions:
             cap = cv2.VideoCapture(file_path)
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_interval = int(fps * 2)
+            sampler = FrameSampler(
+                cap,
+                interval=sample_interval,
+                mode=sampling_mode,
+                min_interval=self.adaptive_min_interval,
+                seek_threshold=self.seek_threshold,
+                start_frame=start_frame,
+                end_frame=end_frame
+            )
             
-            frame_count = 0
-            frame_number = 0
+            # Gom frame thành batch để model chạy một lần cho nhiều frame
+            batch_frames = []
+            batch_timestamps = []
+            batch_frame_numbers = []
             
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                if frame_count % frame_interval == 0:
-                    timestamp = frame_count / fps
-                    plates = plate_service.detect_and_recognize(frame, timestamp=timestamp, frame_number=frame_number)
-                    detected_plates.extend(plates)
-                    frame_number += 1
+            def flush_batch():
+                frames_plates = plate_service.detect_plates_batch(batch_frames, batch_timestamps, batch_frame_numbers)
+                frames_plates = [gate.restore(frame_plates) for frame_plates in frames_plates]
+                with timed("track"):
+                    for frame_plates in frames_plates:
+                        tracker.update(frame_plates)
+                # Adaptive mode: có biển số trong cửa sổ vừa rồi thì lấy mẫu dày hơn
+                sampler.report_hits(any(frames_plates))
+                batch_frames.clear()
+                batch_timestamps.clear()
+                batch_frame_numbers.clear()
+            
+            try:
+                frames = iter(sampler)
+                while True:
+                    # Thời gian chờ frame tiếp theo = decode (read/grab/seek) của sampler
+                    with timed("decode"):
+                        sampled = next(frames, None)
+                    if sampled is None:
+                        break
+                    
+                    frame_number, now, frame = sampled
+                    with timed("gate"):
+                        frame = gate.check(frame, now)
+                    if frame is None:
+                        continue
+                    batch_frames.append(frame)
+                    batch_timestamps.append(now)
+                    batch_frame_numbers.append(frame_number)
+                    
+                    if len(batch_frames) >= self.batch_size:
+                        flush_batch()
+                        if expire:
+                            yield tracker.expire(), now
                 
-                frame_count += 1
+                # Xử lý các frame còn lại chưa đủ batch
+                if batch_frames:
+                    flush_batch()
+            finally:
+                cap.release()
             
-            cap.release()
+            frames_decoded.inc(sampler.frames_sampled + sampler.frames_grabbed)
+            frames_analyzed.inc(sampler.frames_sampled - gate.frames_skipped)
+            logger.info(f"Sampled {file_path} [{start_frame}, {end_frame}): {sampler.stats()}, gate={gate.stats()}, tracks={len(tracker.tracks)}")
         else:
-            image = cv2.imread(file_path)
-            detected_plates = plate_service.detect_and_recognize(image)
+            with timed("decode"):
+                image = cv2.imread(file_path)
+            frames_decoded.inc()
+            frames_analyzed.inc()
+            # Ảnh đơn chỉ áp dụng ROI, không có frame trước để so chuyển động
+            gate.motion = False
+            for frame_plates in plate_service.detect_plates_batch([gate.check(image)]):
+                tracker.update(gate.restore(frame_plates))
+        
+        yield tracker.tracks, now
+    
+    def handle_logic_images(self, images: List[Tuple[str, dict]]) -> List[Optional[List[PlateDetectionResult]]]:
+        """Detect and read plates on many (image path, options) items; None for images that cannot be decoded.
+
+        Detection runs on batches of ``batch_size`` images and OCR on batches of
+        crops, both across files, instead of one model call per image.
+        """
+        import cv2
+        from app.services.frame_gate import FrameGate
+        from app.services.plate_tracker import PlateTracker
         
-        unique_plates = plate_service.get_unique_plates(detected_plates)
+        plate_service = model_registry.get_plate_service()
+        
+        # Mỗi ảnh có tracker và ROI riêng, model chạy chung cho cả batch
+        trackers: List[Optional[PlateTracker]] = [None] * len(images)
+        gates: List[Optional[FrameGate]] = [None] * len(images)
+        batch_frames, batch_owners = [], []
+        
+        def flush_batch():
+            for index, frame_plates in zip(batch_owners, plate_service.detect_plates_batch(batch_frames)):
+                trackers[index].update(gates[index].restore(frame_plates))
+            batch_frames.clear()
+            batch_owners.clear()
+        
+        for index, (file_path, options) in enumerate(images):
+            with timed("decode"):
+                image = cv2.imread(file_path)
+            if image is None:
+                logger.warning(f"Could not decode image {file_path}")
+                continue
+            frames_decoded.inc()
+            frames_analyzed.inc()
+            
+            # Ảnh đơn chỉ áp dụng ROI, không có frame trước để so chuyển động
+            trackers[index] = PlateTracker(
+                iou_threshold=self.track_iou_threshold,
+                max_missed=self.track_max_missed,
+                max_crops=self.track_max_crops
+            )
+            gates[index] = FrameGate(options.get("roi"), motion=False)
+            batch_frames.append(gates[index].check(image))
+            batch_owners.append(index)
+            if len(batch_frames) >= self.batch_size:
+                flush_batch()
+        
+        if batch_frames:
+            flush_batch()
+        
+        # OCR crop của tất cả ảnh trong các batch ocr_batch_size, rồi chia lại kết quả theo ảnh
+        tracks = [track for tracker in trackers if tracker is not None for track in tracker.tracks]
+        recognized = iter(plate_service.recognize_tracks(tracks))
+        results = []
+        for tracker in trackers:
+            if tracker is None:
+                results.append(None)
+                continue
+            results.append(self.build_results([next(recognized) for _ in tracker.tracks]))
+        return results
+    
+    def build_results(self, detected_plates: List[dict]) -> List[PlateDetectionResult]:
+        from app.services.plate_service import PlateService
+        
+        # Gộp các track trùng biển số (kể cả giữa các segment), chỉ ghi crop của biển còn lại
+        with timed("dedup"):
+            unique_plates = PlateService.get_unique_plates(detected_plates)
+        unique_plates = PlateService.save_crops(unique_plates)
         
         plate_results = [
             PlateDetectionResult(
@@ -120,12 +671,25 @@ class VideoService:
                 crop_path=plate["crop_path"],
                 bbox=plate["bbox"],
                 timestamp=plate.get("timestamp"),
-                frame_number=plate.get("frame_number")
+                frame_number=plate.get("frame_number"),
+                track_id=plate.get("track_id")
             )
             for plate in unique_plates
         ]
-
-
         
         return plate_results
+    
+    def save_results(self, video_id: int, plates: List[PlateDetectionResult]) -> str:
+        # Lưu kết quả detect ra file JSON, đường dẫn được lưu vào Video.log_path
+        result_path = os.path.join(self.result_dir, f"{video_id}.json").replace("\\", "/")
+        with open(result_path, "w", encoding="utf-8") as f:
+            json.dump([plate.model_dump() for plate in plates], f, ensure_ascii=False)
+        return result_path
+    
+    def load_results(self, result_path: str) -> List[PlateDetectionResult]:
+        if not os.path.exists(result_path):
+            return []
+        with open(result_path, "r", encoding="utf-8") as f:
+            return [PlateDetectionResult(**plate) for plate in json.load(f)]
+
     
\ No newline at end of file
@@ -0,0 +1,71 @@
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from typing import List
+from fastapi import HTTPException, status
+from app.models.models import Video, Violation
+from app.schemas.schemas import PlateDetectionResult, ViolationResponse
+from app.services.plate_text import UNKNOWN_PLATE, normalize_plate, fold_plate
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    # "51F" -> "51G": điều kiện col >= "51F" AND col < "51G" dùng được index trên mọi DB
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class ViolationService:
+    def save_violations(self, db: Session, video_id: int, plates: List[PlateDetectionResult]) -> int:
+        """Bulk insert every recognized plate of a video in a single executemany round-trip (no commit)"""
+        rows = [
+            {
+                "video_id": video_id,
+                "plate_number": plate.plate_number,
+                "plate_normalized": normalize_plate(plate.plate_number),
+                "plate_key": fold_plate(plate.plate_number),
+                "timestamp_frame": None if plate.timestamp is None else f"{plate.timestamp:.2f}",
+                "snapshot_path": plate.crop_path,
+            }
+            # Bỏ các biển OCR không đọc được, không có giá trị tra cứu
+            for plate in plates
+            if plate.plate_number != UNKNOWN_PLATE
+        ]
+        if rows:
+            db.execute(insert(Violation), rows)
+        return len(rows)
+
+    def backfill_search_keys(self, db: Session, batch_size: int = 1000) -> int:
+        """Fill plate_normalized / plate_key of violations stored before these columns existed"""
+        filled = 0
+        while True:
+            rows = db.query(Violation.id, Violation.plate_number).filter(
+                Violation.plate_normalized.is_(None), Violation.plate_number.isnot(None)
+            ).order_by(Violation.id).limit(batch_size).all()
+            if not rows:
+                return filled
+            db.execute(update(Violation), [
+                {"id": violation_id, "plate_normalized": normalize_plate(plate_number), "plate_key": fold_plate(plate_number)}
+                for violation_id, plate_number in rows
+            ])
+            db.commit()
+            filled += len(rows)
+
+    def search_violations_service(self, db: Session, user_id: int, plate: str, mode: str = "prefix", limit: int = 50) -> List[ViolationResponse]:
+        # fuzzy: so khớp trên dạng đã gộp ký tự dễ nhầm (O/0, B/8, S/5...)
+        if mode == "fuzzy":
+            column, value = Violation.plate_key, fold_plate(plate)
+        else:
+            column, value = Violation.plate_normalized, normalize_plate(plate)
+
+        if not value:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Plate must contain at least one letter or digit"
+            )
+
+        query = db.query(Violation).join(Video, Video.id == Violation.video_id).filter(Video.user_id == user_id)
+        if mode == "exact":
+            query = query.filter(column == value)
+        else:
+            query = query.filter(column >= value, column < prefix_upper_bound(value))
+
+        violations = query.order_by(column, Violation.id.desc()).limit(limit).all()
+        return [ViolationResponse.from_orm(violation) for violation in violations]
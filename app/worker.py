@@ -0,0 +1,141 @@
+"""Inference worker for JOB_QUEUE=database.
+
+API processes only store uploads as "pending" videos (with their processing
+options); each worker process loads the models once, claims pending videos
+from the database one at a time and processes them. Scale inference by running
+more workers, on this machine or on any node that shares the database and the
+upload directory. Videos left "processing" by a crashed worker for longer than
+WORKER_STALE_SECONDS are marked failed. Workers publish the fingerprint of
+their models so the API can look up cached results without loading the models.
+Pending images (e.g. from a bulk upload) are claimed up to WORKER_IMAGE_BATCH
+at a time and share inference batches.
+
+Usage (from the repo root):
+    JOB_QUEUE=database poetry run uvicorn app.main:app --workers 4
+    python -m app.worker --metrics-port 9101
+"""
+import argparse
+import logging
+import os
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from app.database import SessionLocal, init_db
+from app.models.models import Video
+from app.services.job_service import _init_worker, claim_video, fail_stale_videos, process_batch_job, process_video_job
+from app.services.metrics import registry
+from app.services.result_cache_service import ResultCacheService
+from app.services.video_service import VideoService
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+video_service = VideoService()
+result_cache_service = ResultCacheService()
+
+
+def claim_next_videos(db, image_batch_size: int = 1) -> List[int]:
+    """Atomically claim the oldest pending video; when it is an image, also claim up to
+    ``image_batch_size - 1`` more pending images so they share inference batches"""
+    candidates = db.query(Video.id, Video.filepath).filter(Video.status == "pending").order_by(Video.id).limit(5).all()
+    for video_id, file_path in candidates:
+        if not claim_video(db, video_id):
+            continue
+        claimed = [video_id]
+        if image_batch_size > 1 and file_path.startswith(video_service.image_upload_dir):
+            more_images = db.query(Video.id).filter(
+                Video.status == "pending",
+                Video.filepath.startswith(video_service.image_upload_dir)
+            ).order_by(Video.id).limit(image_batch_size - 1).all()
+            claimed.extend(image_id for (image_id,) in more_images if claim_video(db, image_id))
+        return claimed
+    return []
+
+
+def pending_videos() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(Video).filter(Video.status == "pending").count()
+    finally:
+        db.close()
+
+
+def start_metrics_server(port: int) -> None:
+    """Serve this worker's /metrics (stage timings, frame counters) for Prometheus"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.render().encode()
+            self.send_response(200 if self.path == "/metrics" else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="worker-metrics", daemon=True).start()
+    logger.info(f"Worker metrics on :{port}/metrics")
+
+
+def run_worker(poll_interval: float, stale_seconds: float, image_batch_size: int = 1, once: bool = False) -> None:
+    init_db()
+    # Load model một lần trước khi nhận job
+    _init_worker()
+
+    stop = threading.Event()
+    # SIGTERM / Ctrl+C: xử lý xong video đang chạy rồi mới thoát
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.set())
+
+    last_stale_check = 0.0
+    while not stop.is_set():
+        db = SessionLocal()
+        try:
+            if time.monotonic() - last_stale_check >= min(stale_seconds, 60):
+                failed = fail_stale_videos(db, stale_seconds)
+                if failed:
+                    logger.warning(f"Marked {failed} stale processing videos as failed")
+                # API tra cache theo fingerprint này, nên worker nhắc lại định kỳ (bản mới nhất được dùng)
+                result_cache_service.publish_fingerprint(db)
+                last_stale_check = time.monotonic()
+            video_ids = claim_next_videos(db, image_batch_size)
+        finally:
+            db.close()
+
+        if not video_ids:
+            if once:
+                break
+            stop.wait(poll_interval)
+            continue
+
+        # Video đã được claim_next_videos nhận
+        result = process_video_job(video_ids[0], claimed=True) if len(video_ids) == 1 else process_batch_job(video_ids, claimed=True)
+        # process_video_job trả metric cho process cha; ở đây worker tự phục vụ /metrics nên gộp lại
+        registry.merge(result["metrics"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--poll-interval", type=float, default=float(os.getenv("WORKER_POLL_INTERVAL", "1.0")))
+    parser.add_argument("--stale-seconds", type=float, default=float(os.getenv("WORKER_STALE_SECONDS", "3600")))
+    parser.add_argument("--image-batch", type=int, default=int(os.getenv("WORKER_IMAGE_BATCH", "64")), help="pending images claimed together")
+    parser.add_argument("--metrics-port", type=int, default=int(os.getenv("WORKER_METRICS_PORT", "0")), help="0 = disabled")
+    parser.add_argument("--once", action="store_true", help="exit when no pending video is left")
+    args = parser.parse_args()
+
+    if args.metrics_port:
+        registry.gauge("httm_video_queue_pending", "Videos waiting for an inference worker", pending_videos)
+        start_metrics_server(args.metrics_port)
+    run_worker(args.poll_interval, args.stale_seconds, args.image_batch, args.once)
+
+
+if __name__ == "__main__":
+    main()
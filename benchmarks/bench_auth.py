@@ -0,0 +1,103 @@
+"""Micro-benchmark of the per-request auth overhead of get_current_user.
+
+Measures full JWT verification against the token cache for HS256 and,
+when the cryptography package is installed, RS256 and EdDSA.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_auth --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+# app.middleware.auth_middleware kéo theo app.database: dùng SQLite tạm thay cho MySQL
+db_file = os.path.join(tempfile.mkdtemp(), "bench_auth.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+
+from fastapi.security import HTTPAuthorizationCredentials  # noqa: E402
+
+
+def generate_keys(algorithm: str) -> None:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+    if algorithm == "RS256":
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        private_key = ed25519.Ed25519PrivateKey.generate()
+
+    key_dir = tempfile.mkdtemp()
+    private_path = os.path.join(key_dir, "private.pem")
+    public_path = os.path.join(key_dir, "public.pem")
+    with open(private_path, "wb") as f:
+        f.write(private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+    with open(public_path, "wb") as f:
+        f.write(private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ))
+    os.environ["JWT_PRIVATE_KEY_PATH"] = private_path
+    os.environ["JWT_PUBLIC_KEY_PATH"] = public_path
+
+
+def bench(algorithm: str, requests: int, users: int) -> None:
+    os.environ["ALGORITHM"] = algorithm
+    if algorithm != "HS256":
+        generate_keys(algorithm)
+
+    # Import lại sau khi set env để AuthService đọc đúng thuật toán / key
+    from app.middleware import auth_middleware
+    from app.services.auth_service import AuthService
+    auth_middleware.auth_service = AuthService()
+    auth_service = auth_middleware.auth_service
+
+    credentials = [
+        HTTPAuthorizationCredentials(
+            scheme="Bearer",
+            credentials=auth_service.create_access_token({"sub": str(i), "username": f"user{i}"})
+        )
+        for i in range(users)
+    ]
+
+    def run_uncached():
+        for i in range(requests):
+            auth_service.verify_token(credentials[i % users].credentials)
+
+    async def run_dependency():
+        for i in range(requests):
+            await auth_middleware.get_current_user(credentials[i % users])
+
+    started = time.perf_counter()
+    run_uncached()
+    uncached_us = (time.perf_counter() - started) / requests * 1e6
+
+    auth_service.token_cache.clear()
+    started = time.perf_counter()
+    asyncio.run(run_dependency())
+    cached_us = (time.perf_counter() - started) / requests * 1e6
+
+    print(f"{algorithm:<6} full verify {uncached_us:8.1f} us/request   cached dependency {cached_us:6.1f} us/request ({uncached_us / cached_us:.0f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=100, help="distinct tokens in rotation")
+    args = parser.parse_args()
+
+    algorithms = ["HS256"]
+    try:
+        import cryptography  # noqa: F401
+        algorithms += ["RS256", "EdDSA"]
+    except ImportError:
+        print("cryptography not installed, skipping RS256/EdDSA")
+
+    for algorithm in algorithms:
+        bench(algorithm, args.requests, args.users)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Compare plate detection + OCR throughput for different inference batch sizes.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_batch_inference --video path/to/clip.mp4
+    python -m benchmarks.bench_batch_inference --frames 64 --batch-sizes 1 4 8 16
+"""
+import argparse
+import time
+from typing import List
+
+import cv2
+import numpy as np
+
+from app.services.model_registry import model_registry
+
+
+def load_frames(video_path: str, count: int) -> List[np.ndarray]:
+    if not video_path:
+        # Frame ngẫu nhiên chỉ đo overhead của model, không có biển số thật
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(count)]
+
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def run(frames: List[np.ndarray], batch_size: int, repeats: int) -> float:
+    plate_service = model_registry.get_plate_service()
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for i in range(0, len(frames), batch_size):
+            plate_service.detect_and_recognize_batch(frames[i:i + batch_size])
+    return len(frames) * repeats / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", default="", help="video to sample frames from (random frames if omitted)")
+    parser.add_argument("--frames", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+
+    # Warm-up để loại bỏ thời gian load model / cấp phát bộ nhớ lần đầu
+    run(frames[:4], 4, 1)
+    print(f"Loaded {len(frames)} frames, device={model_registry.device}")
+
+    baseline = None
+    for batch_size in args.batch_sizes:
+        fps = run(frames, batch_size, args.repeats)
+        baseline = baseline or fps
+        print(f"batch_size={batch_size:>3}  {fps:8.2f} frames/sec  ({fps / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Sequential single uploads vs one bulk archive upload of the same snapshots.
+
+Renders seeded checkpoint snapshots (a road with one plate each), then on a
+throwaway SQLite database and working directory:
+- uploads them one request at a time to /videos/upload,
+- uploads them again (different bytes, so no dedupe / cache) as one ZIP to /videos/bulk,
+and reports images/sec for both. The API runs with JOB_QUEUE=database, so only
+the upload path (write, hash, insert) is measured.
+
+With --inference (needs the AI models) the stored images are then processed
+in-process: one job per image vs one shared job for all images, which batches
+detection and OCR across files.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_bulk_upload --images 200
+    python -m benchmarks.bench_bulk_upload --images 200 --inference
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic_video import draw_road, random_plate, render_plate
+
+
+def render_snapshot(rng: np.random.Generator, width: int, height: int, variant: int) -> bytes:
+    frame = draw_road(width, height)
+    plate = render_plate(random_plate(rng), max(12, height // 12))
+    y = int(rng.integers(height // 3, height - plate.shape[0]))
+    x = int(rng.integers(0, width - plate.shape[1]))
+    frame[y:y + plate.shape[0], x:x + plate.shape[1]] = plate
+    # Khác một pixel giữa hai lần upload để không bị dedupe / cache theo hash nội dung
+    frame[0, 0] = variant
+    return cv2.imencode(".jpg", frame)[1].tobytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--inference", action="store_true", help="also compare per-image jobs with one shared batch job")
+    args = parser.parse_args()
+
+    repo_root = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="bench_bulk_")
+    os.makedirs(os.path.join(workdir, "app"), exist_ok=True)
+    if os.path.isdir(os.path.join(repo_root, "app", "AI_model")):
+        os.symlink(os.path.join(repo_root, "app", "AI_model"), os.path.join(workdir, "app", "AI_model"))
+    sys.path.insert(0, repo_root)
+    os.chdir(workdir)
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench_bulk.db')}"
+    os.environ["ASYNC_DB_ENABLED"] = "false"
+    os.environ["RESULT_CACHE_ENABLED"] = "false"
+    os.environ["JOB_QUEUE"] = "database"
+    os.environ["BULK_MAX_ITEMS"] = str(max(args.images, 1))
+    os.environ["BULK_IMAGES_PER_JOB"] = str(max(args.images, 1))
+
+    # Cùng ảnh cho hai lần upload (cùng seed), chỉ khác variant
+    snapshots = [(f"snap_{i:05d}.jpg", render_snapshot(np.random.default_rng(i), args.width, args.height, 1)) for i in range(args.images)]
+    bulk_snapshots = [(name, render_snapshot(np.random.default_rng(i), args.width, args.height, 2)) for i, (name, _) in enumerate(snapshots)]
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        client.post("/api/v1/auth/register", json={"username": "bench", "password": "bench-password"})
+        login = client.post("/api/v1/auth/login", json={"username": "bench", "password": "bench-password"})
+        login.raise_for_status()
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        started = time.perf_counter()
+        single_ids = []
+        for name, data in snapshots:
+            response = client.post("/api/v1/videos/upload", headers=headers, files={"file": (name, data, "image/jpeg")})
+            response.raise_for_status()
+            single_ids.append(response.json()["video"]["id"])
+        single_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as z:
+            for name, data in bulk_snapshots:
+                z.writestr(name, data)
+        response = client.post("/api/v1/videos/bulk", headers=headers, files=[("files", ("day.zip", archive.getvalue(), "application/zip"))])
+        response.raise_for_status()
+        bulk_seconds = time.perf_counter() - started
+        bulk_ids = [item["video"]["id"] for item in response.json()["items"] if item["video"]]
+
+    print(f"{args.images} snapshots {args.width}x{args.height} ({workdir})")
+    print(f"single uploads: {single_seconds:7.2f}s  {args.images / single_seconds:8.1f} images/s")
+    print(f"bulk archive:   {bulk_seconds:7.2f}s  {args.images / bulk_seconds:8.1f} images/s  {response.json()['summary']}")
+
+    if not args.inference:
+        return
+
+    from app.services.job_service import _init_worker, process_batch_job, process_video_job
+    _init_worker()
+
+    started = time.perf_counter()
+    single_statuses = [process_video_job(video_id)["status"] for video_id in single_ids]
+    single_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    batch_statuses = list(process_batch_job(bulk_ids)["statuses"].values())
+    batch_seconds = time.perf_counter() - started
+
+    print(f"job per image:  {single_seconds:7.2f}s  {args.images / single_seconds:8.1f} images/s  "
+          f"{single_statuses.count('completed')} completed")
+    print(f"shared batch:   {batch_seconds:7.2f}s  {args.images / batch_seconds:8.1f} images/s  "
+          f"{batch_statuses.count('completed')} completed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""End-to-end benchmark: synthetic clips through the real API, jobs and models.
+
+Generates seeded clips with rendered plates (benchmarks.synthetic_video), starts
+the FastAPI app with TestClient on a throwaway SQLite database and working
+directory, registers a user, uploads every clip and polls until the jobs finish.
+Reports:
+- throughput: uploads/sec, decoded and analyzed frames/sec
+- latency p50/p95/p99: upload request, upload-to-result per job, and per stage
+  (request_* stages are exact, from Server-Timing; the others come from the
+  /metrics histograms, where percentiles are interpolated between buckets and
+  the mean is exact)
+- peak RSS of the API process and of the inference workers
+- plate recall against the rendered plate texts
+
+``--output`` saves the run as JSON; ``--baseline`` compares against a saved run
+and exits with status 1 when a metric regressed by more than ``--tolerance``.
+Needs the AI models (app/AI_model or the exported ONNX models).
+
+Usage (from the repo root):
+    python -m benchmarks.bench_e2e --clips 4 --seconds 30 --output baseline.json
+    python -m benchmarks.bench_e2e --clips 4 --seconds 30 --baseline baseline.json --tolerance 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.synthetic_video import generate_clip
+
+# Nhóm metric -> chiều tốt hơn, dùng khi so sánh với baseline
+HIGHER_IS_BETTER = ("throughput", "accuracy")
+LOWER_IS_BETTER = ("latency_ms", "stages_ms", "peak_rss_mb")
+
+HISTOGRAM_BUCKET = re.compile(r'^httm_stage_seconds_bucket\{stage="([^"]+)",le="([^"]+)"\} (\S+)$')
+HISTOGRAM_TOTAL = re.compile(r'^httm_stage_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$')
+COUNTER = re.compile(r'^(httm_[a-z_]+_total)(?:\{[^}]*\})? (\S+)$')
+
+
+def summarize(samples: List[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    values = np.asarray(samples, dtype=np.float64)
+    return {
+        "count": len(samples),
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+    }
+
+
+def histogram_quantile(buckets: List[tuple], quantile: float) -> Optional[float]:
+    """Quantile from cumulative (upper bound, count) buckets, interpolated like Prometheus"""
+    total = buckets[-1][1] if buckets else 0
+    if not total:
+        return None
+    rank = quantile * total
+    lower_bound, lower_count = 0.0, 0
+    for bound, count in buckets:
+        if count >= rank:
+            if bound == float("inf"):
+                return lower_bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / max(1, count - lower_count)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+
+def parse_metrics(text: str) -> tuple:
+    """Return (stage histograms in ms, counter totals) from the /metrics exposition"""
+    buckets: Dict[str, List[tuple]] = {}
+    totals: Dict[str, Dict[str, float]] = {}
+    counters: Dict[str, float] = {}
+    for line in text.splitlines():
+        match = HISTOGRAM_BUCKET.match(line)
+        if match:
+            bound = float("inf") if match.group(2) == "+Inf" else float(match.group(2))
+            buckets.setdefault(match.group(1), []).append((bound, float(match.group(3))))
+            continue
+        match = HISTOGRAM_TOTAL.match(line)
+        if match:
+            totals.setdefault(match.group(2), {})[match.group(1)] = float(match.group(3))
+            continue
+        match = COUNTER.match(line)
+        if match:
+            counters[match.group(1)] = counters.get(match.group(1), 0) + float(match.group(2))
+
+    stages = {}
+    for stage, stage_buckets in buckets.items():
+        count = totals.get(stage, {}).get("count", 0)
+        stages[stage] = {
+            "count": int(count),
+            "mean": round(totals[stage]["sum"] / count * 1000, 3) if count else None,
+            **{
+                name: round(value * 1000, 3) if value is not None else None
+                for name, value in (
+                    (f"p{int(q * 100)}", histogram_quantile(stage_buckets, q)) for q in (0.5, 0.95, 0.99)
+                )
+            },
+        }
+    return stages, counters
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    timings = {}
+    for entry in filter(None, (part.strip() for part in header.split(","))):
+        name, _, duration = entry.partition(";dur=")
+        if duration:
+            timings[name] = float(duration)
+    return timings
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    # VmHWM = peak resident set size của process (Linux)
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def child_pids(pid: int) -> List[int]:
+    """Descendants of a process (inference workers and their segment workers), Linux only"""
+    # Pool có thể được tạo từ thread khác (lifespan chạy trong thread của TestClient) nên duyệt mọi thread
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        return children
+    return children + [grandchild for child in children for grandchild in child_pids(child)]
+
+
+def flatten(data: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_value: float) -> List[str]:
+    """Metrics that got worse than the baseline by more than ``tolerance`` (relative)"""
+    regressions = []
+    current_flat = flatten(current["metrics"])
+    for path, base in flatten(baseline["metrics"]).items():
+        value = current_flat.get(path)
+        group = path.split(".")[0]
+        # Số mẫu và stage quá nhanh (nhiễu đo) không dùng để so sánh
+        if value is None or path.endswith(".count") or max(abs(base), abs(value)) < min_value:
+            continue
+        if group in HIGHER_IS_BETTER and value < base * (1 - tolerance):
+            regressions.append(f"{path}: {value:g} < baseline {base:g}")
+        elif group in LOWER_IS_BETTER and value > base * (1 + tolerance):
+            regressions.append(f"{path}: {value:g} > baseline {base:g}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=int, default=4)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=float, default=25.0)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--plates", type=int, default=4, help="plates rendered per clip")
+    parser.add_argument("--sample-interval", type=float, default=2.0)
+    parser.add_argument("--sampling-mode", choices=["fixed", "adaptive"], default="fixed")
+    parser.add_argument("--concurrency", type=int, default=1, help="parallel upload requests")
+    parser.add_argument("--timeout", type=float, default=1800, help="seconds to wait for all jobs")
+    parser.add_argument("--workdir", help="working directory for uploads/results (temporary by default)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression")
+    parser.add_argument("--min-value", type=float, default=1.0, help="ignore metrics below this in both runs (ms, MB...)")
+    args = parser.parse_args()
+
+    # Chạy trong thư mục tạm: upload, kết quả và crop của benchmark không lẫn vào dữ liệu thật
+    repo_root = os.getcwd()
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="bench_e2e_"))
+    os.makedirs(os.path.join(workdir, "app"), exist_ok=True)
+    for model_dir in ("AI_model",):
+        source = os.path.join(repo_root, "app", model_dir)
+        target = os.path.join(workdir, "app", model_dir)
+        if os.path.isdir(source) and not os.path.exists(target):
+            os.symlink(source, target)
+    sys.path.insert(0, repo_root)
+    os.chdir(workdir)
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench_e2e.db')}"
+    os.environ["ASYNC_DB_ENABLED"] = "false"
+    os.environ["RESULT_CACHE_ENABLED"] = "false"
+    os.environ["PROFILING_ENABLED"] = "true"
+    os.environ["MODEL_WARMUP"] = "true"
+
+    clips_dir = os.path.join(workdir, "clips")
+    os.makedirs(clips_dir, exist_ok=True)
+    clips = []
+    started = time.perf_counter()
+    for i in range(args.clips):
+        path = os.path.join(clips_dir, f"clip_{i}.avi")
+        truth = generate_clip(path, args.width, args.height, args.fps, args.seconds, args.plates, seed=i)
+        clips.append((path, [text for text, _ in truth]))
+    print(f"Generated {args.clips} clips {args.width}x{args.height} {args.fps}fps {args.seconds}s "
+          f"in {time.perf_counter() - started:.1f}s ({workdir})")
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.plate_text import normalize_plate
+
+    with TestClient(app) as client:
+        client.post("/api/v1/auth/register", json={"username": "bench", "password": "bench-password"})
+        login = client.post("/api/v1/auth/login", json={"username": "bench", "password": "bench-password"})
+        login.raise_for_status()
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        # Đợi worker load model xong để thời gian load không tính vào latency của job
+        health = {}
+        deadline = time.perf_counter() + args.timeout
+        while time.perf_counter() < deadline:
+            health = client.get("/health").json()
+            if health["status"] != "loading":
+                break
+            time.sleep(0.5)
+        print(f"Models: {health.get('status')} {health.get('models', {}).get('error') or ''}")
+
+        def upload(clip):
+            path, _ = clip
+            with open(path, "rb") as f:
+                request_started = time.perf_counter()
+                response = client.post(
+                    "/api/v1/videos/upload",
+                    headers={**headers, "X-Profile": "1"},
+                    files={"file": (os.path.basename(path), f, "video/x-msvideo")},
+                    data={"sample_interval": str(args.sample_interval), "sampling_mode": args.sampling_mode}
+                )
+            finished = time.perf_counter()
+            response.raise_for_status()
+            return response.json()["video"]["id"], request_started, finished, parse_server_timing(response.headers.get("Server-Timing", ""))
+
+        run_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            uploads = list(executor.map(upload, clips))
+        upload_seconds = time.perf_counter() - run_started
+
+        pending = {video_id: request_started for video_id, request_started, _, _ in uploads}
+        job_seconds, statuses, detected = {}, {}, {}
+        while pending and time.perf_counter() < deadline:
+            for video_id in list(pending):
+                detail = client.get(f"/api/v1/videos/{video_id}", headers=headers).json()
+                if detail["video"]["status"] in ("completed", "failed"):
+                    job_seconds[video_id] = time.perf_counter() - pending.pop(video_id)
+                    statuses[video_id] = detail["video"]["status"]
+                    detected[video_id] = {normalize_plate(p["plate_number"]) for p in detail["detected_plates"]}
+            time.sleep(0.05)
+        run_seconds = time.perf_counter() - run_started
+
+        # Metric của job được gộp vào process API khi future hoàn tất, có thể sau khi status đã đổi trong DB
+        metrics_text = client.get("/metrics").text
+        while "httm_video_jobs_active 0" not in metrics_text.splitlines() and time.perf_counter() < deadline:
+            time.sleep(0.05)
+            metrics_text = client.get("/metrics").text
+        stages, counters = parse_metrics(metrics_text)
+        worker_rss = [rss for rss in (peak_rss_mb(pid) for pid in child_pids(os.getpid())) if rss is not None]
+
+    # Stage của request upload: số đo chính xác của từng request từ Server-Timing
+    request_stages: Dict[str, List[float]] = {}
+    for _, _, _, timings in uploads:
+        for stage, duration in timings.items():
+            request_stages.setdefault(stage, []).append(duration)
+    for stage, samples in request_stages.items():
+        stages[f"request_{stage}"] = summarize(samples)
+
+    expected = sum(len(truth) for _, truth in clips)
+    found = sum(
+        len({normalize_plate(text) for text in truth} & detected.get(video_id, set()))
+        for (video_id, *_), (_, truth) in zip(uploads, clips)
+    )
+    completed = sum(1 for status in statuses.values() if status == "completed")
+
+    results = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "workdir")},
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "backend": os.getenv("INFERENCE_BACKEND", "torch"),
+            "video_workers": os.getenv("VIDEO_WORKERS", "1"),
+            "models": health.get("status"),
+        },
+        "jobs": {"uploaded": len(uploads), "completed": completed, "failed": len(statuses) - completed, "timed_out": len(pending)},
+        "metrics": {
+            "throughput": {
+                "uploads_per_sec": round(len(uploads) / upload_seconds, 3),
+                "frames_decoded_per_sec": round(counters.get("httm_frames_decoded_total", 0) / run_seconds, 2),
+                "frames_analyzed_per_sec": round(counters.get("httm_frames_analyzed_total", 0) / run_seconds, 2),
+            },
+            "latency_ms": {
+                "upload_request": summarize([(finished - request_started) * 1000 for _, request_started, finished, _ in uploads]),
+                "job_end_to_end": summarize([seconds * 1000 for seconds in job_seconds.values()]),
+            },
+            "stages_ms": stages,
+            "peak_rss_mb": {
+                # ru_maxrss tính bằng KB trên Linux
+                "api": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+                "worker_max": max(worker_rss) if worker_rss else None,
+                "workers_total": round(sum(worker_rss), 1) if worker_rss else None,
+            },
+            "accuracy": {"plate_recall": round(found / expected, 4) if expected else None},
+        },
+    }
+
+    throughput, latency = results["metrics"]["throughput"], results["metrics"]["latency_ms"]
+    print(f"jobs: {results['jobs']}")
+    print(f"uploads/sec {throughput['uploads_per_sec']}, frames/sec decoded {throughput['frames_decoded_per_sec']} "
+          f"analyzed {throughput['frames_analyzed_per_sec']}")
+    for name, summary in latency.items():
+        print(f"{name:<24} {summary}")
+    for stage, summary in sorted(stages.items()):
+        print(f"  {stage:<22} {summary}")
+    print(f"peak RSS MB: {results['metrics']['peak_rss_mb']}, plate recall: {results['metrics']['accuracy']['plate_recall']}")
+
+    if args.output:
+        output = os.path.join(repo_root, args.output)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved {output}")
+
+    failed = bool(pending) or completed < len(uploads)
+    if args.baseline:
+        with open(os.path.join(repo_root, args.baseline), encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_value)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            failed = True
+        else:
+            print(f"No regression beyond {args.tolerance:.0%} against {args.baseline}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Skip rate and cost of the ROI / motion gate on a recorded video.
+
+Samples the video like a processing job and runs every sampled frame through
+FrameGate, without the models. Reports the share of frames that would skip
+plate detection, the gate cost per frame and, with --detect-ms (the measured
+detector latency per frame), the inference time saved.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_frame_gate --video night_highway.mp4
+    python -m benchmarks.bench_frame_gate --video night_highway.mp4 --roi "[[0.2,0.4],[0.9,0.4],[1,1],[0,1]]" --detect-ms 45
+"""
+import argparse
+import json
+import time
+
+import cv2
+
+from app.services.frame_gate import FrameGate
+from app.services.frame_sampler import FrameSampler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--sample-interval", type=float, default=2.0)
+    parser.add_argument("--roi", help="JSON polygon [[x, y], ...] relative to the frame size")
+    parser.add_argument("--no-motion", action="store_true", help="only crop to the ROI")
+    parser.add_argument("--detect-ms", type=float, default=0.0, help="detector latency per frame, to estimate the time saved")
+    args = parser.parse_args()
+
+    gate = FrameGate(json.loads(args.roi) if args.roi else None, motion=not args.no_motion)
+    cap = cv2.VideoCapture(args.video)
+    sampler = FrameSampler(cap, interval=args.sample_interval)
+    analyzed_pixels = 0
+    gate_seconds = 0.0
+    for _, timestamp, frame in sampler:
+        started = time.perf_counter()
+        region = gate.check(frame, timestamp)
+        gate_seconds += time.perf_counter() - started
+        if region is not None:
+            analyzed_pixels += region.shape[0] * region.shape[1]
+    cap.release()
+
+    stats = gate.stats()
+    sampled = sampler.frames_sampled
+    print(f"{sampled} sampled frames, {stats['frames_skipped']} skipped ({stats['skip_rate']:.1%})")
+    print(f"roi covers {stats['roi_fraction']:.1%} of the frame")
+    print(f"gate cost: {gate_seconds / max(1, sampled) * 1000:.2f} ms/frame")
+    if args.detect_ms:
+        saved = stats["frames_skipped"] * args.detect_ms / 1000
+        print(f"detector time saved: {saved:.1f}s of {sampled * args.detect_ms / 1000:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Login throughput benchmark for the scrypt cost parameters.
+
+For each SCRYPT_N value, sends concurrent /login requests through the ASGI
+app and reports the latency of one hash, login throughput and p50/p95
+login latency. It also reports the latency of /health during the burst,
+which shows whether hashing stalls the event loop.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_login --costs 8192 16384 32768 --logins 200 --concurrency 32
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+db_file = os.path.join(tempfile.mkdtemp(), "bench_login.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+
+import httpx  # noqa: E402
+
+from app.database import SessionLocal, init_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.models import User  # noqa: E402
+from app.services.password_hasher import password_hasher  # noqa: E402
+
+USERNAME = "bench"
+PASSWORD = "correct horse battery staple"
+
+
+def percentile(values, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def reset_password(n: int) -> None:
+    password_hasher.n = n
+    db = SessionLocal()
+    user = db.query(User).filter(User.username == USERNAME).first()
+    if user is None:
+        user = User(username=USERNAME, password_hash="")
+        db.add(user)
+    user.password_hash = password_hasher.hash(PASSWORD)
+    db.commit()
+    db.close()
+
+
+async def bench_cost(n: int, logins: int, concurrency: int) -> None:
+    reset_password(n)
+    started = time.perf_counter()
+    password_hasher.hash(PASSWORD)
+    hash_ms = (time.perf_counter() - started) * 1000
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        login_latencies, health_latencies = [], []
+        done = asyncio.Event()
+
+        async def login():
+            async with semaphore:
+                request_started = time.perf_counter()
+                response = await client.post("/api/v1/auth/login", json={"username": USERNAME, "password": PASSWORD})
+                login_latencies.append((time.perf_counter() - request_started) * 1000)
+                assert response.status_code in (200, 503), response.text
+
+        async def probe_health():
+            while not done.is_set():
+                request_started = time.perf_counter()
+                await client.get("/health")
+                health_latencies.append((time.perf_counter() - request_started) * 1000)
+                await asyncio.sleep(0.01)
+
+        probe = asyncio.create_task(probe_health())
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe
+
+    print(
+        f"N={n:<7} hash {hash_ms:7.1f} ms  {logins / elapsed:7.1f} logins/s  "
+        f"login p50 {percentile(login_latencies, 0.5):7.1f} ms p95 {percentile(login_latencies, 0.95):7.1f} ms  "
+        f"/health p95 {percentile(health_latencies, 0.95):6.1f} ms during burst"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--costs", type=int, nargs="+", default=[8192, 16384, 32768])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    init_db()
+    print(f"r={password_hasher.r} p={password_hasher.p} workers={password_hasher.max_workers} ({db_file})")
+    for n in args.costs:
+        asyncio.run(bench_cost(n, args.logins, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Per-stage hit rates and cost of the OCR cascade on a folder of plate crops.
+
+The fast character detector reads every crop; crops whose text does not match
+a Vietnamese plate format go to the EasyOCR fallback. Reports, per stage, how
+many crops it read as a valid plate and its latency, so the fallback cost can
+be weighed against the plates it recovers.
+
+Usage (from the repo root, crops are written to app/upload/crops by jobs):
+    python -m benchmarks.bench_ocr_cascade --crops app/upload/crops --limit 500
+    INFERENCE_BACKEND=onnx python -m benchmarks.bench_ocr_cascade --crops app/upload/crops
+"""
+import argparse
+import glob
+import os
+import time
+
+import cv2
+
+from app.services.inference_backend import EasyOcrFallback, load_models
+from app.services.plate_text import UNKNOWN_PLATE, assemble_plate_text, is_valid_plate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--crops", required=True)
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    paths = sorted(p for ext in ("jpg", "jpeg", "png", "webp") for p in glob.glob(os.path.join(args.crops, f"*.{ext}")))
+    crops = [image for image in (cv2.imread(p) for p in paths[:args.limit]) if image is not None]
+    if not crops:
+        parser.error("no crops found")
+
+    backend = os.getenv("INFERENCE_BACKEND", "torch").lower()
+    _, ocr_model = load_models(backend, "cpu")
+    ocr_model(crops[:1])  # warm-up
+
+    started = time.perf_counter()
+    fast_texts = []
+    for i in range(0, len(crops), args.batch_size):
+        fast_texts.extend(assemble_plate_text(boxes, ocr_model.names) for boxes in ocr_model(crops[i:i + args.batch_size]))
+    fast_seconds = time.perf_counter() - started
+
+    failed = [i for i, text in enumerate(fast_texts) if not is_valid_plate(text)]
+    fast_valid = len(crops) - len(failed)
+    fast_unknown = sum(1 for text in fast_texts if text == UNKNOWN_PLATE)
+    print(f"{len(crops)} crops, {backend} backend")
+    print(f"fast OCR:     {fast_valid / len(crops):6.1%} valid, {fast_unknown} unknown, "
+          f"{fast_seconds / len(crops) * 1000:7.2f} ms/crop")
+
+    fallback = EasyOcrFallback("cpu")
+    fallback(crops[:1])  # load + warm-up
+    if not fallback.available:
+        print("fallback:     easyocr not available")
+        return
+
+    started = time.perf_counter()
+    fallback_texts = fallback([crops[i] for i in failed])
+    fallback_seconds = time.perf_counter() - started
+    recovered = sum(1 for text in fallback_texts if is_valid_plate(text))
+    if failed:
+        print(f"fallback:     {recovered / len(failed):6.1%} of {len(failed)} failed crops recovered, "
+              f"{fallback_seconds / len(failed) * 1000:7.2f} ms/crop")
+    print(f"cascade:      {(fast_valid + recovered) / len(crops):6.1%} valid, "
+          f"{(fast_seconds + fallback_seconds) / len(crops) * 1000:7.2f} ms/crop on average")
+
+
+if __name__ == "__main__":
+    main()
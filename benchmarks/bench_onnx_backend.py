@@ -0,0 +1,141 @@
+"""Accuracy parity and latency of the ONNX Runtime backend against PyTorch.
+
+Runs the plate detector and the OCR model of both backends on the same frames:
+- detection parity: share of PyTorch boxes matched by an ONNX box (IoU >= 0.5) and back
+- OCR parity: share of plate crops read as the same string by both backends
+- latency: p50 / p95 per batch for each backend
+
+Exits with status 1 when parity falls below the thresholds, so it can gate a
+model export in CI. Needs the PyTorch stack and exported models
+(python -m app.export_onnx [--int8]).
+
+Usage (from the repo root):
+    python -m benchmarks.bench_onnx_backend --video clip.mp4 --frames 200
+    python -m benchmarks.bench_onnx_backend --images samples/ --int8 --threads 4
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from typing import List
+
+import cv2
+import numpy as np
+
+from app.services.inference_backend import load_models
+from app.services.plate_text import assemble_plate_text
+from app.services.plate_tracker import bbox_iou
+
+
+def load_frames(args) -> List[np.ndarray]:
+    if args.images:
+        paths = sorted(p for ext in ("jpg", "jpeg", "png") for p in glob.glob(os.path.join(args.images, f"*.{ext}")))
+        return [image for image in (cv2.imread(p) for p in paths[:args.frames]) if image is not None]
+
+    cap = cv2.VideoCapture(args.video)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or args.frames)
+    step = max(1, total // args.frames)
+    frames = []
+    for index in range(0, total, step):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ret, frame = cap.read()
+        if not ret or len(frames) >= args.frames:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def matched_share(reference: List[np.ndarray], candidate: List[np.ndarray], iou_threshold: float = 0.5) -> float:
+    """Share of reference boxes that have a candidate box of the same class with IoU >= threshold"""
+    total = matched = 0
+    for ref_boxes, cand_boxes in zip(reference, candidate):
+        used = set()
+        for ref in ref_boxes:
+            total += 1
+            best, best_iou = None, iou_threshold
+            for i, cand in enumerate(cand_boxes):
+                if i in used or int(cand[5]) != int(ref[5]):
+                    continue
+                iou = bbox_iou(ref[:4].tolist(), cand[:4].tolist())
+                if iou >= best_iou:
+                    best, best_iou = i, iou
+            if best is not None:
+                used.add(best)
+                matched += 1
+    return matched / total if total else 1.0
+
+
+def timed_batches(model, images: List[np.ndarray], batch_size: int):
+    outputs, latencies = [], []
+    model(images[:batch_size])  # warm-up
+    for i in range(0, len(images), batch_size):
+        started = time.perf_counter()
+        outputs.extend(model(images[i:i + batch_size]))
+        latencies.append((time.perf_counter() - started) * 1000)
+    return outputs, latencies
+
+
+def describe(latencies: List[float]) -> str:
+    latencies = sorted(latencies)
+    return f"p50 {latencies[len(latencies) // 2]:8.1f} ms  p95 {latencies[int(len(latencies) * 0.95)]:8.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video")
+    source.add_argument("--images")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--ocr-batch-size", type=int, default=64)
+    parser.add_argument("--int8", action="store_true", help="compare the INT8-quantized ONNX models")
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op threads (0 = all cores)")
+    parser.add_argument("--min-box-parity", type=float, default=0.95)
+    parser.add_argument("--min-text-parity", type=float, default=0.90)
+    args = parser.parse_args()
+
+    os.environ["ONNX_INT8"] = "true" if args.int8 else "false"
+    os.environ["ONNX_THREADS"] = str(args.threads)
+    frames = load_frames(args)
+    print(f"{len(frames)} frames, onnx {'int8' if args.int8 else 'fp32'}, threads={args.threads or 'default'}")
+
+    torch_detector, torch_ocr = load_models("torch", "cpu")
+    onnx_detector, onnx_ocr = load_models("onnx", "cpu")
+
+    torch_boxes, torch_latencies = timed_batches(torch_detector, frames, args.batch_size)
+    onnx_boxes, onnx_latencies = timed_batches(onnx_detector, frames, args.batch_size)
+    print(f"detect torch {describe(torch_latencies)}")
+    print(f"detect onnx  {describe(onnx_latencies)}")
+
+    recall = matched_share(torch_boxes, onnx_boxes)
+    precision = matched_share(onnx_boxes, torch_boxes)
+    print(f"detect parity: {recall:.1%} of torch boxes matched, {precision:.1%} of onnx boxes matched")
+
+    # OCR trên cùng một tập crop (lấy từ box của PyTorch) để chỉ so sánh model OCR
+    crops = [
+        frame[int(y1):int(y2), int(x1):int(x2)].copy()
+        for frame, boxes in zip(frames, torch_boxes)
+        for x1, y1, x2, y2, *_ in boxes
+        if int(x2) > int(x1) and int(y2) > int(y1)
+    ]
+    text_parity = 1.0
+    if crops:
+        torch_reads, torch_ocr_latencies = timed_batches(torch_ocr, crops, args.ocr_batch_size)
+        onnx_reads, onnx_ocr_latencies = timed_batches(onnx_ocr, crops, args.ocr_batch_size)
+        torch_texts = [assemble_plate_text(boxes, torch_ocr.names) for boxes in torch_reads]
+        onnx_texts = [assemble_plate_text(boxes, onnx_ocr.names) for boxes in onnx_reads]
+        text_parity = sum(a == b for a, b in zip(torch_texts, onnx_texts)) / len(crops)
+        print(f"ocr    torch {describe(torch_ocr_latencies)}")
+        print(f"ocr    onnx  {describe(onnx_ocr_latencies)}")
+        print(f"ocr parity: {text_parity:.1%} of {len(crops)} crops read identically")
+
+    if min(recall, precision) < args.min_box_parity or text_parity < args.min_text_parity:
+        print("FAIL: ONNX backend below parity thresholds")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Golden check and micro-benchmark for plate text assembly.
+
+Compares the vectorized ``assemble_plate_text`` against the previous
+list/loop implementation (fed through a pandas DataFrame, as the old
+``results.pandas().xyxy`` path did) on synthetic bounding-box layouts.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_plate_text --iterations 20000
+"""
+import argparse
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from app.services.plate_text import assemble_plate_text
+
+NAMES = list("0123456789ABCDEFGHKLMNPRSTUVXYZ")
+
+
+def legacy_assemble(bb_list: list) -> str:
+    # Bản cũ của PlateService.recognize_text_from_crop, giữ nguyên để so sánh
+    if len(bb_list) == 0 or len(bb_list) < 7 or len(bb_list) > 10:
+        return "unknown"
+    center_list = []
+    y_sum = 0
+    for bb in bb_list:
+        x_c = (bb[0] + bb[2]) / 2
+        y_c = (bb[1] + bb[3]) / 2
+        y_sum += y_c
+        center_list.append([x_c, y_c, bb[-1]])
+    y_mean = int(y_sum / len(bb_list))
+    line_1 = []
+    line_2 = []
+    for c in center_list:
+        if int(c[1]) > y_mean:
+            line_2.append(c)
+        else:
+            line_1.append(c)
+    license_plate = ""
+    for l1 in sorted(line_1, key=lambda x: x[0]):
+        license_plate += str(l1[2])
+    license_plate += "-"
+    for l2 in sorted(line_2, key=lambda x: x[0]):
+        license_plate += str(l2[2])
+    return license_plate
+
+
+def make_layout(rng: np.random.Generator, top: str, bottom: str, tilt: float = 0.0) -> np.ndarray:
+    """Boxes [x1, y1, x2, y2, conf, cls] for a plate, shuffled like detector output"""
+    rows = []
+    char_w, char_h = 14.0, 26.0
+    for line_index, text in enumerate((top, bottom)):
+        for i, char in enumerate(text):
+            x1 = 6 + i * (char_w + 3) + rng.uniform(-1, 1)
+            y1 = 4 + line_index * (char_h + 8) + i * tilt + rng.uniform(-1.5, 1.5)
+            rows.append([x1, y1, x1 + char_w, y1 + char_h, rng.uniform(0.6, 1.0), NAMES.index(char)])
+    boxes = np.array(rows)
+    return boxes[rng.permutation(len(boxes))]
+
+
+def golden_cases(rng: np.random.Generator) -> List[Tuple[str, np.ndarray, str]]:
+    """(description, boxes, expected) layouts"""
+    return [
+        ("two-line motorbike", make_layout(rng, "59X1", "12345"), "59X1-12345"),
+        ("two-line 4+4", make_layout(rng, "29B1", "6789"), "29B1-6789"),
+        ("two-line car", make_layout(rng, "51F", "12345"), "51F-12345"),
+        ("two-line tilted", make_layout(rng, "43A", "56789", tilt=2.0), "43A-56789"),
+        ("one-line car", make_layout(rng, "51F12345", ""), "51F12345"),
+        ("one-line tilted", make_layout(rng, "30E92233", "", tilt=1.0), "30E92233"),
+        ("too few characters", make_layout(rng, "51F", "12"), "unknown"),
+        ("too many characters", make_layout(rng, "51F12", "345678"), "unknown"),
+    ]
+
+
+def as_legacy_rows(boxes: np.ndarray) -> list:
+    import pandas as pd
+    frame = pd.DataFrame(boxes, columns=["xmin", "ymin", "xmax", "ymax", "confidence", "class"])
+    frame["name"] = [NAMES[int(c)] for c in boxes[:, 5]]
+    return frame.values.tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    cases = golden_cases(rng)
+
+    failures = 0
+    print(f"{'layout':<22} {'expected':<12} {'vectorized':<12} legacy")
+    for description, boxes, expected in cases:
+        vectorized = assemble_plate_text(boxes, NAMES)
+        legacy = legacy_assemble(as_legacy_rows(boxes))
+        failures += vectorized != expected
+        print(f"{description:<22} {expected:<12} {vectorized:<12} {legacy}")
+
+    boxes = cases[0][1]
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        assemble_plate_text(boxes, NAMES)
+    vectorized_us = (time.perf_counter() - started) / args.iterations * 1e6
+
+    legacy_iterations = max(1, args.iterations // 10)
+    started = time.perf_counter()
+    for _ in range(legacy_iterations):
+        legacy_assemble(as_legacy_rows(boxes))
+    legacy_us = (time.perf_counter() - started) / legacy_iterations * 1e6
+
+    print(f"\nvectorized: {vectorized_us:8.1f} us/crop")
+    print(f"legacy (DataFrame + loops): {legacy_us:8.1f} us/crop ({legacy_us / vectorized_us:.1f}x slower)")
+
+    if failures:
+        raise SystemExit(f"{failures} golden layout(s) did not match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Time to first plate and memory: whole-video results vs streamed results.
+
+Generates a long synthetic clip (benchmarks.synthetic_video) and processes it
+in-process twice, with the models of the current configuration:
+- batch: VideoService.handle_logic_video, results only after the last frame,
+- stream: VideoService.iter_video_plates, plates yielded as their tracks end.
+Reports time to the first plate, total time, plates and peak Python heap
+(tracemalloc, includes numpy frames and crops) for both. Segment workers are
+disabled so both runs decode in this process.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_result_stream --seconds 600 --plates 100
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic_video import generate_clip
+
+
+def measure(run) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    first = None
+    plates = 0
+    for _ in run():
+        first = first or time.perf_counter() - started
+        plates += 1
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"first_plate_s": first, "total_s": total, "plates": plates, "peak_mb": peak / 1024 / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=float, default=25.0)
+    parser.add_argument("--seconds", type=float, default=600.0)
+    parser.add_argument("--plates", type=int, default=100)
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    parser.add_argument("--dedup-seconds", type=float, default=60.0)
+    args = parser.parse_args()
+
+    os.environ["SEGMENT_WORKERS"] = "1"
+    from app.services.model_registry import model_registry
+    from app.services.plate_tracker import DedupWindow
+    from app.services.video_service import VideoService
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_stream_"), "clip.avi")
+    generate_clip(path, args.width, args.height, args.fps, args.seconds, args.plates, seed=0)
+    print(f"clip {args.width}x{args.height} {args.fps}fps {args.seconds}s, {args.plates} plates ({path})")
+
+    model_registry.warm_up()
+    video_service = VideoService()
+    results = {
+        "batch": measure(lambda: video_service.handle_logic_video(path, args.sample_interval)),
+        "stream": measure(lambda: video_service.iter_video_plates(path, DedupWindow(args.dedup_seconds), args.sample_interval)),
+    }
+    for name, result in results.items():
+        print(f"{name:<7} first plate {result['first_plate_s'] or 0:7.2f}s  total {result['total_s']:7.2f}s  "
+              f"{result['plates']:4d} plates  peak {result['peak_mb']:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Sequential vs multi-process sharded processing of one long video.
+
+Runs handle_logic_video once with a single decoder/model and then with the
+video split into segments over N worker processes. Reports the wall time,
+the speedup, and whether both runs found the same plates. The sharded run
+is repeated once so model loading in the workers is not counted.
+
+Usage (from the repo root, needs the AI models in app/AI_model):
+    python -m benchmarks.bench_sharded_video --video highway_1h.mp4 --workers 4
+"""
+import argparse
+import os
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--sample-interval", type=float, default=2.0)
+    parser.add_argument("--min-segment-seconds", type=float, default=60)
+    args = parser.parse_args()
+
+    os.environ["SEGMENT_WORKERS"] = str(args.workers)
+    os.environ["SEGMENT_MIN_SECONDS"] = str(args.min_segment_seconds)
+
+    from app.services.model_registry import model_registry
+    from app.services.segment_service import segment_service
+    from app.services.video_service import VideoService
+
+    video_service = VideoService()
+    segments = video_service.plan_segments(args.video, args.sample_interval)
+    print(f"{len(segments)} segments: {segments}")
+
+    model_registry.warm_up()
+    workers = segment_service.max_workers
+    segment_service.max_workers = 1
+    started = time.perf_counter()
+    sequential = video_service.handle_logic_video(args.video, args.sample_interval)
+    sequential_seconds = time.perf_counter() - started
+    print(f"sequential: {sequential_seconds:8.1f}s  {len(sequential)} plates")
+
+    segment_service.max_workers = workers
+    for attempt in ("sharded (cold)", "sharded (warm)"):
+        started = time.perf_counter()
+        sharded = video_service.handle_logic_video(args.video, args.sample_interval)
+        sharded_seconds = time.perf_counter() - started
+        print(f"{attempt}: {sharded_seconds:8.1f}s  {len(sharded)} plates  speedup {sequential_seconds / sharded_seconds:.2f}x with {len(segments)} workers")
+
+    sequential_plates = {plate.plate_number for plate in sequential}
+    sharded_plates = {plate.plate_number for plate in sharded}
+    print(f"plates only in sequential: {sorted(sequential_plates - sharded_plates)}")
+    print(f"plates only in sharded:    {sorted(sharded_plates - sequential_plates)}")
+    segment_service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
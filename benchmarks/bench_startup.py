@@ -0,0 +1,62 @@
+"""Import time and memory per process type (API worker vs inference worker).
+
+Each measurement runs in a fresh interpreter so earlier imports do not hide the
+cost. Reports the median import time over --repeats runs, the process RSS once
+the imports (or the models) are loaded, and which heavy ML modules ended up in
+sys.modules. An API process should not load any of them.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --repeats 5 --with-models
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("torch", "ultralytics", "easyocr", "onnxruntime", "cv2", "numpy")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - started
+with open("/proc/self/status") as f:
+    rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:")) / 1024
+print(json.dumps({{"seconds": elapsed, "rss_mb": rss, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+PROCESS_TYPES = {
+    "api": "import app.main",
+    "worker": "import app.worker",
+    "worker+models": "import app.worker\nfrom app.services.model_registry import model_registry\nmodel_registry.warm_up()",
+}
+
+
+def probe(body: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(body=body, heavy=HEAVY_MODULES)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--with-models", action="store_true", help="also measure a worker with the models loaded")
+    args = parser.parse_args()
+
+    print(f"{'process':<15}{'import s':>10}{'rss MB':>10}  heavy modules")
+    for name, body in PROCESS_TYPES.items():
+        if name == "worker+models" and not args.with_models:
+            continue
+        runs = [probe(body) for _ in range(args.repeats)]
+        seconds = statistics.median(run["seconds"] for run in runs)
+        rss = statistics.median(run["rss_mb"] for run in runs)
+        print(f"{name:<15}{seconds:>10.2f}{rss:>10.1f}  {', '.join(runs[-1]['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Play a recorded video into the streaming endpoint as if it were a live camera.
+
+``--mode frames`` sends JPEG frames over the WebSocket at the clip's native
+fps, the way a browser or an edge device would. ``--mode source`` asks the
+server to read the file itself, the way it reads an RTSP camera. Prints
+every plate event and the final latency / dropped-frame statistics.
+
+Usage (from the repo root, needs the AI models in app/AI_model):
+    python -m benchmarks.bench_stream --video clip.mp4 --mode frames
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_stream.db')}")
+os.environ["STREAM_ALLOW_FILE_SOURCES"] = "true"
+os.environ.setdefault("STREAM_STATS_INTERVAL", "2")
+
+import cv2  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.middleware.auth_middleware import auth_service  # noqa: E402
+
+
+def send_frames(websocket, video: str, speed: float, quality: int) -> int:
+    cap = cv2.VideoCapture(video)
+    fps = (cap.get(cv2.CAP_PROP_FPS) or 25.0) * speed
+    started = time.perf_counter()
+    sent = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if ok:
+            websocket.send_bytes(jpeg.tobytes())
+            sent += 1
+        # Gửi đúng nhịp fps như camera thật
+        delay = started + sent / fps - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    cap.release()
+    websocket.send_text(json.dumps({"type": "stop"}))
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--mode", choices=["frames", "source"], default="frames")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed multiplier (frames mode)")
+    parser.add_argument("--quality", type=int, default=85, help="JPEG quality (frames mode)")
+    args = parser.parse_args()
+
+    token = auth_service.create_access_token({"sub": "1", "username": "bench"})
+    with TestClient(app) as client:
+        with client.websocket_connect(f"/api/v1/streams/ws?token={token}") as websocket:
+            ready = websocket.receive_json()
+            if ready["type"] != "ready":
+                print(ready)
+                return
+
+            if args.mode == "frames":
+                print(f"sent {send_frames(websocket, args.video, args.speed, args.quality)} frames")
+            else:
+                websocket.send_text(json.dumps({"source": os.path.abspath(args.video)}))
+
+            while True:
+                event = websocket.receive_json()
+                if event["type"] == "plate":
+                    print(f"plate {event['plate_number']:<12} conf {event['confidence']:.2f}  t={event['timestamp']:.2f}s  latency {event['latency_ms']:.0f} ms")
+                elif event["type"] == "stats":
+                    print(f"stats processed {event['frames_processed']}/{event['frames_received']}  dropped {event['frames_dropped']}  latency p95 {event['latency_ms']['p95']} ms")
+                elif event["type"] == "end":
+                    print(json.dumps(event, indent=2))
+                    break
+                else:
+                    print(event)
+                    break
+
+
+if __name__ == "__main__":
+    main()
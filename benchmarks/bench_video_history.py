@@ -0,0 +1,102 @@
+"""Benchmark video history queries on a synthetic SQLite database.
+
+Compares the old "load every video of the user" query with keyset
+pagination over the (user_id, created_at) index.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_video_history --rows 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+db_file = os.path.join(tempfile.mkdtemp(), "bench_history.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.database import SessionLocal, engine, init_db  # noqa: E402
+from app.models.models import User, Video  # noqa: E402
+from app.services.video_service import VideoService  # noqa: E402
+
+
+def seed(rows: int, users: int) -> int:
+    init_db()
+    started = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"id": i + 1, "username": f"user{i}", "password_hash": "x", "created_at": started}
+            for i in range(users)
+        ])
+        connection.execute(insert(Video), [
+            {
+                "user_id": i % users + 1,
+                "filename": f"clip_{i}.mp4",
+                "filepath": f"app/upload/videos/clip_{i}.mp4",
+                "status": ("completed", "failed", "pending")[i % 3],
+                "log_path": f"app/upload/results/{i}.json",
+                "created_at": started + timedelta(seconds=i * 7),
+            }
+            for i in range(rows)
+        ])
+    # Người dùng "nặng" nhất: user 1
+    return 1
+
+
+def timed(label: str, fn, repeats: int) -> None:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    elapsed_ms = (time.perf_counter() - started) / repeats * 1000
+    print(f"{label:<44} {elapsed_ms:9.2f} ms  ({result} rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    seed_started = time.perf_counter()
+    user_id = seed(args.rows, args.users)
+    print(f"Seeded {args.rows} videos for {args.users} users in {time.perf_counter() - seed_started:.1f}s ({db_file})\n")
+
+    video_service = VideoService()
+    db = SessionLocal()
+
+    def unpaginated():
+        return len(db.query(Video).filter(Video.user_id == user_id).all())
+
+    def first_page():
+        return len(video_service.get_video_history_service(db, user_id, args.page_size).items)
+
+    deep_cursor = None
+    page = video_service.get_video_history_service(db, user_id, args.page_size)
+    for _ in range(100):
+        deep_cursor = page.next_cursor
+        page = video_service.get_video_history_service(db, user_id, args.page_size, deep_cursor)
+
+    def deep_page():
+        return len(video_service.get_video_history_service(db, user_id, args.page_size, deep_cursor).items)
+
+    def filtered_page():
+        return len(video_service.get_video_history_service(db, user_id, args.page_size, video_status="failed").items)
+
+    timed("old: all videos of user (full entities)", unpaginated, max(1, args.repeats // 10))
+    timed("keyset: first page", first_page, args.repeats)
+    timed("keyset: page 101", deep_page, args.repeats)
+    timed("keyset: first page, status=failed", filtered_page, args.repeats)
+
+    plan = db.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN SELECT id FROM videos WHERE user_id = 1 ORDER BY created_at DESC, id DESC LIMIT 51"
+    ).fetchall()
+    print("\nquery plan:", "; ".join(str(row[-1]) for row in plan))
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Load test for violation persistence and plate search on SQLite.
+
+Measures per-video bulk insert vs one INSERT per row, then prefix / exact /
+fuzzy search latency over a large synthetic violations table.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_violation_search --rows 1000000
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+from datetime import datetime
+
+db_file = os.path.join(tempfile.mkdtemp(), "bench_violations.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.database import SessionLocal, engine, init_db  # noqa: E402
+from app.models.models import User, Video, Violation  # noqa: E402
+from app.schemas.schemas import PlateDetectionResult  # noqa: E402
+from app.services.plate_text import fold_plate, normalize_plate  # noqa: E402
+from app.services.violation_service import ViolationService  # noqa: E402
+
+SERIES = "ABCDEFGHKLMNPSTUVXYZ"
+
+
+def random_plate(rng: random.Random) -> str:
+    return f"{rng.randint(11, 99)}{rng.choice(SERIES)}{rng.choice(string.digits)}-{rng.randint(10000, 99999)}"
+
+
+def seed(rows: int, videos: int, rng: random.Random) -> None:
+    init_db()
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(User), [{"id": 1, "username": "bench", "password_hash": "x", "created_at": now}])
+        connection.execute(insert(Video), [
+            {"id": i + 1, "user_id": 1, "filename": f"{i}.mp4", "filepath": f"{i}.mp4", "status": "completed", "created_at": now}
+            for i in range(videos)
+        ])
+        batch = []
+        for i in range(rows):
+            plate = random_plate(rng)
+            batch.append({
+                "video_id": i % videos + 1,
+                "plate_number": plate,
+                "plate_normalized": normalize_plate(plate),
+                "plate_key": fold_plate(plate),
+                "timestamp_frame": f"{i % 3600:.2f}",
+                "snapshot_path": f"app/upload/crops/{i}.jpg",
+                "created_at": now,
+            })
+            if len(batch) == 50_000:
+                connection.execute(insert(Violation), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(Violation), batch)
+
+
+def bench_inserts(plates_per_video: int, rng: random.Random) -> None:
+    violation_service = ViolationService()
+    plates = [
+        PlateDetectionResult(plate_number=random_plate(rng), confidence=0.9, crop_path="x.jpg", bbox=[0, 0, 1, 1], timestamp=1.0)
+        for _ in range(plates_per_video)
+    ]
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    violation_service.save_violations(db, 1, plates)
+    db.commit()
+    bulk = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for plate in plates:
+        db.add(Violation(video_id=1, plate_number=plate.plate_number, timestamp_frame="1.00", snapshot_path=plate.crop_path))
+        db.flush()
+    db.commit()
+    row_by_row = time.perf_counter() - started
+    db.close()
+
+    print(f"insert {plates_per_video} plates: bulk {bulk * 1000:.1f} ms, row-by-row {row_by_row * 1000:.1f} ms ({row_by_row / bulk:.1f}x)")
+
+
+def bench_search(queries: int, rng: random.Random) -> None:
+    violation_service = ViolationService()
+    db = SessionLocal()
+    cases = {
+        "exact": lambda: random_plate(rng),
+        "prefix": lambda: random_plate(rng)[:4],
+        "fuzzy": lambda: random_plate(rng)[:5].replace("0", "O").replace("8", "B"),
+    }
+    for mode, make_query in cases.items():
+        latencies = []
+        matched = 0
+        for _ in range(queries):
+            plate = make_query()
+            started = time.perf_counter()
+            matched += len(violation_service.search_violations_service(db, 1, plate, mode, 50))
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[int(len(latencies) * 0.95)]
+        print(f"search {mode:<7} p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  avg hits {matched / queries:.1f}")
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--videos", type=int, default=2000)
+    parser.add_argument("--plates-per-video", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    started = time.perf_counter()
+    seed(args.rows, args.videos, rng)
+    print(f"Seeded {args.rows} violations in {time.perf_counter() - started:.1f}s ({db_file})")
+
+    bench_inserts(args.plates_per_video, rng)
+    bench_search(args.queries, rng)
+
+
+if __name__ == "__main__":
+    main()
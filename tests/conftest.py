@@ -0,0 +1,6 @@
+import os
+
+# Test chạy không cần MySQL: engine SQLite chỉ được tạo, không kết nối khi import service
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+# scrypt với cost thấp để test hash / verify nhanh
+os.environ.setdefault("SCRYPT_N", "1024")
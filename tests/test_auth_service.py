@@ -0,0 +1,37 @@
+import time
+
+from app.services.auth_service import TokenCache
+
+
+def test_token_cache_returns_a_copy_of_the_payload():
+    cache = TokenCache()
+    cache.put("token", {"sub": "1"})
+    payload = cache.get("token")
+    payload["sub"] = "2"
+    assert cache.get("token") == {"sub": "1"}
+    assert cache.get("other") is None
+
+
+def test_token_cache_entry_expires_with_the_token():
+    cache = TokenCache(max_ttl=300)
+    cache.put("expired", {"sub": "1", "exp": time.time() - 1})
+    assert cache.get("expired") is None
+
+
+def test_token_cache_entry_expires_after_max_ttl(monkeypatch):
+    cache = TokenCache(max_ttl=10)
+    cache.put("token", {"sub": "1", "exp": time.time() + 3600})
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("token") is None
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = TokenCache(max_size=2)
+    cache.put("a", {"sub": "a"})
+    cache.put("b", {"sub": "b"})
+    cache.get("a")
+    cache.put("c", {"sub": "c"})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"sub": "a"}
+    assert cache.get("c") == {"sub": "c"}
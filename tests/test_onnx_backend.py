@@ -0,0 +1,105 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+
+from app.services.inference_backend import OnnxYoloModel, load_models
+from app.services.model_registry import OCR_MODEL_PATH, OCR_ONNX_PATH, PLATE_MODEL_PATH, PLATE_ONNX_PATH
+from benchmarks.bench_onnx_backend import matched_share
+from benchmarks.synthetic_video import generate_clip
+
+
+def constant_model(path, prediction, layout):
+    """ONNX model that ignores its 64x64 input and always returns ``prediction``"""
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper, numpy_helper
+
+    graph = helper.make_graph(
+        [helper.make_node("Constant", [], ["output0"], value=numpy_helper.from_array(prediction[None].astype(np.float32)))],
+        "constant",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, [1, 3, 64, 64])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, [1, *prediction.shape])]
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 8
+    for key, value in {"imgsz": "[64, 64]", "names": "{0: 'plate'}", "layout": layout}.items():
+        entry = model.metadata_props.add()
+        entry.key, entry.value = key, value
+    onnx.save(model, str(path))
+    return str(path)
+
+
+@pytest.mark.parametrize("layout, prediction", [
+    # (4 + classes, anchors): cx, cy, w, h, score
+    ("yolov8", np.array([[32, 10], [32, 10], [16, 4], [8, 4], [0.9, 0.1]])),
+    # (anchors, 5 + classes): cx, cy, w, h, objectness, score
+    ("yolov5", np.array([[32, 32, 16, 8, 0.95, 0.95], [10, 10, 4, 4, 0.2, 0.5]])),
+])
+def test_boxes_are_mapped_back_to_the_original_image(tmp_path, layout, prediction):
+    model = OnnxYoloModel(constant_model(tmp_path / "model.onnx", prediction, layout))
+    # 128x256 vào letterbox 64x64: tỉ lệ 0.25, padding 16px phía trên như scale_boxes của ultralytics
+    boxes = model([np.zeros((128, 256, 3), dtype=np.uint8)])[0]
+    assert boxes.shape == (1, 6)
+    np.testing.assert_allclose(boxes[0, :4], [96, 48, 160, 80], atol=1e-3)
+    assert boxes[0, 4] == pytest.approx(0.9, abs=0.01)
+    assert boxes[0, 5] == 0
+
+
+@pytest.fixture(scope="module")
+def frames(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("clip") / "clip.avi")
+    generate_clip(path, width=1280, height=720, fps=5, seconds=8, plates=4)
+    cap = cv2.VideoCapture(path)
+    frames = []
+    ret, frame = cap.read()
+    while ret:
+        frames.append(frame)
+        ret, frame = cap.read()
+    cap.release()
+    return frames
+
+
+def require_models(*paths):
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        pytest.skip(f"models not available: {missing} (export with python -m app.export_onnx)")
+
+
+def test_onnx_detector_matches_ultralytics(frames):
+    pytest.importorskip("ultralytics")
+    require_models(PLATE_MODEL_PATH, PLATE_ONNX_PATH)
+    from app.services.inference_backend import UltralyticsDetector
+
+    torch_boxes = UltralyticsDetector(PLATE_MODEL_PATH, "cpu")(frames)
+    onnx_boxes = load_models("onnx")[0](frames)
+    assert matched_share(torch_boxes, onnx_boxes) >= 0.95
+    assert matched_share(onnx_boxes, torch_boxes) >= 0.95
+
+
+def test_onnx_ocr_matches_yolov5(frames):
+    pytest.importorskip("torch")
+    require_models(PLATE_MODEL_PATH, OCR_MODEL_PATH, PLATE_ONNX_PATH, OCR_ONNX_PATH)
+    from app.services.inference_backend import YoloV5HubOcr
+    from app.services.plate_text import assemble_plate_text
+
+    try:
+        torch_ocr = YoloV5HubOcr(OCR_MODEL_PATH, "cpu")
+    except Exception as e:
+        pytest.skip(f"torch.hub yolov5 not available: {e}")
+    detector, onnx_ocr = load_models("onnx")
+    # Cùng một tập crop cho cả hai backend để chỉ so sánh model OCR
+    crops = [
+        frame[int(y1):int(y2), int(x1):int(x2)].copy()
+        for frame, boxes in zip(frames, detector(frames))
+        for x1, y1, x2, y2, *_ in boxes
+        if int(x2) > int(x1) and int(y2) > int(y1)
+    ]
+    if not crops:
+        pytest.skip("no plates detected on the synthetic clip")
+
+    torch_texts = [assemble_plate_text(boxes, torch_ocr.names) for boxes in torch_ocr(crops)]
+    onnx_texts = [assemble_plate_text(boxes, onnx_ocr.names) for boxes in onnx_ocr(crops)]
+    assert sum(a == b for a, b in zip(torch_texts, onnx_texts)) / len(crops) >= 0.9
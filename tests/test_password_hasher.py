@@ -0,0 +1,37 @@
+import hashlib
+
+from app.services.password_hasher import PasswordHasher
+
+
+def test_hash_and_verify():
+    hasher = PasswordHasher()
+    password_hash = hasher.hash("secret123")
+    assert password_hash.startswith(f"scrypt${hasher.n}${hasher.r}${hasher.p}$")
+    assert hasher.verify("secret123", password_hash)
+    assert not hasher.verify("secret124", password_hash)
+    # Salt ngẫu nhiên: cùng mật khẩu cho hash khác nhau
+    assert hasher.hash("secret123") != password_hash
+
+
+def test_legacy_sha256_hash_verifies_and_needs_rehash():
+    hasher = PasswordHasher()
+    legacy = hashlib.sha256(b"secret123").hexdigest()
+    assert hasher.verify("secret123", legacy)
+    assert not hasher.verify("wrong", legacy)
+    assert hasher.needs_rehash(legacy)
+
+
+def test_rehash_when_cost_parameters_change():
+    old = PasswordHasher()
+    password_hash = old.hash("secret123")
+    assert not old.needs_rehash(password_hash)
+
+    new = PasswordHasher()
+    new.n = old.n * 2
+    assert new.needs_rehash(password_hash)
+    # Hash cũ vẫn verify được với tham số lưu trong chính hash
+    assert new.verify("secret123", password_hash)
+
+
+def test_malformed_hash_does_not_verify():
+    assert not PasswordHasher().verify("secret123", "scrypt$broken")
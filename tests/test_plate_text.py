@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from app.services.plate_text import (
+    UNKNOWN_PLATE,
+    assemble_plate_text,
+    clean_plate_text,
+    fold_plate,
+    is_valid_plate,
+    normalize_plate,
+    vote_plate_text,
+)
+
+
+def char_boxes(rows):
+    """(x, y, label index) -> OCR rows [x1, y1, x2, y2, conf, cls] of 10x20 characters"""
+    return np.array([[x, y, x + 10, y + 20, 0.9, cls] for x, y, cls in rows], dtype=np.float64)
+
+
+NAMES = {i: c for i, c in enumerate("0123456789ABCDEFGHKLMNPSTUVXYZ")}
+
+
+def label(char):
+    return next(i for i, c in NAMES.items() if c == char)
+
+
+def test_assemble_one_line_plate_sorted_by_x():
+    text = "51F12345"
+    rows = [(x * 12, 0, label(c)) for x, c in enumerate(text)]
+    assert assemble_plate_text(char_boxes(reversed(rows)), NAMES) == text
+
+
+def test_assemble_two_line_plate_joins_lines_with_dash():
+    top = [(x * 12, 0, label(c)) for x, c in enumerate("59X1")]
+    bottom = [(x * 12, 30, label(c)) for x, c in enumerate("12345")]
+    assert assemble_plate_text(char_boxes(bottom + top), NAMES) == "59X1-12345"
+
+
+def test_assemble_rejects_too_few_characters():
+    rows = [(x * 12, 0, label(c)) for x, c in enumerate("51F12")]
+    assert assemble_plate_text(char_boxes(rows), NAMES) == UNKNOWN_PLATE
+
+
+def test_vote_weights_characters_by_confidence():
+    reads = [("51F12345", 0.9), ("51F12346", 0.4), ("51F12345", 0.5)]
+    assert vote_plate_text(reads) == "51F12345"
+
+
+def test_vote_ignores_reads_with_minority_length():
+    reads = [("51F12345", 0.6), ("51F1234", 0.9), ("51F12845", 0.6), ("51F12345", 0.3)]
+    assert vote_plate_text(reads) == "51F12345"
+
+
+def test_vote_without_readable_candidates_is_unknown():
+    assert vote_plate_text([(UNKNOWN_PLATE, 0.9), ("", 0.5)]) == UNKNOWN_PLATE
+
+
+def test_clean_plate_text():
+    assert clean_plate_text(" 51f-123.45 ") == "51F-12345"
+
+
+@pytest.mark.parametrize("plate", ["51F-123.45", "30LD12345", "59X1-123.45", "29AA-1234", "80NG-123.45", "41NN12345"])
+def test_valid_vietnamese_plates(plate):
+    assert is_valid_plate(plate)
+
+
+@pytest.mark.parametrize("plate", ["", UNKNOWN_PLATE, "5F12345", "51F123", "ABCDEFGH", "51F1234567"])
+def test_invalid_plates(plate):
+    assert not is_valid_plate(plate)
+
+
+def test_normalize_plate_keeps_letters_and_digits():
+    assert normalize_plate("51f-123.45") == "51F12345"
+
+
+def test_fold_plate_merges_confusable_characters():
+    assert fold_plate("51F-1O3.45") == fold_plate("51F-103.45")
+    assert fold_plate("B1S") == "815"
@@ -0,0 +1,52 @@
+from app.services.plate_tracker import DedupWindow, PlateTracker, bbox_iou
+
+
+def detection(x, y, confidence=0.9):
+    return {"bbox": [x, y, x + 100, y + 30], "confidence": confidence}
+
+
+def test_bbox_iou():
+    assert bbox_iou([0, 0, 10, 10], [0, 0, 10, 10]) == 1.0
+    assert bbox_iou([0, 0, 10, 10], [20, 20, 30, 30]) == 0.0
+    assert bbox_iou([0, 0, 10, 10], [5, 0, 15, 10]) == 50 / 150
+
+
+def test_moving_plate_stays_on_one_track():
+    tracker = PlateTracker()
+    tracks = [tracker.update([detection(100 + 20 * i, 200)])[0] for i in range(5)]
+    assert len({track.track_id for track in tracks}) == 1
+    assert tracks[0].hits == 5
+
+
+def test_distant_plates_get_separate_tracks():
+    tracker = PlateTracker()
+    first, second = tracker.update([detection(0, 0), detection(800, 500)])
+    assert first.track_id != second.track_id
+
+
+def test_track_keeps_only_best_crops():
+    tracker = PlateTracker(max_crops=2)
+    for confidence in (0.5, 0.9, 0.7):
+        track = tracker.update([detection(100, 100, confidence)])[0]
+    assert [d["confidence"] for d in track.best_detections] == [0.9, 0.7]
+    assert track.best["confidence"] == 0.9
+
+
+def test_expire_drops_lost_tracks():
+    tracker = PlateTracker(max_missed=1)
+    track = tracker.update([detection(100, 100)])[0]
+    tracker.update([])
+    assert tracker.expire() == []
+    tracker.update([])
+    assert tracker.expire() == [track]
+    assert tracker.tracks == []
+
+
+def test_dedup_window_suppresses_repeats_inside_window():
+    window = DedupWindow(60)
+    assert window.admit("51F12345", 0)
+    assert not window.admit("51F12345", 30)
+    # Mỗi lần thấy lại làm mới cửa sổ: hơn 60s sau lần thấy cuối (80s) mới được báo lại
+    assert not window.admit("51F12345", 80)
+    assert window.admit("51F12345", 150)
+    assert window.suppressed == 2
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.video_service import VideoService, sniff_file_kind
+
+
+@pytest.mark.parametrize("header, kind", [
+    (b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01", "image"),
+    (b"\x89PNG\r\n\x1a\n\x00\x00\x00\r", "image"),
+    (b"RIFF\x24\x00\x00\x00WEBPVP8 ", "image"),
+    (b"\x00\x00\x00\x20ftypisom\x00\x00", "video"),
+    (b"RIFF\x24\x00\x00\x00AVI LIST", "video"),
+    (b"\x1a\x45\xdf\xa3\x9f\x42\x86\x81\x01\x42\xf7\x81", "video"),
+    (b"hello world!", None),
+    (b"", None),
+])
+def test_sniff_file_kind(header, kind):
+    assert sniff_file_kind(header) == kind
+
+
+def test_cursor_round_trip():
+    video_service = VideoService()
+    created_at = datetime(2024, 5, 1, 8, 30, 15, 123456)
+    cursor = video_service.encode_cursor(created_at, 42)
+    assert "=" not in cursor
+    assert video_service.decode_cursor(cursor) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30", "eyJpZCI6ICJ4In0"])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        VideoService().decode_cursor(cursor)
+    assert error.value.status_code == 400